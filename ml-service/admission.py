@@ -0,0 +1,165 @@
+# admission.py
+"""
+Control de admisión por modelo para la API
+- Cada modelo admite hasta ADMISSION_MAX_INFLIGHT cálculos a la vez; el resto espera
+  en una cola acotada (ADMISSION_MAX_QUEUE) como máximo ADMISSION_QUEUE_TIMEOUT_MS
+- Con la cola llena o al agotar la espera se responde 429 con Retry-After de inmediato,
+  en lugar de acumular solicitudes hasta que el cliente agote su timeout
+- Dos carriles: 'interactive' (dashboard, por defecto) y 'bulk' (lotes). Al liberarse
+  un lugar pasa primero el carril interactivo, y una solicitud interactiva que
+  encuentra la cola llena desplaza a la solicitud bulk más reciente
+- Se mide el tiempo de espera en cola por carril (para /health)
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+import numpy as np
+from fastapi import HTTPException
+
+# Cálculos simultáneos por modelo
+ADMISSION_MAX_INFLIGHT = int(os.getenv('ADMISSION_MAX_INFLIGHT', 4))
+# Solicitudes en espera por modelo (entre ambos carriles)
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', 32))
+# Espera máxima en cola antes de responder 429
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_MS', 2000))
+# Segundos sugeridos al cliente en Retry-After
+ADMISSION_RETRY_AFTER_S = int(os.getenv('ADMISSION_RETRY_AFTER_S', 1))
+
+LANES = ['interactive', 'bulk']
+
+# Tiempos de espera recientes por carril usados para los percentiles
+WAIT_SAMPLES = 1000
+
+# Estado por modelo: cálculos activos, colas por carril y contadores
+gates = {}
+
+def gate(name):
+    """Estado de admisión del modelo (se crea al primer uso)"""
+    if name not in gates:
+        gates[name] = {
+            'active': 0,
+            'queues': {lane: deque() for lane in LANES},
+            'admitted': {lane: 0 for lane in LANES},
+            'rejected': {lane: 0 for lane in LANES},
+            'waits_ms': {lane: deque(maxlen=WAIT_SAMPLES) for lane in LANES}
+        }
+    return gates[name]
+
+def request_lane(priority, default='interactive'):
+    """Carril de una solicitud: cabecera X-Priority válida o el del endpoint"""
+    return priority if priority in LANES else default
+
+def overloaded(name, lane, reason):
+    """429 con Retry-After para una solicitud rechazada"""
+    gate(name)['rejected'][lane] += 1
+    return HTTPException(
+        status_code=429,
+        detail=f"Servicio saturado ({name}, {lane}): {reason}. Reintenta en {ADMISSION_RETRY_AFTER_S}s",
+        headers={'Retry-After': str(ADMISSION_RETRY_AFTER_S)}
+    )
+
+def waiting(state):
+    """Solicitudes en espera en ambos carriles"""
+    return sum(len(queue) for queue in state['queues'].values())
+
+def queue_depth(name):
+    """Solicitudes del modelo esperando un lugar"""
+    return waiting(gate(name))
+
+def leave_queue(state, lane, waiter):
+    """Sacar de su cola a una solicitud que dejó de esperar (plazo agotado o cancelada)"""
+    queue = state['queues'][lane]
+    if waiter in queue:
+        queue.remove(waiter)
+
+def release(name):
+    """Liberar un lugar: pasa al siguiente en espera (interactivo primero) o queda libre"""
+    state = gate(name)
+    for lane in LANES:
+        queue = state['queues'][lane]
+        while queue:
+            waiter = queue.popleft()
+            if not waiter.done():
+                # El lugar se transfiere: active no cambia
+                waiter.set_result(True)
+                return
+    state['active'] -= 1
+
+async def acquire(name, lane):
+    """Esperar un lugar para calcular con el modelo; 429 si no hay en el plazo"""
+    state = gate(name)
+    started = time.perf_counter()
+    # Sin espera si hay lugar y nadie con igual o mayor prioridad está en cola
+    ahead = len(state['queues']['interactive']) + (len(state['queues']['bulk']) if lane == 'bulk' else 0)
+    if state['active'] < ADMISSION_MAX_INFLIGHT and not ahead:
+        state['active'] += 1
+    else:
+        if waiting(state) >= ADMISSION_MAX_QUEUE:
+            bulk = state['queues']['bulk']
+            if lane == 'bulk' or not bulk:
+                raise overloaded(name, lane, 'cola llena')
+            # La solicitud interactiva desplaza a la solicitud bulk más reciente
+            displaced = bulk.pop()
+            if not displaced.done():
+                displaced.set_exception(overloaded(name, 'bulk', 'desplazada por una solicitud interactiva'))
+
+        waiter = asyncio.get_running_loop().create_future()
+        state['queues'][lane].append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), ADMISSION_QUEUE_TIMEOUT_MS / 1000)
+        except asyncio.TimeoutError:
+            # Sin sacarla de la cola seguiría contando en queue_depth (cola llena, degradación)
+            leave_queue(state, lane, waiter)
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                release(name)  # El lugar llegó justo al vencer el plazo
+            elif not waiter.done():
+                waiter.cancel()
+            raise overloaded(name, lane, 'espera agotada')
+        except asyncio.CancelledError:
+            # Cliente desconectado: devolver el lugar si ya se había asignado
+            leave_queue(state, lane, waiter)
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                release(name)
+            else:
+                waiter.cancel()
+            raise
+
+    state['admitted'][lane] += 1
+    state['waits_ms'][lane].append((time.perf_counter() - started) * 1000)
+
+@asynccontextmanager
+async def admitted(name, lane='interactive'):
+    """Ejecutar el bloque con un lugar del modelo `name` en el carril `lane`"""
+    await acquire(name, lane)
+    try:
+        yield
+    finally:
+        release(name)
+
+def admission_stats():
+    """Estado y tiempos de espera (ms) por modelo y carril para /health"""
+    stats = {
+        'limits': {
+            'max_inflight': ADMISSION_MAX_INFLIGHT,
+            'max_queue': ADMISSION_MAX_QUEUE,
+            'queue_timeout_ms': ADMISSION_QUEUE_TIMEOUT_MS
+        }
+    }
+    for name, state in gates.items():
+        lanes = {}
+        for lane in LANES:
+            waits = np.array(state['waits_ms'][lane])
+            lanes[lane] = {
+                'admitted': state['admitted'][lane],
+                'rejected': state['rejected'][lane],
+                'waiting': len(state['queues'][lane]),
+                'wait_p50_ms': round(float(np.percentile(waits, 50)), 3) if len(waits) else 0.0,
+                'wait_p95_ms': round(float(np.percentile(waits, 95)), 3) if len(waits) else 0.0,
+                'wait_max_ms': round(float(waits.max()), 3) if len(waits) else 0.0
+            }
+        stats[name] = {'active': state['active'], 'lanes': lanes}
+    return stats
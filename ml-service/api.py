@@ -1,15 +1,40 @@
 # api.py
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from typing import List, Optional
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
 import joblib
 import numpy as np
 from datetime import datetime
 import json
 import os
-from config import MODELS_DIR
+import time
+import asyncio
+from config import MODELS_DIR, PREDICTION_MODE
+from feature_engineering import feature_array, feature_matrix, rule_levels, MOBILITY_DEMAND_RULE, SATURATION_RULE, SATURATION_LABELS
+from forecast_grid import build_forecast
+from snapshots import SNAPSHOTS_DIR
+from leaf_quantiles import quantiles_path, load_leaf_statistics, matches, predict_from_leaves
+from building_models import new_cache, cached_building_model, cache_stats, stored_buildings, fits_in_cache
+from single_flight import coalesce, flight_key, coalescing_stats
+from admission import admitted, request_lane, queue_depth, admission_stats
+from surrogate import surrogate_path, load_surrogate
+from degradation import is_degraded, record_latency, count_served, degradation_stats
+from warmup import warm_up, mark_ready, is_ready, warming_up, warmup_stats, WARMUP_DATASETS
 
-app = FastAPI(title="ML Service - INNOVATEC", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Calentar los modelos en segundo plano al iniciar: el servidor ya acepta conexiones
+    y las predicciones aprendidas de cada modelo responden 503 hasta que está listo
+    """
+    task = asyncio.create_task(warm_up_models())
+    yield
+    task.cancel()
+
+app = FastAPI(title="ML Service - INNOVATEC", version="1.0.0", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -23,17 +48,42 @@ app.add_middleware(
 # Cargar modelos al iniciar
 attendance_model = None
 attendance_metadata = None
+attendance_quantiles = None  # Estadísticas por hoja para intervalos (solo forests de regresión)
 mobility_model = None
 mobility_metadata = None
 saturation_model = None
 saturation_metadata = None
+building_load_model = None  # Multi-salida: movilidad y saturación en una pasada
+building_load_metadata = None
+
+# Orden de features de cada modelo si su metadata no lo indica
+DEFAULT_FEATURES = {
+    'attendance': ['viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour', 'category_count', 'popularityScore'],
+    'mobility': ['viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour', 'peakHour', 'eventsCount', 'averageViewDuration'],
+    'saturation': ['viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour', 'peakVisits', 'averageViewDuration', 'type',
+                   'popularityScore'],
+    'building_load': ['viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour', 'peakHour', 'eventsCount',
+                      'averageViewDuration', 'peakVisits']
+}
+
+# Árboles sustitutos de cada modelo (surrogate.py): responden cuando el modelo está saturado
+surrogates = {'attendance': None, 'mobility': None, 'saturation': None, 'building_load': None}
+
+# Modelos por edificio precargados o cargados al primer uso (LRU acotado por BUILDING_MODELS_CACHE_MB)
+building_models_cache = new_cache()
+# Artefacto de los modelos por edificio de cada endpoint
+BUILDING_ARTIFACTS = {'mobility': 'mobility_demand_predictor', 'saturation': 'saturation_predictor'}
+
+# Pronóstico del campus ya serializado, válido hasta el próximo snapshot o recarga de modelos
+forecast_cache = {'key': None, 'body': None}
 
 def load_attendance_model():
     """Cargar el modelo de predicción de asistencia"""
-    global attendance_model, attendance_metadata
+    global attendance_model, attendance_metadata, attendance_quantiles
     
     model_path = f'{MODELS_DIR}/attendance_predictor.pkl'
     metadata_path = f'{MODELS_DIR}/attendance_predictor_metadata.json'
+    stats_path = quantiles_path('attendance_predictor', MODELS_DIR)
     
     if os.path.exists(model_path):
         attendance_model = joblib.load(model_path)
@@ -41,6 +91,16 @@ def load_attendance_model():
             with open(metadata_path, 'r') as f:
                 attendance_metadata = json.load(f)
         print(f'✅ Modelo de asistencia cargado: {model_path}')
+        
+        # Las estadísticas solo sirven si se calcularon para este mismo forest
+        attendance_quantiles = None
+        if os.path.exists(stats_path):
+            stats = load_leaf_statistics(stats_path)
+            if matches(attendance_model, stats):
+                attendance_quantiles = stats
+                print(f'✅ Intervalos de asistencia cargados: {stats_path}')
+            else:
+                print(f'⚠️  {stats_path} no corresponde al modelo publicado; predicciones sin intervalos')
     else:
         print(f'⚠️  Modelo de asistencia no encontrado en {model_path}')
 
@@ -85,11 +145,55 @@ def load_saturation_model():
     else:
         print(f'⚠️  Modelo de saturación no encontrado en {model_path}')
 
+def load_building_load_model():
+    """Cargar el modelo multi-salida de carga de edificios (movilidad + saturación)"""
+    global building_load_model, building_load_metadata
+    
+    model_path = f'{MODELS_DIR}/building_load_predictor.pkl'
+    metadata_path = f'{MODELS_DIR}/building_load_predictor_metadata.json'
+    
+    if os.path.exists(model_path):
+        building_load_model = joblib.load(model_path)['model']
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'r') as f:
+                building_load_metadata = json.load(f)
+        print(f'✅ Modelo de carga de edificios cargado: {model_path}')
+    else:
+        print(f'⚠️  Modelo de carga de edificios no encontrado en {model_path}')
+
+def load_surrogates():
+    """
+    Cargar los árboles sustitutos de los modelos cargados
+    Solo se usa un sustituto si la metadata del modelo lo registra (se entrenó con él)
+    """
+    models = {
+        'attendance': ('attendance_predictor', attendance_metadata),
+        'mobility': ('mobility_demand_predictor', mobility_metadata),
+        'saturation': ('saturation_predictor', saturation_metadata),
+        'building_load': ('building_load_predictor', building_load_metadata)
+    }
+    for name, (artifact, metadata) in models.items():
+        path = surrogate_path(artifact, MODELS_DIR)
+        surrogates[name] = load_surrogate(path) if (metadata or {}).get('surrogate') else None
+        if surrogates[name] is not None:
+            print(f'✅ Sustituto de {name} cargado: {path}')
+
+def loaded_models():
+    """Modelo global y metadata cargados de cada endpoint"""
+    return {
+        'attendance': (attendance_model, attendance_metadata),
+        'mobility': (mobility_model, mobility_metadata),
+        'saturation': (saturation_model, saturation_metadata),
+        'building_load': (building_load_model, building_load_metadata)
+    }
+
 # Cargar modelos al iniciar
 try:
     load_attendance_model()
     load_mobility_model()
     load_saturation_model()
+    load_building_load_model()
+    load_surrogates()
 except Exception as e:
     print(f'⚠️  Error cargando modelos: {e}')
     print('⚠️  Algunas predicciones pueden no estar disponibles hasta entrenar los modelos.')
@@ -113,6 +217,7 @@ class MobilityPredictionRequest(BaseModel):
     eventsCount: int = 0
     averageViewDuration: float = 0.0
     date_time: str = None
+    buildingId: str = None  # Usa el modelo del edificio si existe (modo aprendido)
 
 class SaturationPredictionRequest(BaseModel):
     viewCount: int = 0
@@ -124,12 +229,52 @@ class SaturationPredictionRequest(BaseModel):
     popularityScore: float = 0.0
     type: int = 0  # 0 = Edificio, 1 = Evento
     date_time: str = None
+    buildingId: str = None  # Usa el modelo del edificio si existe (modo aprendido)
+
+class BuildingLoadRequest(BaseModel):
+    viewCount: int = 0
+    uniqueVisitors: int = 0
+    dayOfWeek: int = None
+    hour: int = None
+    peakHour: int = None
+    eventsCount: int = 0
+    averageViewDuration: float = 0.0
+    peakVisits: int = 0
+    date_time: str = None
+
+class AttendanceBatchRequest(BaseModel):
+    items: List[AttendancePredictionRequest]
+
+class PredictAllRequest(BaseModel):
+    # Unión de los campos de asistencia, movilidad y saturación (acepta null en los opcionales)
+    viewCount: int = 0
+    uniqueVisitors: int = 0
+    dayOfWeek: Optional[int] = None
+    hour: Optional[int] = None
+    category_count: int = 1
+    popularityScore: float = 0.0
+    peakHour: Optional[int] = None
+    eventsCount: int = 0
+    averageViewDuration: float = 0.0
+    peakVisits: int = 0
+    type: int = 0  # 0 = Edificio, 1 = Evento
+    date_time: Optional[str] = None
+    buildingId: Optional[str] = None  # Usa el modelo del edificio si existe (modo aprendido)
+
+class PredictAllBatchRequest(BaseModel):
+    items: List[PredictAllRequest]
 
 class PredictionResponse(BaseModel):
     prediction: int
     confidence: float = 0.0
     model_type: str = "unknown"
     features_used: list = []
+    quantiles: Optional[dict] = None  # p10/p50/p90 cuando el modelo tiene estadísticas por hoja
+    building_model: Optional[str] = None  # Edificio cuyo modelo respondió (None = modelo global)
+    served_by: str = "primary"  # 'primary', 'surrogate' (modelo sustituto bajo carga) o 'rules'
+
+class AttendanceBatchResponse(BaseModel):
+    predictions: List[PredictionResponse]
 
 class SaturationPredictionResponse(BaseModel):
     saturationLevel: int  # 0=Normal, 1=Baja, 2=Media, 3=Alta
@@ -137,6 +282,24 @@ class SaturationPredictionResponse(BaseModel):
     confidence: float = 0.0
     model_type: str = "unknown"
     features_used: list = []
+    building_model: Optional[str] = None  # Edificio cuyo modelo respondió (None = modelo global)
+    served_by: str = "primary"  # 'primary', 'surrogate' (modelo sustituto bajo carga) o 'rules'
+
+class PredictAllResponse(BaseModel):
+    # None si el modelo no está cargado
+    attendance: Optional[PredictionResponse] = None
+    mobility: Optional[PredictionResponse] = None
+    saturation: Optional[SaturationPredictionResponse] = None
+
+class PredictAllBatchResponse(BaseModel):
+    predictions: List[PredictAllResponse]
+
+class BuildingLoadResponse(BaseModel):
+    mobility: PredictionResponse
+    saturation: SaturationPredictionResponse
+    model_type: str = "unknown"
+    features_used: list = []
+    served_by: str = "primary"  # 'primary', 'surrogate' (modelo sustituto bajo carga) o 'rules'
 
 @app.get("/")
 async def root():
@@ -147,7 +310,8 @@ async def root():
         "models_loaded": {
             "attendance": attendance_model is not None,
             "mobility": mobility_model is not None,
-            "saturation": saturation_model is not None
+            "saturation": saturation_model is not None,
+            "building_load": building_load_model is not None
         },
         "version": "2.0.0"
     }
@@ -160,13 +324,383 @@ async def health():
         "models_loaded": {
             "attendance": attendance_model is not None,
             "mobility": mobility_model is not None,
-            "saturation": saturation_model is not None
+            "saturation": saturation_model is not None,
+            "building_load": building_load_model is not None
         },
+        "coalescing": coalescing_stats(),
+        "admission": admission_stats(),
+        "degradation": {
+            **degradation_stats(),
+            "surrogates_loaded": {name: surrogate is not None for name, surrogate in surrogates.items()}
+        },
+        "ready": all(entry['ready'] for entry in readiness_status().values()),
         "timestamp": datetime.now().isoformat()
     }
 
+def tree_confidence(tree_predictions):
+    """
+    Confianza por fila a partir de las predicciones de cada árbol (filas × árboles)
+    Menor coeficiente de variación (std/mean) entre árboles = mayor confianza
+    """
+    prediction_std = tree_predictions.std(axis=1)
+    prediction_mean = tree_predictions.mean(axis=1)
+    cv = prediction_std / np.where(prediction_mean > 0, prediction_mean, 1)
+    return np.where(prediction_mean > 0, np.clip(1.0 - (cv * 0.5), 0.5, 0.99), 0.5)
+
+def attendance_confidence(model, features):
+    """
+    Confianza de las predicciones de asistencia (una por fila de features)
+    Para forests se usa la dispersión entre árboles; otras familias (p. ej.
+    gradient boosting) no tienen árboles independientes y usan un valor fijo
+    """
+    if not hasattr(model, 'estimators_') or not hasattr(model.estimators_[0], 'predict'):
+        return np.full(len(features), 0.7)
+    return tree_confidence(np.column_stack([tree.predict(features) for tree in model.estimators_]))
+
+def request_time(request):
+    """dayOfWeek y hour de una solicitud: los indicados, desde date_time si faltan, o hoy a mediodía"""
+    day_of_week = request.dayOfWeek
+    hour = request.hour
+    
+    if request.date_time and (day_of_week is None or hour is None):
+        try:
+            event_date = datetime.fromisoformat(request.date_time.replace('Z', '+00:00'))
+            if day_of_week is None:
+                day_of_week = event_date.weekday()
+            if hour is None:
+                hour = event_date.hour
+        except:
+            pass
+    
+    # Valores por defecto si aún faltan
+    if day_of_week is None:
+        day_of_week = datetime.now().weekday()
+    if hour is None:
+        hour = 12  # Medio día por defecto
+    
+    return day_of_week, hour
+
+def request_features(request):
+    """
+    Features de una solicitud de cualquier endpoint: los campos numéricos del schema,
+    con dayOfWeek y hour resueltos (request_time) y peakHour = hour si falta
+    Cada modelo toma de aquí sus columnas con feature_array / feature_matrix
+    """
+    values = request.model_dump(exclude={'date_time', 'buildingId'})
+    values['dayOfWeek'], values['hour'] = request_time(request)
+    if 'peakHour' in values and values['peakHour'] is None:
+        values['peakHour'] = values['hour']
+    return values
+
+def predict_attendance_rows(features, model=None):
+    """
+    Predicción, confianza y cuantiles de cada fila de features
+    Con estadísticas por hoja todo sale de una búsqueda de hoja por árbol; sin ellas
+    se predice con el modelo y la confianza re-evalúa cada árbol (sin cuantiles)
+    model reemplaza al modelo publicado (p. ej. el sustituto, que no tiene cuantiles)
+    """
+    model = attendance_model if model is None else model
+    if attendance_quantiles is None or model is not attendance_model:
+        return model.predict(features), attendance_confidence(model, features), None
+    
+    predictions, tree_predictions, quantiles = predict_from_leaves(attendance_model, attendance_quantiles, features)
+    names = [f'p{round(level * 100)}' for level in attendance_quantiles['levels']]
+    rows = [
+        {name: max(0.0, round(float(value), 1)) for name, value in zip(names, row)}
+        for row in quantiles
+    ]
+    return predictions, tree_confidence(tree_predictions), rows
+
+PREDICTION_MODES = ['rules', 'learned']
+
+# Máximo de filas por solicitud en los endpoints batch
+MAX_BATCH_ITEMS = 1000
+
+def prediction_mode(mode):
+    """Modo pedido (?mode=) o PREDICTION_MODE; 400 si no es válido"""
+    mode = mode or PREDICTION_MODE
+    if mode not in PREDICTION_MODES:
+        raise HTTPException(status_code=400, detail=f"Modo inválido: {mode}. Usa {' o '.join(PREDICTION_MODES)}")
+    return mode
+
+def classify_rows(model, features):
+    """Clase predicha y confianza (probabilidad de la clase predicha) de cada fila"""
+    predictions = model.predict(features)
+    if hasattr(model, 'predict_proba'):
+        confidences = model.predict_proba(features).max(axis=1)
+    else:
+        confidences = np.full(len(features), 0.7)
+    return predictions, confidences
+
+# Cálculo de cada endpoint con un modelo (el principal o su sustituto) y una matriz de features
+PREDICTORS = {
+    'attendance': lambda model, X: predict_attendance_rows(X, model),
+    'mobility': classify_rows,
+    'saturation': classify_rows,
+    # Una matriz de probabilidades por target, con las clases del modelo que respondió
+    # (el sustituto puede no haber visto todas)
+    'building_load': lambda model, X: (model.predict_proba(X), model.classes_)
+}
+
+def warm_up_model(name, model, metadata):
+    """
+    Calentar el modelo y su sustituto con las mismas llamadas de los endpoints
+    Retorna el resumen del calentamiento
+    """
+    models = [model] + ([surrogates[name]] if surrogates.get(name) is not None else [])
+    return warm_up(
+        lambda X: [PREDICTORS[name](candidate, X) for candidate in models],
+        WARMUP_DATASETS[name], (metadata or {}).get('features', DEFAULT_FEATURES[name])
+    )
+
+def building_model_warmer(name):
+    """
+    Calentamiento de un modelo por edificio de `name` antes de entrar al caché
+    (solo lotes pequeños: cada edificio responde solicitudes individuales o lotes cortos)
+    """
+    def warm(model, metadata):
+        warm_up(lambda X: PREDICTORS[name](model, X), WARMUP_DATASETS[name], metadata['features'],
+                batch_sizes=[1, 32])
+    return warm
+
+def readiness_status():
+    """Estado del calentamiento de cada modelo cargado"""
+    return warmup_stats({name: model for name, (model, _) in loaded_models().items()})
+
+async def warm_up_models():
+    """
+    Calentar en el threadpool, uno a la vez, los modelos cargados que siguen fríos
+    Si el calentamiento falla el modelo se declara listo igual (se registra el error)
+    """
+    for name, (model, metadata) in loaded_models().items():
+        if is_ready(name, model):
+            continue
+        try:
+            summary = await run_in_threadpool(warm_up_model, name, model, metadata)
+            print(f'🔥 Modelo {name} listo: calentamiento de {summary["duration_ms"]:.0f} ms')
+        except Exception as e:
+            summary = {'error': str(e)}
+            print(f'⚠️  Error calentando el modelo {name}: {e}')
+        mark_ready(name, model, summary)
+    await warm_up_building_models()
+
+async def warm_up_building_models():
+    """
+    Precargar y calentar en el threadpool los modelos por edificio guardados mientras
+    quepan en el caché sin expulsar a otro; los demás se cargan al primer uso
+    """
+    for name, artifact in BUILDING_ARTIFACTS.items():
+        warmed = 0
+        for building in stored_buildings(artifact, MODELS_DIR):
+            if not fits_in_cache(building_models_cache, building, artifact, MODELS_DIR):
+                continue
+            try:
+                await cached_building_model(building_models_cache, building, artifact, MODELS_DIR,
+                                            warm=building_model_warmer(name))
+                warmed += 1
+            except Exception as e:
+                print(f'⚠️  Error precargando el modelo {name} del edificio {building}: {e}')
+        if warmed:
+            print(f'🏢 {warmed} modelos por edificio de {name} precargados y calentados')
+
+async def serve(name, model, features, compute, lane, surrogate_features=None):
+    """
+    Resultado de compute(modelo, features) con el modelo principal (coalescido y con
+    control de admisión) o con el sustituto de `name` cuando el modelo está degradado
+    por carga (degradation.py) o la admisión rechaza la solicitud
+    El sustituto responde sin cola ni threadpool: un árbol poco profundo tarda microsegundos
+    surrogate_features: las features en el orden del sustituto si difiere (modelos por edificio)
+    Retorna (resultado, 'primary' o 'surrogate')
+    """
+    # Sin calentar, el backend usa su fallback (503) en lugar de esperar al timeout
+    if not is_ready(name, loaded_models()[name][0]):
+        raise warming_up(name)
+    surrogate = surrogates.get(name)
+    if surrogate_features is None:
+        surrogate_features = features
+    if surrogate is not None and is_degraded(name, queue_depth(name)):
+        count_served(name, 'surrogate')
+        return compute(surrogate, surrogate_features), 'surrogate'
+    
+    started = time.perf_counter()
+    try:
+        result = await coalesce(flight_key(name, model, features), lambda: compute(model, features),
+                                gate=lambda: admitted(name, lane))
+    except HTTPException as e:
+        # Cola llena o espera agotada: mejor una respuesta aproximada que un 429
+        if e.status_code != 429 or surrogate is None:
+            raise
+        count_served(name, 'surrogate')
+        return compute(surrogate, surrogate_features), 'surrogate'
+    record_latency(name, (time.perf_counter() - started) * 1000)
+    count_served(name, 'primary')
+    return result, 'primary'
+
+def surrogate_model_type(name):
+    """model_type de las respuestas del sustituto"""
+    return type(surrogates[name]).__name__
+
+async def resolve_model(name, global_model, global_metadata, artifact, building_id):
+    """
+    Modelo que responde una solicitud: el del edificio si existe (desde el caché LRU,
+    cargado en el threadpool en un fallo) o el global
+    Retorna (modelo, orden de features, model_type, edificio o None)
+    """
+    # Ids sin el formato de un edificio o sin modelo guardado usan el global
+    entry = await cached_building_model(building_models_cache, building_id, artifact, MODELS_DIR,
+                                        warm=building_model_warmer(name))
+    if entry is not None:
+        model, metadata = entry
+        return model, metadata['features'], metadata.get('model_type', 'unknown'), building_id
+    metadata = global_metadata or {}
+    return global_model, metadata.get('features', DEFAULT_FEATURES[name]), metadata.get('model_type', 'unknown'), None
+
+async def attendance_responses(rows, lane):
+    """
+    Asistencia de cada fila de features (request_features) con una sola evaluación
+    del modelo; lista de None si el modelo no está cargado
+    """
+    if attendance_model is None:
+        return [None] * len(rows)
+    
+    features_order = attendance_metadata.get('features', DEFAULT_FEATURES['attendance'])
+    features = feature_matrix(rows, features_order)
+    # Solicitudes idénticas concurrentes comparten el cálculo; bajo carga responde el sustituto
+    (predictions, confidences, quantiles), served_by = await serve(
+        'attendance', attendance_model, features, PREDICTORS['attendance'], lane
+    )
+    model_type = (attendance_metadata.get('model_type', 'unknown') if served_by == 'primary'
+                  else surrogate_model_type('attendance'))
+    return [
+        PredictionResponse(
+            # Asegurar que la predicción no sea negativa
+            prediction=max(0, int(prediction)),
+            confidence=float(confidence),
+            model_type=model_type,
+            features_used=features_order,
+            quantiles=quantiles[i] if quantiles else None,
+            served_by=served_by
+        )
+        for i, (prediction, confidence) in enumerate(zip(predictions, confidences))
+    ]
+
+async def classification_results(name, global_model, global_metadata, artifact, rows, building_ids, lane):
+    """
+    Clase y confianza de cada fila con el modelo de su edificio (si existe) o el global
+    Se evalúa una vez cada modelo distinto, todos a la vez; bajo carga responde el
+    sustituto del modelo global
+    Retorna por fila un dict con los campos de la respuesta ('prediction' es la clase),
+    o None si no hay modelo para la fila
+    """
+    unique_ids = list(set(building_ids))
+    resolved = dict(zip(unique_ids, await asyncio.gather(
+        *(resolve_model(name, global_model, global_metadata, artifact, building_id) for building_id in unique_ids)
+    )))
+    # Filas agrupadas por el modelo que las responde (None = global)
+    groups = {}
+    for i, building_id in enumerate(building_ids):
+        model_entry = resolved[building_id]
+        groups.setdefault(model_entry[3], (model_entry, []))[1].append(i)
+    surrogate_order = (global_metadata or {}).get('features', DEFAULT_FEATURES[name])
+    
+    async def evaluate(model_entry, indices):
+        model, features_order, model_type, building = model_entry
+        if model is None:
+            return [None] * len(indices)
+        group_rows = [rows[i] for i in indices]
+        (predictions, confidences), served_by = await serve(
+            name, model, feature_matrix(group_rows, features_order), PREDICTORS[name], lane,
+            surrogate_features=feature_matrix(group_rows, surrogate_order)
+        )
+        if served_by == 'surrogate':
+            features_order, model_type, building = surrogate_order, surrogate_model_type(name), None
+        return [
+            {
+                'prediction': int(prediction),
+                'confidence': float(confidence),
+                'model_type': model_type,
+                'features_used': features_order,
+                'building_model': building,
+                'served_by': served_by
+            }
+            for prediction, confidence in zip(predictions, confidences)
+        ]
+    
+    results = [None] * len(rows)
+    evaluated = await asyncio.gather(*(evaluate(model_entry, indices) for model_entry, indices in groups.values()))
+    for (_, indices), group_results in zip(groups.values(), evaluated):
+        for i, result in zip(indices, group_results):
+            results[i] = result
+    return results
+
+async def mobility_responses(items, rows, lane):
+    """Demanda de movilidad de cada solicitud (modo aprendido); None si no hay modelo"""
+    results = await classification_results(
+        'mobility', mobility_model, mobility_metadata, 'mobility_demand_predictor', rows,
+        [item.buildingId for item in items], lane
+    )
+    return [
+        None if result is None else PredictionResponse(**{**result, 'prediction': max(0, result['prediction'])})
+        for result in results
+    ]
+
+async def saturation_responses(items, rows, lane):
+    """Nivel de saturación de cada solicitud (modo aprendido); None si no hay modelo"""
+    # Los modelos por edificio se entrenan con analíticas de edificios (type=0)
+    results = await classification_results(
+        'saturation', saturation_model, saturation_metadata, 'saturation_predictor', rows,
+        [item.buildingId if item.type == 0 else None for item in items], lane
+    )
+    responses = []
+    for result in results:
+        if result is None:
+            responses.append(None)
+            continue
+        saturation_level = result.pop('prediction')
+        responses.append(SaturationPredictionResponse(
+            saturationLevel=saturation_level,
+            saturationLabel=SATURATION_LABELS.get(saturation_level, 'Normal'),
+            **result
+        ))
+    return responses
+
+def mobility_rule_prediction(request):
+    """
+    Demanda de movilidad con la misma regla que etiqueta los datos de entrenamiento
+    La predicción usa la codificación del modelo (clases en orden alfabético)
+    """
+    label = MOBILITY_DEMAND_RULE['labels'][int(rule_levels(MOBILITY_DEMAND_RULE, {
+        'viewCount': request.viewCount,
+        'uniqueVisitors': request.uniqueVisitors,
+        'eventsCount': request.eventsCount
+    }))]
+    classes = (mobility_metadata or {}).get('classes') or sorted(MOBILITY_DEMAND_RULE['labels'])
+    return PredictionResponse(
+        prediction=classes.index(label),
+        confidence=1.0,
+        model_type="rules",
+        features_used=list(MOBILITY_DEMAND_RULE['weights']),
+        served_by="rules"
+    )
+
+def saturation_rule_prediction(request):
+    """Nivel de saturación de un edificio con la misma regla que etiqueta los datos de entrenamiento"""
+    saturation_level = SATURATION_RULE['labels'][int(rule_levels(SATURATION_RULE, {
+        'viewCount': request.viewCount,
+        'uniqueVisitors': request.uniqueVisitors,
+        'peakVisits': request.peakVisits
+    }))]
+    return SaturationPredictionResponse(
+        saturationLevel=saturation_level,
+        saturationLabel=SATURATION_LABELS[saturation_level],
+        confidence=1.0,
+        model_type="rules",
+        features_used=list(SATURATION_RULE['weights']),
+        served_by="rules"
+    )
+
 @app.post("/predict/attendance", response_model=PredictionResponse)
-async def predict_attendance(request: AttendancePredictionRequest):
+async def predict_attendance(request: AttendancePredictionRequest, x_priority: str = Header(None)):
     """
     Predecir asistencia a un evento
     """
@@ -177,210 +711,280 @@ async def predict_attendance(request: AttendancePredictionRequest):
         )
     
     try:
-        # Calcular dayOfWeek y hour si no están proporcionados pero hay date_time
-        day_of_week = request.dayOfWeek
-        hour = request.hour
-        
-        if request.date_time and (day_of_week is None or hour is None):
-            try:
-                event_date = datetime.fromisoformat(request.date_time.replace('Z', '+00:00'))
-                if day_of_week is None:
-                    day_of_week = event_date.weekday()
-                if hour is None:
-                    hour = event_date.hour
-            except:
-                pass
-        
-        # Valores por defecto si aún faltan
-        if day_of_week is None:
-            day_of_week = datetime.now().weekday()
-        if hour is None:
-            hour = 12  # Medio día por defecto
-        
-        # Preparar features en el mismo orden que se entrenó
-        features_order = attendance_metadata.get('features', [
-            'viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour', 'category_count', 'popularityScore'
-        ])
-        
-        features_dict = {
-            'viewCount': request.viewCount,
-            'uniqueVisitors': request.uniqueVisitors,
-            'dayOfWeek': day_of_week,
-            'hour': hour,
-            'category_count': request.category_count,
-            'popularityScore': request.popularityScore
-        }
-        
-        # Crear array de features en el orden correcto
-        features = np.array([[features_dict[f] for f in features_order]])
-        
-        # Predecir
-        prediction = attendance_model.predict(features)[0]
-        
-        # Asegurar que la predicción no sea negativa
-        prediction = max(0, int(prediction))
-        
-        # Calcular confianza basada en las predicciones de los árboles individuales
-        # Menor desviación estándar = mayor confianza
-        tree_predictions = np.array([tree.predict(features)[0] for tree in attendance_model.estimators_])
-        prediction_std = np.std(tree_predictions)
-        prediction_mean = np.mean(tree_predictions)
-        
-        # Calcular coeficiente de variación (std/mean) y convertir a confianza
-        # CV bajo = alta confianza, CV alto = baja confianza
-        if prediction_mean > 0:
-            cv = prediction_std / prediction_mean
-            confidence = max(0.5, min(0.99, 1.0 - (cv * 0.5)))  # Escalar CV a confianza
-        else:
-            confidence = 0.5
-        
-        return PredictionResponse(
-            prediction=prediction,
-            confidence=confidence,
-            model_type=attendance_metadata.get('model_type', 'unknown'),
-            features_used=features_order
-        )
+        return (await attendance_responses([request_features(request)], request_lane(x_priority)))[0]
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en predicción: {str(e)}")
 
-@app.post("/predict/mobility", response_model=PredictionResponse)
-async def predict_mobility(request: MobilityPredictionRequest):
+@app.post("/predict/attendance/batch", response_model=AttendanceBatchResponse)
+async def predict_attendance_batch(request: AttendanceBatchRequest, x_priority: str = Header(None)):
     """
-    Predecir demanda de movilidad en un edificio/área
+    Predecir la asistencia de varios eventos con una sola evaluación del modelo
     """
-    if mobility_model is None:
+    if attendance_model is None:
         raise HTTPException(
             status_code=503,
-            detail="Modelo de movilidad no disponible. Por favor, entrena el modelo primero ejecutando train_mobility_model.py"
+            detail="Modelo de asistencia no disponible. Por favor, entrena el modelo primero ejecutando train_model.py"
         )
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_BATCH_ITEMS} eventos por solicitud")
+    if not request.items:
+        return AttendanceBatchResponse(predictions=[])
     
     try:
-        day_of_week = request.dayOfWeek
-        hour = request.hour
-        peak_hour = request.peakHour
-        
-        if request.date_time:
-            try:
-                event_date = datetime.fromisoformat(request.date_time.replace('Z', '+00:00'))
-                if day_of_week is None:
-                    day_of_week = event_date.weekday()
-                if hour is None:
-                    hour = event_date.hour
-            except:
-                pass
-        
-        if day_of_week is None:
-            day_of_week = datetime.now().weekday()
-        if hour is None:
-            hour = 12
-        if peak_hour is None:
-            peak_hour = hour
-        
-        features_order = mobility_metadata.get('features', [
-            'viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour', 'peakHour', 'eventsCount', 'averageViewDuration'
-        ])
-        
-        features_dict = {
-            'viewCount': request.viewCount,
-            'uniqueVisitors': request.uniqueVisitors,
-            'dayOfWeek': day_of_week,
-            'hour': hour,
-            'peakHour': peak_hour,
-            'eventsCount': request.eventsCount,
-            'averageViewDuration': request.averageViewDuration
-        }
-        
-        features = np.array([[features_dict[f] for f in features_order]])
-        prediction = mobility_model.predict(features)[0]
-        prediction = max(0, int(prediction))
-        
-        # Calcular confianza basada en probabilidades del clasificador
-        if hasattr(mobility_model, 'predict_proba'):
-            probas = mobility_model.predict_proba(features)[0]
-            confidence = float(max(probas))  # La probabilidad de la clase predicha
-        else:
-            confidence = 0.7
-        
-        return PredictionResponse(
-            prediction=prediction,
-            confidence=confidence,
-            model_type=mobility_metadata.get('model_type', 'unknown'),
-            features_used=features_order
+        # Los lotes van por el carril bulk salvo que pidan otro
+        rows = [request_features(item) for item in request.items]
+        return AttendanceBatchResponse(
+            predictions=await attendance_responses(rows, request_lane(x_priority, default='bulk'))
         )
     
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en predicción: {str(e)}")
+
+@app.post("/predict/mobility", response_model=PredictionResponse)
+async def predict_mobility(request: MobilityPredictionRequest, mode: str = None, x_priority: str = Header(None)):
+    """
+    Predecir demanda de movilidad en un edificio/área
+    mode=rules aplica la regla exacta de los extractores; mode=learned usa el modelo
+    """
+    if prediction_mode(mode) == 'rules':
+        return mobility_rule_prediction(request)
+    
+    try:
+        response = (await mobility_responses([request], [request_features(request)], request_lane(x_priority)))[0]
+        if response is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Modelo de movilidad no disponible. Por favor, entrena el modelo primero ejecutando train_mobility_model.py"
+            )
+        return response
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en predicción de movilidad: {str(e)}")
 
 @app.post("/predict/saturation", response_model=SaturationPredictionResponse)
-async def predict_saturation(request: SaturationPredictionRequest):
+async def predict_saturation(request: SaturationPredictionRequest, mode: str = None, x_priority: str = Header(None)):
     """
     Predecir nivel de saturación (Normal, Baja, Media, Alta)
+    mode=rules aplica la regla exacta de los extractores a edificios (type=0); los
+    eventos no tienen regla en los datos de entrenamiento y siempre usan el modelo
+    """
+    if prediction_mode(mode) == 'rules' and request.type == 0:
+        return saturation_rule_prediction(request)
+    
+    try:
+        response = (await saturation_responses([request], [request_features(request)], request_lane(x_priority)))[0]
+        if response is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Modelo de saturación no disponible. Por favor, entrena el modelo primero ejecutando train_saturation_model.py"
+            )
+        return response
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en predicción de saturación: {str(e)}")
+
+async def predict_all_items(items, mode, lane):
+    """
+    Asistencia, movilidad y saturación de cada solicitud de /predict/all
+    Las features se preparan una vez por fila y los tres modelos se evalúan a la vez,
+    cada uno con una sola llamada para todas las filas
+    Un modelo no cargado deja su resultado en None
     """
-    if saturation_model is None:
+    rows = [request_features(item) for item in items]
+    # mode=rules: reglas de los extractores para movilidad y para la saturación de edificios
+    learned_saturation = [i for i, item in enumerate(items) if mode == 'learned' or item.type != 0]
+    pending = [
+        attendance_responses(rows, lane),
+        saturation_responses([items[i] for i in learned_saturation], [rows[i] for i in learned_saturation], lane)
+    ]
+    if mode == 'learned':
+        pending.append(mobility_responses(items, rows, lane))
+    attendance, saturation_learned, *mobility = await asyncio.gather(*pending)
+    
+    mobility = mobility[0] if mobility else [mobility_rule_prediction(item) for item in items]
+    saturation = dict(zip(learned_saturation, saturation_learned))
+    saturation = [saturation[i] if i in saturation else saturation_rule_prediction(item) for i, item in enumerate(items)]
+    return [
+        PredictAllResponse(attendance=a, mobility=m, saturation=s)
+        for a, m, s in zip(attendance, mobility, saturation)
+    ]
+
+@app.post("/predict/all", response_model=PredictAllResponse)
+async def predict_all(request: PredictAllRequest, mode: str = None, x_priority: str = Header(None)):
+    """
+    Asistencia, demanda de movilidad y nivel de saturación de una misma entidad en una
+    sola llamada (en lugar de /predict/attendance, /predict/mobility y /predict/saturation)
+    mode aplica a movilidad y saturación igual que en sus endpoints
+    """
+    mode = prediction_mode(mode)
+    try:
+        return (await predict_all_items([request], mode, request_lane(x_priority)))[0]
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en predicción: {str(e)}")
+
+@app.post("/predict/all/batch", response_model=PredictAllBatchResponse)
+async def predict_all_batch(request: PredictAllBatchRequest, mode: str = None, x_priority: str = Header(None)):
+    """
+    /predict/all para varias entidades: una evaluación por modelo para todo el lote
+    """
+    mode = prediction_mode(mode)
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_BATCH_ITEMS} entidades por solicitud")
+    if not request.items:
+        return PredictAllBatchResponse(predictions=[])
+    
+    try:
+        # Los lotes van por el carril bulk salvo que pidan otro
+        return PredictAllBatchResponse(
+            predictions=await predict_all_items(request.items, mode, request_lane(x_priority, default='bulk'))
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en predicción: {str(e)}")
+
+@app.post("/predict/building-load", response_model=BuildingLoadResponse)
+async def predict_building_load(request: BuildingLoadRequest, mode: str = None, x_priority: str = Header(None)):
+    """
+    Demanda de movilidad y nivel de saturación de un edificio en una sola llamada
+    mode=rules aplica las dos reglas de los extractores; mode=learned recorre un solo
+    forest multi-salida (un predict_proba) en lugar de los modelos de movilidad y saturación
+    """
+    if prediction_mode(mode) == 'rules':
+        mobility = mobility_rule_prediction(request)
+        saturation = saturation_rule_prediction(request)
+        return BuildingLoadResponse(
+            mobility=mobility,
+            saturation=saturation,
+            model_type="rules",
+            features_used=list(dict.fromkeys(mobility.features_used + saturation.features_used)),
+            served_by="rules"
+        )
+    
+    if building_load_model is None:
         raise HTTPException(
             status_code=503,
-            detail="Modelo de saturación no disponible. Por favor, entrena el modelo primero ejecutando train_saturation_model.py"
+            detail="Modelo de carga de edificios no disponible. Por favor, entrena el modelo primero ejecutando train_all_models.py"
         )
     
     try:
-        day_of_week = request.dayOfWeek
-        hour = request.hour
-        
-        if request.date_time:
-            try:
-                event_date = datetime.fromisoformat(request.date_time.replace('Z', '+00:00'))
-                if day_of_week is None:
-                    day_of_week = event_date.weekday()
-                if hour is None:
-                    hour = event_date.hour
-            except:
-                pass
-        
-        if day_of_week is None:
-            day_of_week = datetime.now().weekday()
-        if hour is None:
-            hour = 12
-        
-        features_order = saturation_metadata.get('features', [
-            'viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour', 'peakVisits', 'averageViewDuration', 'type', 'popularityScore'
-        ])
+        features_order = building_load_metadata.get('features', DEFAULT_FEATURES['building_load'])
+        features = feature_array(request_features(request), features_order)
         
-        features_dict = {
-            'viewCount': request.viewCount,
-            'uniqueVisitors': request.uniqueVisitors,
-            'dayOfWeek': day_of_week,
-            'hour': hour,
-            'peakVisits': request.peakVisits,
-            'averageViewDuration': request.averageViewDuration,
-            'type': request.type,
-            'popularityScore': request.popularityScore
-        }
-        
-        features = np.array([[features_dict[f] for f in features_order]])
-        saturation_level = int(saturation_model.predict(features)[0])
-        
-        # Etiquetas de saturación
-        labels = {0: 'Normal', 1: 'Baja', 2: 'Media', 3: 'Alta'}
-        saturation_label = labels.get(saturation_level, 'Normal')
-        
-        # Calcular probabilidades para confianza
-        if hasattr(saturation_model, 'predict_proba'):
-            probas = saturation_model.predict_proba(features)[0]
-            confidence = float(max(probas))
-        else:
-            confidence = 0.7
+        # Una pasada por el forest: una matriz de probabilidades por target
+        (probas, classes), served_by = await serve(
+            'building_load', building_load_model, features, PREDICTORS['building_load'], request_lane(x_priority)
+        )
+        mobility_probas, saturation_probas = probas
+        mobility_classes, saturation_classes = classes
+        model_type = (building_load_metadata.get('model_type', 'unknown') if served_by == 'primary'
+                      else surrogate_model_type('building_load'))
+        saturation_level = int(saturation_classes[saturation_probas[0].argmax()])
         
-        return SaturationPredictionResponse(
-            saturationLevel=saturation_level,
-            saturationLabel=saturation_label,
-            confidence=confidence,
-            model_type=saturation_metadata.get('model_type', 'unknown'),
-            features_used=features_order
+        return BuildingLoadResponse(
+            mobility=PredictionResponse(
+                prediction=int(mobility_classes[mobility_probas[0].argmax()]),
+                confidence=float(mobility_probas[0].max()),
+                model_type=model_type,
+                features_used=features_order,
+                served_by=served_by
+            ),
+            saturation=SaturationPredictionResponse(
+                saturationLevel=saturation_level,
+                saturationLabel=SATURATION_LABELS.get(saturation_level, 'Normal'),
+                confidence=float(saturation_probas[0].max()),
+                model_type=model_type,
+                features_used=features_order,
+                served_by=served_by
+            ),
+            model_type=model_type,
+            features_used=features_order,
+            served_by=served_by
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error en predicción de saturación: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error en predicción de carga de edificio: {str(e)}")
+
+def data_version():
+    """
+    Versión de las analíticas: fecha de modificación del directorio de snapshots,
+    que cambia cada vez que se publica un snapshot nuevo
+    """
+    try:
+        return os.stat(SNAPSHOTS_DIR).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+@app.get("/forecast/grid")
+async def forecast_grid(x_priority: str = Header(None)):
+    """
+    Saturación y movilidad de los 13 edificios para cada día de la semana y hora
+    Se calcula con una llamada vectorizada por modelo y se sirve desde memoria hasta
+    que hay un snapshot nuevo o se recargan los modelos
+    """
+    if saturation_model is None and mobility_model is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Modelos de saturación y movilidad no disponibles. Por favor, entrena los modelos primero"
+        )
+    
+    for name in ('mobility', 'saturation'):
+        if not is_ready(name, loaded_models()[name][0]):
+            raise warming_up(name)
+    
+    key = data_version()
+    if forecast_cache['body'] is not None and forecast_cache['key'] == key:
+        return Response(content=forecast_cache['body'], media_type="application/json")
+    
+    # Modelo, orden de features y clases de cada modelo cargado
+    models = {'mobility': None, 'saturation': None}
+    if mobility_model is not None:
+        models['mobility'] = (mobility_model, mobility_metadata.get('features', DEFAULT_FEATURES['mobility']),
+                              mobility_metadata.get('classes'))
+    if saturation_model is not None:
+        models['saturation'] = (saturation_model, saturation_metadata.get('features', DEFAULT_FEATURES['saturation']),
+                                None)
+    
+    def render():
+        """Pronóstico serializado, o None si no hay analíticas"""
+        payload = build_forecast(models)
+        if payload is None:
+            return None
+        payload['generated_at'] = datetime.now().isoformat()
+        return json.dumps(payload).encode('utf-8')
+    
+    # Con el caché vacío, las solicitudes concurrentes esperan un solo cálculo
+    try:
+        body = await coalesce(('forecast_grid', id(mobility_model), id(saturation_model), key), render,
+                              gate=lambda: admitted('forecast_grid', request_lane(x_priority)))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generando el pronóstico: {str(e)}")
+    
+    if body is None:
+        raise HTTPException(
+            status_code=503,
+            detail="No hay analíticas de edificios. Ejecuta la extracción de datos (train_all_models.py)"
+        )
+    
+    forecast_cache['key'], forecast_cache['body'] = key, body
+    return Response(content=body, media_type="application/json")
 
 @app.get("/model/info")
 async def model_info():
@@ -388,9 +992,23 @@ async def model_info():
     return {
         "attendance": attendance_metadata if attendance_metadata else None,
         "mobility": mobility_metadata if mobility_metadata else None,
-        "saturation": saturation_metadata if saturation_metadata else None
+        "saturation": saturation_metadata if saturation_metadata else None,
+        "building_load": building_load_metadata if building_load_metadata else None,
+        "building_models": cache_stats(building_models_cache),
+        "warmup": readiness_status()
     }
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: 200 cuando todos los modelos cargados terminaron de calentarse, 503 mientras
+    tanto (para balanceadores y el backend)
+    """
+    status = readiness_status()
+    if not all(entry['ready'] for entry in status.values()):
+        raise HTTPException(status_code=503, detail={'ready': False, 'models': status})
+    return {'ready': True, 'models': status}
+
 @app.post("/model/reload")
 async def reload_model():
     """Recargar todos los modelos (útil después de re-entrenamiento)"""
@@ -398,14 +1016,23 @@ async def reload_model():
         load_attendance_model()
         load_mobility_model()
         load_saturation_model()
+        load_building_load_model()
+        load_surrogates()
+        # Los modelos por edificio se vuelven a leer del disco (precarga o próximo uso)
+        building_models_cache.update(new_cache())
+        forecast_cache['key'], forecast_cache['body'] = None, None
+        # Los modelos recargados están fríos hasta terminar de calentarse (503 mientras tanto)
+        await warm_up_models()
         return {
             "status": "success",
             "message": "Modelos recargados correctamente",
             "models_loaded": {
                 "attendance": attendance_model is not None,
                 "mobility": mobility_model is not None,
-                "saturation": saturation_model is not None
-            }
+                "saturation": saturation_model is not None,
+                "building_load": building_load_model is not None
+            },
+            "warmup": readiness_status()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error recargando modelos: {str(e)}")
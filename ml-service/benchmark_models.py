@@ -0,0 +1,264 @@
+# benchmark_models.py
+"""
+Comparar familias de estimadores por modelo: tiempo de entrenamiento, score,
+tamaño del artefacto y latencia de inferencia (una fila y lote)
+Con --rules compara el modo de reglas exactas (el que etiqueta los datos) con el
+modelo aprendido en movilidad y saturación, y con --building-load el modelo
+multi-salida de carga de edificios con los dos modelos separados
+Usa el snapshot más reciente de cada dataset o, si no existe, datos sintéticos
+"""
+
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import r2_score, accuracy_score
+from sklearn.preprocessing import LabelEncoder
+
+from train_all_models import MODEL_SPECS, MULTI_OUTPUT_SPECS
+from estimators import ESTIMATOR_FAMILIES, build_estimator
+from snapshots import latest_snapshot, load_snapshot
+from profiling import serving_profile, measure_latency, artifact_size
+from feature_engineering import INFERENCE_DTYPE, MOBILITY_DEMAND_RULE, SATURATION_RULE, compile_rule
+
+# Regla de etiquetado de cada modelo que tiene modo de reglas en la API
+LABEL_RULES = {'mobility': MOBILITY_DEMAND_RULE, 'saturation': SATURATION_RULE}
+
+def synthetic_dataset(name, n_samples=2000):
+    """Datos sintéticos de los scripts de entrenamiento individuales"""
+    from feature_engineering import mobility_demand_labels, apply_dtype_plan
+
+    if name == 'attendance':
+        from train_model import generate_synthetic_data
+        return generate_synthetic_data(n_samples=n_samples)
+    if name == 'mobility':
+        from train_mobility_model import generate_synthetic_mobility_data
+        df = generate_synthetic_mobility_data(n_samples=n_samples)
+        df['mobility_demand'] = mobility_demand_labels(df['viewCount'], df['uniqueVisitors'], df['eventsCount'])
+        return apply_dtype_plan(df)
+    from train_saturation_model import generate_synthetic_saturation_data
+    return generate_synthetic_saturation_data(n_samples=n_samples)
+
+def benchmark_dataset(name):
+    """Snapshot más reciente del dataset del modelo, o datos sintéticos"""
+    snapshot_path = latest_snapshot(MODEL_SPECS[name]['dataset'])
+    if snapshot_path is not None:
+        return load_snapshot(snapshot_path), snapshot_path.name
+    return synthetic_dataset(name), 'sintético'
+
+def benchmark_model(name, families, batch_size=1000):
+    """Entrenar y perfilar cada familia para un modelo"""
+    spec = MODEL_SPECS[name]
+    df, source = benchmark_dataset(name)
+    X = df[spec['features']].to_numpy(dtype=INFERENCE_DTYPE)
+    y = df[spec['target']].to_numpy()
+    if spec['task'] == 'classification':
+        y = LabelEncoder().fit_transform(y)
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    print(f'\n📊 {name.capitalize()} ({source}, {len(df)} registros)')
+
+    results = []
+    for family in families:
+        model, _ = build_estimator(family, spec['task'], n_jobs=1)
+        started = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - started
+
+        y_pred = model.predict(X_test)
+        metric = r2_score(y_test, y_pred) if spec['task'] == 'regression' else accuracy_score(y_test, y_pred)
+        profile = serving_profile(model, X_test, batch_size=batch_size)
+
+        results.append({
+            'model': name,
+            'family': family,
+            'fit_seconds': fit_seconds,
+            'score': float(metric),
+            **profile
+        })
+        print(f'   {family:<24} fit {fit_seconds:7.2f}s | score {metric:.4f} | '
+              f'{profile["artifact_bytes"] / 1024:9.1f} KB | '
+              f'1 fila p50 {profile["single_row"]["p50_ms"]:.3f} ms p99 {profile["single_row"]["p99_ms"]:.3f} ms | '
+              f'lote {batch_size}: {profile["batch"]["mean_ms"]:.2f} ms')
+    return results
+
+def benchmark_rules(name, family='random_forest', batch_size=1000):
+    """
+    Latencia del modo de reglas frente al modelo aprendido (una fila y lote) y
+    concordancia de ambos con el target en test
+    """
+    spec = MODEL_SPECS[name]
+    df, source = benchmark_dataset(name)
+    X = df[spec['features']].to_numpy(dtype=INFERENCE_DTYPE)
+    labels = df[spec['target']].to_numpy()
+    encoder = LabelEncoder().fit(labels)
+    X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, random_state=42)
+
+    model, _ = build_estimator(family, spec['task'], n_jobs=1)
+    model.fit(X_train, encoder.transform(y_train))
+    evaluate_rule = compile_rule(LABEL_RULES[name], spec['features'])
+    batch = X_test[np.arange(batch_size) % len(X_test)]
+
+    modes = {
+        'rules': (evaluate_rule, evaluate_rule(X_test)),
+        family: (model.predict, encoder.inverse_transform(model.predict(X_test)))
+    }
+    print(f'\n⚖️  {name.capitalize()} ({source}, {len(df)} registros): reglas frente a {family}')
+    results = []
+    for mode, (predict, y_pred) in modes.items():
+        single = measure_latency(predict, X_test[:1], repeats=200)
+        batched = measure_latency(predict, batch, repeats=20)
+        accuracy = float(np.mean(y_pred.astype(str) == y_test.astype(str)))
+        results.append({'model': name, 'mode': mode, 'accuracy': accuracy, 'single_row': single,
+                        'batch': {**batched, 'batch_size': batch_size}})
+        print(f'   {mode:<24} accuracy {accuracy:.4f} | 1 fila p50 {single["p50_ms"]:.4f} ms '
+              f'p99 {single["p99_ms"]:.4f} ms | lote {batch_size}: {batched["mean_ms"]:.3f} ms')
+    speedup = results[1]['single_row']['p50_ms'] / results[0]['single_row']['p50_ms']
+    print(f'   ⚡ Reglas x{speedup:.0f} más rápidas por fila')
+    return results
+
+def benchmark_building_load(family='random_forest', batch_size=1000, n_samples=20000):
+    """
+    Un modelo multi-salida (movilidad + saturación en una pasada) frente a los dos
+    modelos separados que responde /predict/mobility + /predict/saturation:
+    latencia de predict_proba (una fila y lote), accuracy por target y tamaño
+    """
+    from synthetic_data import generate
+
+    spec = MULTI_OUTPUT_SPECS['building_load']
+    snapshot_path = latest_snapshot(spec['dataset'])
+    if snapshot_path is not None:
+        df, source = load_snapshot(snapshot_path), snapshot_path.name
+    else:
+        df, source = generate(spec['dataset'], n_samples, seed=42), 'sintético'
+    # Columnas fijas de los edificios en el modelo de saturación (igual que la API)
+    df = df.assign(popularityScore=0, type=0)
+
+    mobility_target, saturation_target = spec['targets']
+    y = np.column_stack([
+        LabelEncoder().fit_transform(df[mobility_target]),
+        df[saturation_target].to_numpy(dtype=int)
+    ])
+    train, test = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+    inputs = {
+        'mobility': MODEL_SPECS['mobility']['features'],
+        'saturation': MODEL_SPECS['saturation']['features'],
+        'building_load': spec['features']
+    }
+    X = {name: df[features].to_numpy(dtype=INFERENCE_DTYPE) for name, features in inputs.items()}
+
+    models = {}
+    for i, name in enumerate(['mobility', 'saturation']):
+        models[name], _ = build_estimator(family, 'classification', n_jobs=1)
+        models[name].fit(X[name][train], y[train, i])
+    models['building_load'], _ = build_estimator(family, 'classification', n_jobs=1)
+    models['building_load'].fit(X['building_load'][train], y[train])
+
+    def two_models(index):
+        return (models['mobility'].predict_proba(X['mobility'][index]),
+                models['saturation'].predict_proba(X['saturation'][index]))
+
+    def one_model(index):
+        return models['building_load'].predict_proba(X['building_load'][index])
+
+    batch = test[np.arange(batch_size) % len(test)]
+    accuracy = {
+        'two_models': [float(accuracy_score(y[test, i], models[name].predict(X[name][test])))
+                       for i, name in enumerate(['mobility', 'saturation'])],
+        'multi_output': [float(accuracy_score(y[test, i], column))
+                         for i, column in enumerate(models['building_load'].predict(X['building_load'][test]).T)]
+    }
+    paths = {
+        'two_models': (two_models, artifact_size(models['mobility']) + artifact_size(models['saturation'])),
+        'multi_output': (one_model, artifact_size(models['building_load']))
+    }
+
+    print(f'\n🏢 Carga de edificios ({source}, {len(df)} registros): un {family} multi-salida frente a dos')
+    results = []
+    for path, (predict, size) in paths.items():
+        single = measure_latency(predict, test[:1], repeats=200)
+        batched = measure_latency(predict, batch, repeats=20)
+        results.append({'model': 'building_load', 'path': path, 'accuracy': dict(zip(spec['targets'], accuracy[path])),
+                        'artifact_bytes': size, 'single_row': single, 'batch': {**batched, 'batch_size': batch_size}})
+        print(f'   {path:<14} accuracy {accuracy[path][0]:.4f} / {accuracy[path][1]:.4f} | {size / 1024:9.1f} KB | '
+              f'1 fila p50 {single["p50_ms"]:.3f} ms p99 {single["p99_ms"]:.3f} ms | '
+              f'lote {batch_size}: {batched["mean_ms"]:.2f} ms')
+    speedup = results[0]['single_row']['p50_ms'] / results[1]['single_row']['p50_ms']
+    print(f'   ⚡ Multi-salida x{speedup:.2f} por fila')
+    return results
+
+def default_dtypes(df):
+    """Copia con los tipos por defecto de pandas (int64, float64 y object para texto)"""
+    defaults = {}
+    for column, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            defaults[column] = object
+        elif dtype.kind in 'iu':
+            defaults[column] = 'int64'
+        elif dtype.kind == 'f':
+            defaults[column] = 'float64'
+    return df.astype(defaults)
+
+def memory_report(name, n_samples):
+    """Memoria del dataset sintético con tipos por defecto frente al plan de tipos (DTYPE_PLAN)"""
+    compact = synthetic_dataset(name, n_samples)
+    before = default_dtypes(compact).memory_usage(deep=True, index=False)
+    after = compact.memory_usage(deep=True, index=False)
+
+    print(f'\n🧮 {name.capitalize()} ({n_samples} registros sintéticos)')
+    for column in compact.columns:
+        print(f'   {column:<22} {str(compact[column].dtype):<9} '
+              f'{before[column] / 1024 ** 2:8.2f} MB → {after[column] / 1024 ** 2:8.2f} MB')
+    print(f'   {"TOTAL":<32} {before.sum() / 1024 ** 2:8.2f} MB → {after.sum() / 1024 ** 2:8.2f} MB '
+          f'({100 * (1 - after.sum() / before.sum()):.0f}% menos)')
+    return {'model': name, 'rows': n_samples, 'default_bytes': int(before.sum()), 'compact_bytes': int(after.sum())}
+
+def parse_args(argv=None):
+    """Opciones de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Benchmark de familias de estimadores')
+    parser.add_argument('--models', nargs='+', default=list(MODEL_SPECS),
+                        help=f'Modelos a evaluar ({", ".join(MODEL_SPECS)})')
+    parser.add_argument('--families', nargs='+', default=['random_forest', 'hist_gradient_boosting'],
+                        help=f'Familias a comparar ({", ".join(ESTIMATOR_FAMILIES)})')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Filas por lote')
+    parser.add_argument('--json', default=None, help='Guardar los resultados en este archivo JSON')
+    parser.add_argument('--rules', action='store_true',
+                        help='Comparar el modo de reglas exactas con el modelo aprendido '
+                             '(movilidad y saturación; usa la primera familia de --families)')
+    parser.add_argument('--building-load', action='store_true',
+                        help='Comparar el modelo multi-salida de carga de edificios con los modelos '
+                             'de movilidad y saturación por separado (usa la primera familia de --families)')
+    parser.add_argument('--memory-rows', type=int, default=0,
+                        help='Solo reportar la memoria de un dataset sintético de N filas por modelo '
+                             '(tipos por defecto frente al plan de tipos)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    print('⏱️  BENCHMARK DE FAMILIAS DE ESTIMADORES')
+    print('=' * 60)
+
+    results = []
+    if args.building_load:
+        results.extend(benchmark_building_load(args.families[0], args.batch_size))
+    for name in args.models if not args.building_load else []:
+        if args.memory_rows:
+            results.append(memory_report(name, args.memory_rows))
+        elif args.rules:
+            if name in LABEL_RULES:
+                results.extend(benchmark_rules(name, args.families[0], args.batch_size))
+        else:
+            results.extend(benchmark_model(name, args.families, args.batch_size))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\n💾 Resultados guardados en {args.json}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# building_models.py
+"""
+Modelos por edificio: un forest compacto por cada edificio de SELECTED_BUILDINGS,
+guardado en models/buildings/<edificio>/<artefacto>.pkl junto a su metadata
+- train_all_models.py --building-models los entrena a partir del mismo dataset del
+  modelo global (filas de cada buildingId)
+- api.py precarga y calienta los que caben en un caché LRU acotado por memoria
+  (BUILDING_MODELS_CACHE_MB) y carga los demás al primer uso en el threadpool;
+  sin modelo del edificio se usa el global
+"""
+
+import os
+import re
+import json
+import asyncio
+from collections import OrderedDict
+
+import joblib
+from starlette.concurrency import run_in_threadpool
+
+# Filas mínimas de un edificio para entrenar su modelo
+BUILDING_MODEL_MIN_SAMPLES = int(os.getenv('BUILDING_MODEL_MIN_SAMPLES', 200))
+# Tamaño de los forests por edificio (más pequeños que el global)
+BUILDING_MODEL_TREES = int(os.getenv('BUILDING_MODEL_TREES', 50))
+BUILDING_MODEL_MAX_DEPTH = int(os.getenv('BUILDING_MODEL_MAX_DEPTH', 10))
+# Memoria máxima de los modelos por edificio residentes en la API
+BUILDING_MODELS_CACHE_MB = float(os.getenv('BUILDING_MODELS_CACHE_MB', 256))
+
+# Formato de un buildingId (p. ej. E-12): el id forma parte de la ruta del archivo,
+# así que no puede tener separadores de ruta ni '..'
+BUILDING_ID_PATTERN = re.compile(r'[A-Za-z0-9][A-Za-z0-9_-]{0,31}')
+
+def building_model_paths(building, artifact, models_dir='models'):
+    """Rutas del modelo (.pkl) y su metadata (.json) de un edificio"""
+    directory = f'{models_dir}/buildings/{building}'
+    return f'{directory}/{artifact}.pkl', f'{directory}/{artifact}_metadata.json'
+
+def valid_building_id(building):
+    """True si el id tiene el formato de un edificio"""
+    return isinstance(building, str) and BUILDING_ID_PATTERN.fullmatch(building) is not None
+
+def has_building_model(building, artifact, models_dir='models'):
+    """True si el id es válido y el edificio tiene su modelo y su metadata guardados"""
+    return valid_building_id(building) and all(
+        os.path.exists(path) for path in building_model_paths(building, artifact, models_dir)
+    )
+
+def stored_buildings(artifact, models_dir='models'):
+    """Edificios con modelo guardado para el artefacto"""
+    directory = f'{models_dir}/buildings'
+    if not os.path.isdir(directory):
+        return []
+    return sorted(building for building in os.listdir(directory)
+                  if has_building_model(building, artifact, models_dir))
+
+def remove_building_model(building, artifact, models_dir='models'):
+    """Borrar el modelo de un edificio (la API vuelve al global)"""
+    for path in building_model_paths(building, artifact, models_dir):
+        if os.path.exists(path):
+            os.remove(path)
+
+def train_building_models(df, features, target, task, artifact, n_jobs=-1, encoder=None,
+                          models_dir='models', min_samples=None):
+    """
+    Entrenar y guardar un forest compacto por edificio con sus filas de df
+    encoder codifica el target igual que el modelo global (las clases coinciden)
+    Los edificios con menos de min_samples filas no tienen modelo (se borra el anterior)
+    Retorna el resumen por edificio para la metadata del modelo global
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import r2_score, accuracy_score
+    from estimators import build_estimator
+
+    min_samples = min_samples or BUILDING_MODEL_MIN_SAMPLES
+    summary = {}
+    for building, rows in df.groupby(df['buildingId'].astype(str), observed=True):
+        if len(rows) < min_samples:
+            remove_building_model(building, artifact, models_dir)
+            summary[building] = {'n_samples': len(rows), 'trained': False}
+            continue
+
+        y = rows[target] if encoder is None else encoder.transform(rows[target])
+        X_train, X_test, y_train, y_test = train_test_split(rows[features], y, test_size=0.2, random_state=42)
+        model, hyperparameters = build_estimator('random_forest', task, n_jobs,
+                                                 n_estimators=BUILDING_MODEL_TREES,
+                                                 max_depth=BUILDING_MODEL_MAX_DEPTH)
+        model.fit(X_train, y_train)
+        y_pred = model.predict(X_test)
+        score = r2_score(y_test, y_pred) if task == 'regression' else accuracy_score(y_test, y_pred)
+
+        model_path, metadata_path = building_model_paths(building, artifact, models_dir)
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        joblib.dump(model, f'{model_path}.tmp')
+        os.replace(f'{model_path}.tmp', model_path)
+        entry = {
+            'n_samples': len(rows),
+            'trained': True,
+            'score': float(score),
+            'artifact_bytes': os.path.getsize(model_path)
+        }
+        with open(metadata_path, 'w') as f:
+            json.dump({
+                'building': building,
+                'model_type': type(model).__name__,
+                'features': features,
+                'hyperparameters': hyperparameters,
+                **entry
+            }, f, indent=2)
+        summary[building] = entry
+
+    trained = [entry for entry in summary.values() if entry['trained']]
+    print(f'🏢 Modelos por edificio ({artifact}): {len(trained)}/{len(summary)} entrenados, '
+          f'{sum(entry["artifact_bytes"] for entry in trained) / 1024 ** 2:.1f} MB')
+    for building, entry in summary.items():
+        if entry['trained']:
+            print(f'   {building:<8} {entry["n_samples"]:>7} filas | score {entry["score"]:.4f}')
+        else:
+            print(f'   {building:<8} {entry["n_samples"]:>7} filas | sin modelo (mínimo {min_samples})')
+    return summary
+
+def new_cache(max_mb=None):
+    """Caché LRU vacío de modelos por edificio"""
+    return {
+        'entries': OrderedDict(),
+        'loading': {},
+        'bytes': 0,
+        'max_bytes': (BUILDING_MODELS_CACHE_MB if max_mb is None else max_mb) * 1024 ** 2,
+        'hits': 0,
+        'misses': 0,
+        'coalesced': 0,
+        'evictions': 0
+    }
+
+def fits_in_cache(cache, building, artifact, models_dir='models'):
+    """True si el modelo del edificio cabe en el caché sin expulsar a otro"""
+    model_path, _ = building_model_paths(building, artifact, models_dir)
+    return cache['bytes'] + os.path.getsize(model_path) <= cache['max_bytes']
+
+def read_building_model(building, artifact, models_dir='models', warm=None):
+    """
+    Leer del disco (modelo, metadata) del edificio y el tamaño de su .pkl (estimación
+    de su memoria); warm(modelo, metadata) lo calienta antes de entrar al caché
+    Es síncrona: la API la ejecuta en el threadpool
+    """
+    model_path, metadata_path = building_model_paths(building, artifact, models_dir)
+    with open(metadata_path, 'r') as f:
+        metadata = json.load(f)
+    model = joblib.load(model_path)
+    if warm is not None:
+        warm(model, metadata)
+    return (model, metadata), os.path.getsize(model_path)
+
+def store_building_model(cache, key, entry, size):
+    """
+    Guardar un modelo en el caché; al pasar del límite de memoria se descartan los
+    usados hace más tiempo
+    """
+    entries = cache['entries']
+    entries[key] = (entry, size)
+    cache['bytes'] += size
+    while cache['bytes'] > cache['max_bytes'] and len(entries) > 1:
+        _, (_, evicted_size) = entries.popitem(last=False)
+        cache['bytes'] -= evicted_size
+        cache['evictions'] += 1
+
+async def load_into_cache(cache, key, building, artifact, models_dir, warm):
+    """Cargar el modelo en el threadpool y guardarlo en el caché si no se vació mientras tanto"""
+    entries = cache['entries']
+    entry, size = await run_in_threadpool(read_building_model, building, artifact, models_dir, warm)
+    # Una recarga de modelos (/model/reload) reemplaza el caché: el modelo leído antes ya no vale
+    if cache['entries'] is entries:
+        store_building_model(cache, key, entry, size)
+    return entry
+
+def finish_loading(loading, key, task):
+    """Sacar la carga terminada de las pendientes"""
+    if loading.get(key) is task:
+        del loading[key]
+    if not task.cancelled():
+        # Marcar la excepción como leída aunque todas las solicitudes se hayan cancelado
+        task.exception()
+
+async def cached_building_model(cache, building, artifact, models_dir='models', warm=None):
+    """
+    (modelo, metadata) del edificio desde el caché LRU; None si el id no tiene el
+    formato de un edificio o el edificio no tiene modelo guardado
+    En un fallo la lectura (joblib.load y calentamiento) corre en el threadpool sin
+    bloquear el event loop, y las solicitudes concurrentes por el mismo modelo
+    esperan esa misma carga (single-flight) en lugar de leerlo cada una
+    La ausencia no se guarda en el caché: ids arbitrarios no ocupan memoria
+    """
+    key = (artifact, building)
+    entries = cache['entries']
+    if key in entries:
+        cache['hits'] += 1
+        entries.move_to_end(key)
+        return entries[key][0]
+
+    if not has_building_model(building, artifact, models_dir):
+        return None
+
+    loading = cache['loading']
+    task = loading.get(key)
+    if task is None:
+        cache['misses'] += 1
+        task = asyncio.ensure_future(load_into_cache(cache, key, building, artifact, models_dir, warm))
+        loading[key] = task
+        task.add_done_callback(lambda done: finish_loading(loading, key, done))
+    else:
+        cache['coalesced'] += 1
+    return await asyncio.shield(task)
+
+def cache_stats(cache):
+    """Resumen del caché para /model/info"""
+    return {
+        'resident': sorted(f'{artifact}/{building}' for artifact, building in cache['entries']),
+        'resident_mb': round(cache['bytes'] / 1024 ** 2, 2),
+        'max_mb': round(cache['max_bytes'] / 1024 ** 2, 2),
+        'hits': cache['hits'],
+        'misses': cache['misses'],
+        'coalesced': cache['coalesced'],
+        'loading': len(cache['loading']),
+        'evictions': cache['evictions']
+    }
@@ -9,6 +9,8 @@ ML_PORT = int(os.getenv('ML_PORT', 8000))
 ML_HOST = os.getenv('ML_HOST', '0.0.0.0')
 MODELS_DIR = os.getenv('MODELS_DIR', './models')
 DATA_DIR = os.getenv('DATA_DIR', './data')
+# Modo de /predict/mobility y /predict/saturation: 'rules' (reglas exactas de los extractores) o 'learned' (modelo)
+PREDICTION_MODE = os.getenv('PREDICTION_MODE', 'rules')
 
 # Crear directorios si no existen
 os.makedirs(MODELS_DIR, exist_ok=True)
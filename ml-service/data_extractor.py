@@ -3,6 +3,9 @@ import pymongo
 import pandas as pd
 from datetime import datetime, timedelta
 from config import MONGO_URI, DATA_DIR
+from data_extractor_updated import fetch_partitioned
+from snapshots import save_snapshot
+from feature_engineering import apply_dtype_plan
 
 def connect_to_mongodb():
     """Conectar a MongoDB"""
@@ -17,7 +20,7 @@ def connect_to_mongodb():
         print(f'❌ Error conectando a MongoDB: {e}')
         raise
 
-def extract_event_data(days_back=90):
+def extract_event_data(days_back=90, workers=None):
     """
     Extraer datos de eventos para entrenamiento
     Retorna DataFrame con features y target
@@ -27,10 +30,8 @@ def extract_event_data(days_back=90):
     # Fecha límite
     cutoff_date = datetime.now() - timedelta(days=days_back)
     
-    # Obtener analíticas de eventos
-    event_analytics = list(db.event_analytics.find({
-        'date': {'$gte': cutoff_date}
-    }))
+    # Obtener analíticas de eventos (particiones de fecha en paralelo)
+    event_analytics = fetch_partitioned(db.event_analytics, {}, days_back, workers=workers)
     
     # Obtener eventos para más información
     try:
@@ -74,12 +75,12 @@ def extract_event_data(days_back=90):
         
         data.append(row)
     
-    df = pd.DataFrame(data)
+    # Tipos compactos (DTYPE_PLAN); el snapshot los conserva
+    df = apply_dtype_plan(pd.DataFrame(data))
     
-    # Guardar datos extraídos
-    csv_path = f'{DATA_DIR}/event_data_{datetime.now().strftime("%Y%m%d")}.csv'
-    df.to_csv(csv_path, index=False)
-    print(f'✅ Datos extraídos y guardados en {csv_path}')
+    # Guardar datos extraídos (snapshot columnar con hash de contenido)
+    snapshot_path = save_snapshot(df, 'event_data', DATA_DIR)
+    print(f'✅ Datos extraídos y guardados en {snapshot_path}')
     print(f'📊 Total de registros: {len(df)}')
     
     return df
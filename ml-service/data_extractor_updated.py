@@ -7,13 +7,43 @@ Usa datos de MongoDB y archivos GeoJSON modulares
 import pymongo
 import pandas as pd
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from snapshots import save_snapshot, save_snapshot_chunks, read_schema
+from hourly_rollup import ROLLUP_COLLECTION
+from feature_engineering import (
+    DTYPE_PLAN,
+    MOBILITY_DEMAND_RULE,
+    apply_dtype_plan,
+    raw_frame,
+    numeric_column,
+    parse_dates,
+    time_features,
+    peak_hours_matrix,
+    first_peak_hour,
+    peak_hours_total,
+    hourly_spread,
+    rush_visits,
+    hourly_profile_frame,
+    expand_to_hourly,
+    events_per_row,
+    fallback_chain,
+    mobility_demand_labels,
+    saturation_levels
+)
 
 load_dotenv()
 
+# Extracción paralela: número de particiones de fecha leídas a la vez y tamaño de cada una
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', 4))
+EXTRACTION_PARTITION_DAYS = int(os.getenv('EXTRACTION_PARTITION_DAYS', 15))
+
+# Leer la actividad por hora desde los cubos de hourly_rollup.py en lugar de usar hour=12
+USE_HOURLY_ROLLUPS = os.getenv('USE_HOURLY_ROLLUPS', 'false').lower() == 'true'
+
 # Los 13 edificios seleccionados
 SELECTED_BUILDINGS = [
     'E-12', 'E-13', 'E-14', 'E-16', 'E-18', 
@@ -21,6 +51,13 @@ SELECTED_BUILDINGS = [
     'E-26', 'E-27', 'E-27-B'
 ]
 
+# Categorías fijas de las columnas categóricas al extraer por bloques
+# (todos los bloques de un snapshot deben compartir tipo y categorías)
+CHUNK_CATEGORIES = {
+    'buildingId': SELECTED_BUILDINGS,
+    'mobility_demand': MOBILITY_DEMAND_RULE['labels']
+}
+
 def connect_to_mongodb():
     """Conectar a MongoDB"""
     try:
@@ -28,7 +65,8 @@ def connect_to_mongodb():
         if not mongo_uri:
             raise ValueError('MONGO_URI no está definido en .env')
         
-        client = pymongo.MongoClient(mongo_uri)
+        # Un solo cliente por extracción; su pool de conexiones lo comparten los hilos
+        client = pymongo.MongoClient(mongo_uri, maxPoolSize=max(EXTRACTION_WORKERS, 10))
         db = client.get_database()
         client.admin.command('ping')
         print('✅ Conectado a MongoDB')
@@ -37,6 +75,112 @@ def connect_to_mongodb():
         print(f'❌ Error conectando a MongoDB: {e}')
         raise
 
+def date_partitions(start, end, partition_days=None):
+    """
+    Dividir el rango [start, end) en particiones consecutivas de partition_days días
+    La última partición queda abierta (end=None) para no perder documentos posteriores
+    """
+    partition_days = partition_days or EXTRACTION_PARTITION_DAYS
+    step = timedelta(days=max(1, partition_days))
+    
+    partitions = []
+    current = start
+    while current + step < end:
+        partitions.append((current, current + step))
+        current += step
+    partitions.append((current, None))
+    
+    return partitions
+
+def iter_partitioned(collection, query, days_back, date_field='date', workers=None, partition_days=None):
+    """
+    Documentos de cada partición de fecha de la ventana, en orden, consultando como
+    máximo `workers` particiones a la vez con el mismo cliente
+    Solo se retienen en memoria las particiones de la tanda en curso
+    """
+    workers = workers or EXTRACTION_WORKERS
+    # UTC con zona horaria: pymongo interpreta un datetime naive como UTC
+    now = datetime.now(timezone.utc)
+    cutoff_date = now - timedelta(days=days_back)
+    partitions = date_partitions(cutoff_date, now, partition_days)
+    
+    def fetch(bounds):
+        start, end = bounds
+        date_filter = {'$gte': start}
+        if end is not None:
+            date_filter['$lt'] = end
+        return list(collection.find({**query, date_field: date_filter}))
+    
+    if workers <= 1 or len(partitions) == 1:
+        for bounds in partitions:
+            yield fetch(bounds)
+        return
+    
+    with ThreadPoolExecutor(max_workers=min(workers, len(partitions))) as executor:
+        for start in range(0, len(partitions), workers):
+            # map conserva el orden de las particiones aunque terminen en otro orden
+            yield from executor.map(fetch, partitions[start:start + workers])
+
+def fetch_partitioned(collection, query, days_back, date_field='date', workers=None, partition_days=None):
+    """
+    Leer documentos de una colección dividiendo la ventana de fechas en particiones
+    que se consultan en paralelo (como máximo `workers` a la vez) con el mismo cliente.
+    Los resultados se concatenan en el orden de las particiones.
+    """
+    workers = workers or EXTRACTION_WORKERS
+    chunks = list(iter_partitioned(collection, query, days_back, date_field, workers, partition_days))
+    
+    documents = [doc for chunk in chunks for doc in chunk]
+    print(f'   {collection.name}: {len(documents)} documentos en {len(chunks)} particiones ({min(workers, len(chunks))} en paralelo)')
+    return documents
+
+def chunk_dtypes(df):
+    """
+    Forzar los tipos de DTYPE_PLAN (con las categorías de CHUNK_CATEGORIES) para que
+    todos los bloques de un snapshot escrito por partes tengan el mismo esquema
+    """
+    converted = {}
+    for column in df.columns:
+        dtype = DTYPE_PLAN.get(column)
+        if dtype == 'category':
+            converted[column] = pd.Categorical(df[column], categories=CHUNK_CATEGORIES[column])
+        elif dtype is not None:
+            converted[column] = df[column].fillna(0).to_numpy().astype(dtype)
+    return df.assign(**converted)
+
+def extract_in_chunks(collection, query, days_back, name, build_frame, workers=None):
+    """
+    Extraer partición por partición y escribir cada una como bloque del snapshot
+    (save_snapshot_chunks) sin armar el DataFrame completo: la memoria depende del
+    tamaño de una tanda de particiones y no de la ventana
+    build_frame(documentos) arma el DataFrame de una partición
+    Retorna la ruta del snapshot
+    """
+    chunks = (
+        chunk_dtypes(build_frame(documents))
+        for documents in iter_partitioned(collection, query, days_back, workers=workers)
+        if documents
+    )
+    snapshot_path = save_snapshot_chunks(chunks, name)
+    print(f'✅ Datos guardados por bloques en {snapshot_path}')
+    print(f'📊 Total de registros: {read_schema(snapshot_path)["rows"]}')
+    return snapshot_path
+
+def count_events(db, dates, building_ids):
+    """Eventos de cada fila en su edificio y día, con una sola consulta por el rango de fechas"""
+    events = []
+    if dates.notna().any():
+        events = list(db.events.find({
+            'building': {'$in': SELECTED_BUILDINGS},
+            'date': {'$gte': dates.min().to_pydatetime(),
+                     '$lt': (dates.max().normalize() + timedelta(days=1)).to_pydatetime()}
+        }, {'building': 1, 'date': 1}))
+    return events_per_row(
+        dates, building_ids,
+        [event.get('date') for event in events],
+        [event.get('building') for event in events]
+    )
+
 def load_geo_data():
     """Cargar datos geográficos desde archivos modulares"""
     try:
@@ -61,6 +205,14 @@ def load_geo_data():
         print(f'⚠️  Error cargando archivos GeoJSON: {e}')
         return None, None, None
 
+def load_hourly_cubes(db, days_back, workers=None):
+    """Cubos horarios de actividad de los 13 edificios (generados por hourly_rollup.py)"""
+    cubes = fetch_partitioned(db[ROLLUP_COLLECTION], {
+        'resourceType': 'building',
+        'resourceId': {'$in': SELECTED_BUILDINGS}
+    }, days_back, date_field='hour', workers=workers)
+    return raw_frame(cubes, ['resourceId', 'hour', 'viewCount', 'uniqueVisitors'])
+
 def extract_building_data_from_mongo():
     """Extraer datos de edificios desde MongoDB (solo los 13 seleccionados)"""
     db, client = connect_to_mongodb()
@@ -83,208 +235,202 @@ def extract_building_data_from_mongo():
     finally:
         client.close()
 
-def extract_event_data(days_back=90):
+def event_frame(event_analytics):
+    """Filas del modelo de asistencia a partir de analíticas de eventos (operaciones por columna)"""
+    raw = raw_frame(event_analytics, [
+        'date', 'viewCount', 'uniqueVisitors', 'category', 'popularityScore',
+        'actualAttendance', 'attendancePrediction'
+    ])
+    day_of_week, hour = time_features(parse_dates(raw['date']))
+    
+    return pd.DataFrame({
+        'viewCount': numeric_column(raw, 'viewCount'),
+        'uniqueVisitors': numeric_column(raw, 'uniqueVisitors'),
+        'dayOfWeek': day_of_week,
+        'hour': hour,
+        'category_count': raw['category'].str.len().fillna(0).astype(int),
+        'popularityScore': numeric_column(raw, 'popularityScore'),
+        'attendance': fallback_chain(raw, ['actualAttendance', 'attendancePrediction', 'uniqueVisitors'])
+    })
+
+def extract_event_data(days_back=90, workers=None, chunked=False):
     """
     Extraer datos de eventos para entrenamiento
     Solo eventos asociados a los 13 edificios
+    Con chunked=True se escribe el snapshot partición por partición (extract_in_chunks)
+    y se retorna su ruta en lugar del DataFrame
     """
     db, client = connect_to_mongodb()
     
     try:
-        cutoff_date = datetime.now() - timedelta(days=days_back)
-        
-        # Obtener analíticas de eventos asociados a los 13 edificios
-        event_analytics = list(db.event_analytics.find({
-            'date': {'$gte': cutoff_date},
-            'buildingId': {'$in': SELECTED_BUILDINGS}
-        }))
+        # Analíticas de eventos asociados a los 13 edificios
+        query = {'buildingId': {'$in': SELECTED_BUILDINGS}}
+        if chunked:
+            return extract_in_chunks(db.event_analytics, query, days_back, 'event_data', event_frame, workers)
         
+        event_analytics = fetch_partitioned(db.event_analytics, query, days_back, workers=workers)
         print(f'✅ Analíticas de eventos extraídas: {len(event_analytics)}')
         
-        # Preparar datos
-        data = []
-        for analytics in event_analytics:
-            event_date = analytics.get('date')
-            if isinstance(event_date, str):
-                event_date = datetime.fromisoformat(event_date.replace('Z', '+00:00'))
-            
-            if event_date:
-                day_of_week = event_date.weekday()
-                hour = event_date.hour
-            else:
-                day_of_week = 0
-                hour = 12
-            
-            row = {
-                'viewCount': analytics.get('viewCount', 0),
-                'uniqueVisitors': analytics.get('uniqueVisitors', 0),
-                'dayOfWeek': day_of_week,
-                'hour': hour,
-                'category_count': len(analytics.get('category', [])),
-                'popularityScore': analytics.get('popularityScore', 0),
-                'attendance': analytics.get('actualAttendance') or analytics.get('attendancePrediction') or analytics.get('uniqueVisitors', 0)
-            }
-            
-            data.append(row)
-        
-        df = pd.DataFrame(data)
-        
-        # Guardar datos extraídos
-        data_dir = Path(__file__).parent / 'data'
-        data_dir.mkdir(exist_ok=True)
-        csv_path = data_dir / f'event_data_{datetime.now().strftime("%Y%m%d")}.csv'
-        df.to_csv(csv_path, index=False)
-        
-        print(f'✅ Datos guardados en {csv_path}')
+        # Tipos compactos (DTYPE_PLAN) antes de guardar: el snapshot los conserva
+        df = apply_dtype_plan(event_frame(event_analytics))
+        snapshot_path = save_snapshot(df, 'event_data')
+        
+        print(f'✅ Datos guardados en {snapshot_path}')
         print(f'📊 Total de registros: {len(df)}')
         
         return df
     finally:
         client.close()
 
-def extract_mobility_data(days_back=90):
+def mobility_frame(db, building_analytics, hourly_profile=False, cubes=None):
+    """
+    Filas del modelo de movilidad a partir de analíticas de edificios
+    Con cubes (cubos horarios) se genera una fila por edificio y hora
+    """
+    raw = raw_frame(building_analytics, [
+        'buildingId', 'date', 'viewCount', 'uniqueVisitors', 'peakHours', 'averageViewDuration'
+    ])
+    dates = parse_dates(raw['date'])
+    day_of_week, _ = time_features(dates)
+    hourly = peak_hours_matrix(raw['peakHours'])
+    
+    # Contar eventos en cada edificio y día con una sola consulta
+    events_count = count_events(db, dates, raw['buildingId'])
+    
+    view_count = numeric_column(raw, 'viewCount')
+    unique_visitors = numeric_column(raw, 'uniqueVisitors')
+    
+    df = pd.DataFrame({
+        'buildingId': raw['buildingId'],
+        'viewCount': view_count,
+        'uniqueVisitors': unique_visitors,
+        'dayOfWeek': day_of_week,
+        'hour': 12,  # Usar mediodía como referencia
+        'peakHour': first_peak_hour(raw['peakHours']),
+        'eventsCount': events_count,
+        'averageViewDuration': numeric_column(raw, 'averageViewDuration'),
+        'peakHourSpread': hourly_spread(hourly),
+        'rushVisits': rush_visits(hourly),
+        # Demanda basada en métricas
+        'mobility_demand': mobility_demand_labels(view_count, unique_visitors, events_count)
+    })
+    if hourly_profile:
+        df = pd.concat([df, hourly_profile_frame(hourly)], axis=1)
+    
+    if cubes is not None:
+        # Vistas y visitantes reales por hora; la demanda es la del día (expand_to_hourly)
+        df = expand_to_hourly(df, dates.dt.normalize(), cubes)
+    return df
+
+def extract_mobility_data(days_back=90, workers=None, hourly_profile=False, use_hourly=None, chunked=False):
     """
     Extraer datos de movilidad para los 13 edificios
+    Con hourly_profile=True se agregan las 24 columnas visits_hXX del perfil horario
+    Con use_hourly=True (o USE_HOURLY_ROLLUPS) se genera una fila por edificio y hora
+    a partir de los cubos horarios (las etiquetas son las del día)
+    Con chunked=True se escribe el snapshot partición por partición (extract_in_chunks)
+    y se retorna su ruta en lugar del DataFrame
     """
     db, client = connect_to_mongodb()
     
     try:
-        cutoff_date = datetime.now() - timedelta(days=days_back)
+        cubes = load_hourly_cubes(db, days_back, workers) if (USE_HOURLY_ROLLUPS if use_hourly is None else use_hourly) else None
         
-        # Obtener analíticas solo de los 13 edificios
-        building_analytics = list(db.building_analytics.find({
-            'date': {'$gte': cutoff_date},
-            'buildingId': {'$in': SELECTED_BUILDINGS}
-        }))
+        # Analíticas solo de los 13 edificios
+        query = {'buildingId': {'$in': SELECTED_BUILDINGS}}
+        if chunked:
+            return extract_in_chunks(db.building_analytics, query, days_back, 'mobility_data',
+                                     lambda documents: mobility_frame(db, documents, hourly_profile, cubes), workers)
         
+        building_analytics = fetch_partitioned(db.building_analytics, query, days_back, workers=workers)
         print(f'✅ Analíticas de movilidad extraídas: {len(building_analytics)}')
         
-        data = []
-        for analytics in building_analytics:
-            # Calcular hora pico
-            peak_hours = analytics.get('peakHours', [])
-            peak_hour = 12  # Default
-            if peak_hours and len(peak_hours) > 0:
-                max_peak = max(peak_hours, key=lambda x: x.get('count', 0))
-                peak_hour = max_peak.get('hour', 12)
-            
-            # Contar eventos en ese edificio ese día
-            date = analytics.get('date')
-            building_id = analytics.get('buildingId')
-            
-            events_count = 0
-            if date and building_id:
-                events_count = db.events.count_documents({
-                    'building': building_id,
-                    'date': {
-                        '$gte': date,
-                        '$lt': datetime.combine(date, datetime.max.time())
-                    }
-                })
-            
-            # Calcular demanda basada en métricas
-            view_count = analytics.get('viewCount', 0)
-            unique_visitors = analytics.get('uniqueVisitors', 0)
-            score = (view_count * 0.4) + (unique_visitors * 0.3) + (events_count * 10)
-            
-            if score > 100:
-                demand = 'Alta'
-            elif score > 50:
-                demand = 'Media'
-            else:
-                demand = 'Baja'
-            
-            row = {
-                'buildingId': building_id,
-                'viewCount': view_count,
-                'uniqueVisitors': unique_visitors,
-                'dayOfWeek': analytics.get('date').weekday() if analytics.get('date') else 0,
-                'hour': 12,  # Usar mediodía como referencia
-                'peakHour': peak_hour,
-                'eventsCount': events_count,
-                'averageViewDuration': analytics.get('averageViewDuration', 0),
-                'mobility_demand': demand
-            }
-            
-            data.append(row)
-        
-        df = pd.DataFrame(data)
-        
-        # Guardar datos
-        data_dir = Path(__file__).parent / 'data'
-        data_dir.mkdir(exist_ok=True)
-        csv_path = data_dir / f'mobility_data_{datetime.now().strftime("%Y%m%d")}.csv'
-        df.to_csv(csv_path, index=False)
-        
-        print(f'✅ Datos de movilidad guardados en {csv_path}')
+        df = mobility_frame(db, building_analytics, hourly_profile, cubes)
+        if cubes is not None:
+            print(f'✅ Filas horarias desde {ROLLUP_COLLECTION}: {len(df)}')
+        
+        # Tipos compactos (DTYPE_PLAN) antes de guardar: el snapshot los conserva
+        df = apply_dtype_plan(df)
+        snapshot_path = save_snapshot(df, 'mobility_data')
+        
+        print(f'✅ Datos de movilidad guardados en {snapshot_path}')
         print(f'📊 Total de registros: {len(df)}')
         
         return df
     finally:
         client.close()
 
-def extract_saturation_data(days_back=90):
+def saturation_frame(building_analytics, hourly_profile=False, cubes=None):
+    """
+    Filas del modelo de saturación a partir de analíticas de edificios
+    Con cubes (cubos horarios) se genera una fila por edificio y hora
+    """
+    raw = raw_frame(building_analytics, [
+        'buildingId', 'date', 'viewCount', 'uniqueVisitors', 'peakHours', 'averageViewDuration'
+    ])
+    dates = parse_dates(raw['date'])
+    day_of_week, _ = time_features(dates)
+    hourly = peak_hours_matrix(raw['peakHours'])
+    
+    view_count = numeric_column(raw, 'viewCount')
+    unique_visitors = numeric_column(raw, 'uniqueVisitors')
+    total_peak_visits = peak_hours_total(raw['peakHours'])
+    
+    df = pd.DataFrame({
+        'buildingId': raw['buildingId'],
+        'viewCount': view_count,
+        'uniqueVisitors': unique_visitors,
+        'dayOfWeek': day_of_week,
+        'hour': 12,
+        'peakVisits': total_peak_visits,
+        'averageViewDuration': numeric_column(raw, 'averageViewDuration'),
+        'popularityScore': 0,  # No aplica para edificios
+        'type': 0,  # 0 = Edificio
+        'peakHourSpread': hourly_spread(hourly),
+        'rushVisits': rush_visits(hourly),
+        # 3=Alta, 2=Media, 1=Baja, 0=Normal
+        'saturationLevel': saturation_levels(view_count, unique_visitors, total_peak_visits)
+    })
+    if hourly_profile:
+        df = pd.concat([df, hourly_profile_frame(hourly)], axis=1)
+    
+    if cubes is not None:
+        # Vistas y visitantes reales por hora; el nivel es el del día (expand_to_hourly)
+        df = expand_to_hourly(df, dates.dt.normalize(), cubes)
+    return df
+
+def extract_saturation_data(days_back=90, workers=None, hourly_profile=False, use_hourly=None, chunked=False):
     """
     Extraer datos de saturación para los 13 edificios
+    Con hourly_profile=True se agregan las 24 columnas visits_hXX del perfil horario
+    Con use_hourly=True (o USE_HOURLY_ROLLUPS) se genera una fila por edificio y hora
+    a partir de los cubos horarios (las etiquetas son las del día)
+    Con chunked=True se escribe el snapshot partición por partición (extract_in_chunks)
+    y se retorna su ruta en lugar del DataFrame
     """
     db, client = connect_to_mongodb()
     
     try:
-        cutoff_date = datetime.now() - timedelta(days=days_back)
+        cubes = load_hourly_cubes(db, days_back, workers) if (USE_HOURLY_ROLLUPS if use_hourly is None else use_hourly) else None
         
         # Analíticas de edificios
-        building_analytics = list(db.building_analytics.find({
-            'date': {'$gte': cutoff_date},
-            'buildingId': {'$in': SELECTED_BUILDINGS}
-        }))
+        query = {'buildingId': {'$in': SELECTED_BUILDINGS}}
+        if chunked:
+            return extract_in_chunks(db.building_analytics, query, days_back, 'saturation_data',
+                                     lambda documents: saturation_frame(documents, hourly_profile, cubes), workers)
         
+        building_analytics = fetch_partitioned(db.building_analytics, query, days_back, workers=workers)
         print(f'✅ Analíticas para saturación extraídas: {len(building_analytics)}')
         
-        data = []
-        for analytics in building_analytics:
-            # Calcular suma de peak visits
-            peak_hours = analytics.get('peakHours', [])
-            peak_visits = sum(ph.get('count', 0) for ph in peak_hours)
-            
-            view_count = analytics.get('viewCount', 0)
-            unique_visitors = analytics.get('uniqueVisitors', 0)
-            
-            # Calcular nivel de saturación
-            score = (view_count * 0.3) + (unique_visitors * 0.2) + (peak_visits * 0.5)
-            
-            if score > 150:
-                saturation = 3  # Alta
-            elif score > 100:
-                saturation = 2  # Media
-            elif score > 50:
-                saturation = 1  # Baja
-            else:
-                saturation = 0  # Normal
-            
-            row = {
-                'buildingId': analytics.get('buildingId'),
-                'viewCount': view_count,
-                'uniqueVisitors': unique_visitors,
-                'dayOfWeek': analytics.get('date').weekday() if analytics.get('date') else 0,
-                'hour': 12,
-                'peakVisits': peak_visits,
-                'averageViewDuration': analytics.get('averageViewDuration', 0),
-                'popularityScore': 0,  # No aplica para edificios
-                'type': 0,  # 0 = Edificio
-                'saturationLevel': saturation
-            }
-            
-            data.append(row)
-        
-        df = pd.DataFrame(data)
-        
-        # Guardar datos
-        data_dir = Path(__file__).parent / 'data'
-        data_dir.mkdir(exist_ok=True)
-        csv_path = data_dir / f'saturation_data_{datetime.now().strftime("%Y%m%d")}.csv'
-        df.to_csv(csv_path, index=False)
-        
-        print(f'✅ Datos de saturación guardados en {csv_path}')
+        df = saturation_frame(building_analytics, hourly_profile, cubes)
+        if cubes is not None:
+            print(f'✅ Filas horarias desde {ROLLUP_COLLECTION}: {len(df)}')
+        
+        # Tipos compactos (DTYPE_PLAN) antes de guardar: el snapshot los conserva
+        df = apply_dtype_plan(df)
+        snapshot_path = save_snapshot(df, 'saturation_data')
+        
+        print(f'✅ Datos de saturación guardados en {snapshot_path}')
         print(f'📊 Total de registros: {len(df)}')
         print(f'📈 Distribución de saturación:')
         print(df['saturationLevel'].value_counts())
@@ -293,6 +439,81 @@ def extract_saturation_data(days_back=90):
     finally:
         client.close()
 
+def building_load_frame(db, building_analytics, cubes=None):
+    """
+    Filas del modelo multi-salida a partir de analíticas de edificios, con ambas
+    etiquetas calculadas con las reglas de mobility_frame y saturation_frame
+    Con cubes (cubos horarios) se genera una fila por edificio y hora
+    """
+    raw = raw_frame(building_analytics, [
+        'buildingId', 'date', 'viewCount', 'uniqueVisitors', 'peakHours', 'averageViewDuration'
+    ])
+    dates = parse_dates(raw['date'])
+    day_of_week, _ = time_features(dates)
+    hourly = peak_hours_matrix(raw['peakHours'])
+    
+    # Contar eventos en cada edificio y día con una sola consulta
+    events_count = count_events(db, dates, raw['buildingId'])
+    
+    df = pd.DataFrame({
+        'buildingId': raw['buildingId'],
+        'viewCount': numeric_column(raw, 'viewCount'),
+        'uniqueVisitors': numeric_column(raw, 'uniqueVisitors'),
+        'dayOfWeek': day_of_week,
+        'hour': 12,
+        'peakHour': first_peak_hour(raw['peakHours']),
+        'eventsCount': events_count,
+        'averageViewDuration': numeric_column(raw, 'averageViewDuration'),
+        'peakVisits': peak_hours_total(raw['peakHours']),
+        'peakHourSpread': hourly_spread(hourly),
+        'rushVisits': rush_visits(hourly)
+    })
+    
+    # Etiquetas con los totales del día, antes de expandir a filas por hora
+    df['mobility_demand'] = mobility_demand_labels(df['viewCount'], df['uniqueVisitors'], df['eventsCount'])
+    df['saturationLevel'] = saturation_levels(df['viewCount'], df['uniqueVisitors'], df['peakVisits'])
+    
+    if cubes is not None:
+        df = expand_to_hourly(df, dates.dt.normalize(), cubes)
+    return df
+
+def extract_building_load_data(days_back=90, workers=None, use_hourly=None, chunked=False):
+    """
+    Extraer el dataset del modelo multi-salida de carga de edificios: las features
+    de movilidad y saturación de cada analítica en una sola fila, con ambas etiquetas
+    (mobility_demand y saturationLevel) calculadas con las mismas reglas
+    Con use_hourly=True (o USE_HOURLY_ROLLUPS) se genera una fila por edificio y hora
+    (las etiquetas son las del día)
+    Con chunked=True se escribe el snapshot partición por partición (extract_in_chunks)
+    y se retorna su ruta en lugar del DataFrame
+    """
+    db, client = connect_to_mongodb()
+    
+    try:
+        cubes = load_hourly_cubes(db, days_back, workers) if (USE_HOURLY_ROLLUPS if use_hourly is None else use_hourly) else None
+        
+        query = {'buildingId': {'$in': SELECTED_BUILDINGS}}
+        if chunked:
+            return extract_in_chunks(db.building_analytics, query, days_back, 'building_load_data',
+                                     lambda documents: building_load_frame(db, documents, cubes), workers)
+        
+        building_analytics = fetch_partitioned(db.building_analytics, query, days_back, workers=workers)
+        print(f'✅ Analíticas de carga de edificios extraídas: {len(building_analytics)}')
+        
+        df = building_load_frame(db, building_analytics, cubes)
+        if cubes is not None:
+            print(f'✅ Filas horarias desde {ROLLUP_COLLECTION}: {len(df)}')
+        
+        df = apply_dtype_plan(df)
+        snapshot_path = save_snapshot(df, 'building_load_data')
+        
+        print(f'✅ Datos de carga de edificios guardados en {snapshot_path}')
+        print(f'📊 Total de registros: {len(df)}')
+        
+        return df
+    finally:
+        client.close()
+
 def verify_data_quality():
     """Verificar la calidad de los datos extraídos"""
     print('\n🔍 VERIFICACIÓN DE CALIDAD DE DATOS')
@@ -0,0 +1,96 @@
+# degradation.py
+"""
+Degradación a los modelos sustitutos (surrogate.py) bajo carga
+Cada modelo pasa a responder con su árbol sustituto cuando su cola de admisión
+supera DEGRADE_QUEUE_DEPTH o el p95 reciente de sus predicciones (espera en cola +
+cálculo) supera DEGRADE_P95_MS, y vuelve al modelo principal cuando ambos bajan de
+DEGRADE_RECOVERY veces el umbral (histéresis: evita alternar en cada solicitud)
+Solo cuentan las latencias de los últimos DEGRADE_WINDOW_S segundos: mientras el
+modelo está degradado no llegan latencias nuevas, y al vencer la ventana se vuelve
+a probar el modelo principal
+"""
+
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+# Solicitudes en cola de admisión a partir de las que se degrada
+DEGRADE_QUEUE_DEPTH = int(os.getenv('DEGRADE_QUEUE_DEPTH', 8))
+# p95 reciente (ms) a partir del que se degrada
+DEGRADE_P95_MS = float(os.getenv('DEGRADE_P95_MS', 250))
+# Fracción de ambos umbrales bajo la que se vuelve al modelo principal
+DEGRADE_RECOVERY = float(os.getenv('DEGRADE_RECOVERY', 0.5))
+# Antigüedad máxima de las latencias consideradas
+DEGRADE_WINDOW_S = float(os.getenv('DEGRADE_WINDOW_S', 10))
+
+# Latencias recientes por modelo usadas para el p95
+LATENCY_SAMPLES = 200
+
+# Estado por modelo: degradado o no, latencias (instante, ms) y contadores
+states = {}
+
+def state(name):
+    """Estado de degradación del modelo (se crea al primer uso)"""
+    if name not in states:
+        states[name] = {
+            'degraded': False,
+            'latencies': deque(maxlen=LATENCY_SAMPLES),
+            'switches': 0,
+            'served': {'primary': 0, 'surrogate': 0}
+        }
+    return states[name]
+
+def record_latency(name, elapsed_ms):
+    """Registrar la latencia de una predicción del modelo principal"""
+    state(name)['latencies'].append((time.monotonic(), elapsed_ms))
+
+def recent_p95(name):
+    """p95 (ms) de las latencias dentro de la ventana; 0 sin latencias recientes"""
+    horizon = time.monotonic() - DEGRADE_WINDOW_S
+    recent = [elapsed for recorded, elapsed in state(name)['latencies'] if recorded >= horizon]
+    return float(np.percentile(recent, 95)) if recent else 0.0
+
+def is_degraded(name, queue_depth):
+    """
+    Decidir si el modelo responde con su sustituto, dada la profundidad actual de
+    su cola de admisión
+    """
+    current = state(name)
+    p95 = recent_p95(name)
+    if current['degraded']:
+        recovered = (queue_depth <= DEGRADE_QUEUE_DEPTH * DEGRADE_RECOVERY
+                     and p95 <= DEGRADE_P95_MS * DEGRADE_RECOVERY)
+        if recovered:
+            current['degraded'] = False
+            current['switches'] += 1
+            print(f'🟢 {name}: carga normal (cola {queue_depth}, p95 {p95:.0f} ms); vuelve el modelo principal')
+    elif queue_depth > DEGRADE_QUEUE_DEPTH or p95 > DEGRADE_P95_MS:
+        current['degraded'] = True
+        current['switches'] += 1
+        print(f'🟠 {name}: carga alta (cola {queue_depth}, p95 {p95:.0f} ms); responde el modelo sustituto')
+    return current['degraded']
+
+def count_served(name, served_by):
+    """Contar qué modelo respondió ('primary' o 'surrogate')"""
+    state(name)['served'][served_by] += 1
+
+def degradation_stats():
+    """Umbrales y estado por modelo para /health"""
+    stats = {
+        'thresholds': {
+            'queue_depth': DEGRADE_QUEUE_DEPTH,
+            'p95_ms': DEGRADE_P95_MS,
+            'recovery': DEGRADE_RECOVERY,
+            'window_s': DEGRADE_WINDOW_S
+        }
+    }
+    for name, current in states.items():
+        stats[name] = {
+            'degraded': current['degraded'],
+            'recent_p95_ms': round(recent_p95(name), 3),
+            'switches': current['switches'],
+            'served': dict(current['served'])
+        }
+    return stats
@@ -0,0 +1,181 @@
+# estimators.py
+"""
+Familias de estimadores disponibles para los modelos
+Cada familia define la clase y los hiperparámetros por defecto para regresión y
+clasificación, de modo que los scripts de entrenamiento elijan la familia por
+modelo (MODEL_FAMILY / MODEL_FAMILY_<MODELO>) sin cambiar su código
+"""
+
+import os
+import json
+
+DEFAULT_FAMILY = os.getenv('MODEL_FAMILY', 'random_forest')
+
+# Configuraciones elegidas por tune_models.py
+TUNED_HYPERPARAMETERS_PATH = 'models/tuned_hyperparameters.json'
+
+ESTIMATOR_FAMILIES = {
+    'random_forest': {
+        'regression': ('sklearn.ensemble', 'RandomForestRegressor', {
+            'n_estimators': 200,
+            'max_depth': 15,
+            'random_state': 42,
+            'min_samples_split': 4,
+            'min_samples_leaf': 2,
+            'max_features': 'sqrt'
+        }),
+        'classification': ('sklearn.ensemble', 'RandomForestClassifier', {
+            'n_estimators': 200,
+            'max_depth': 15,
+            'random_state': 42,
+            'class_weight': 'balanced',
+            'min_samples_split': 4,
+            'min_samples_leaf': 2,
+            'max_features': 'sqrt'
+        }),
+        'parallel': True,
+        'multi_output': True  # Un solo forest predice varios targets (building_load)
+    },
+    # Gradient boosting sobre features discretizadas en histogramas (máx. 255 bins)
+    'hist_gradient_boosting': {
+        'regression': ('sklearn.ensemble', 'HistGradientBoostingRegressor', {
+            'max_iter': 200,
+            'learning_rate': 0.1,
+            'max_leaf_nodes': 31,
+            'min_samples_leaf': 20,
+            'l2_regularization': 0.0,
+            'random_state': 42
+        }),
+        'classification': ('sklearn.ensemble', 'HistGradientBoostingClassifier', {
+            'max_iter': 200,
+            'learning_rate': 0.1,
+            'max_leaf_nodes': 31,
+            'min_samples_leaf': 20,
+            'l2_regularization': 0.0,
+            'class_weight': 'balanced',
+            'random_state': 42
+        }),
+        'parallel': False  # Usa hilos OpenMP propios, no acepta n_jobs
+    },
+    'linear': {
+        'regression': ('sklearn.linear_model', 'LinearRegression', {}),
+        'classification': ('sklearn.linear_model', 'LogisticRegression', {
+            'random_state': 42,
+            'max_iter': 1000
+        }),
+        'parallel': False
+    },
+    # Modelos lineales por descenso de gradiente; admiten partial_fit para entrenar
+    # por bloques en modo out-of-core (train_all_models.py --out-of-core)
+    'sgd': {
+        'regression': ('sklearn.linear_model', 'SGDRegressor', {
+            'alpha': 0.0001,
+            'penalty': 'l2',
+            'random_state': 42
+        }),
+        'classification': ('sklearn.linear_model', 'SGDClassifier', {
+            'loss': 'log_loss',
+            'alpha': 0.0001,
+            'penalty': 'l2',
+            'random_state': 42
+        }),
+        'parallel': False,
+        'incremental': True,
+        'scaled': True  # Se entrena detrás de un StandardScaler
+    }
+}
+
+def explicit_family(model_name, overrides=None):
+    """Familia fijada explícitamente (override o MODEL_FAMILY_<MODELO>), o None"""
+    overrides = overrides or {}
+    family = (overrides.get(model_name) or overrides.get('*')
+              or os.getenv(f'MODEL_FAMILY_{model_name.upper()}'))
+    if family and family not in ESTIMATOR_FAMILIES:
+        raise ValueError(f'Familia de modelo desconocida: {family} (opciones: {", ".join(ESTIMATOR_FAMILIES)})')
+    return family
+
+def resolve_family(model_name, overrides=None):
+    """
+    Familia a usar para un modelo: override explícito, luego MODEL_FAMILY_<MODELO>,
+    luego la familia elegida por tune_models.py, luego MODEL_FAMILY (por defecto random_forest)
+    """
+    family = explicit_family(model_name, overrides) or tuned_family(model_name) or DEFAULT_FAMILY
+    if family not in ESTIMATOR_FAMILIES:
+        raise ValueError(f'Familia de modelo desconocida: {family} (opciones: {", ".join(ESTIMATOR_FAMILIES)})')
+    return family
+
+def candidate_families(model_name, overrides=None):
+    """
+    Familias a evaluar al entrenar: solo la fijada explícitamente, o la preferida
+    (ajustada o MODEL_FAMILY) seguida del resto de familias registradas
+    """
+    family = explicit_family(model_name, overrides)
+    if family:
+        return [family]
+    preferred = resolve_family(model_name)
+    return [preferred] + [name for name in ESTIMATOR_FAMILIES if name != preferred]
+
+def build_estimator(family, task, n_jobs=-1, **params):
+    """
+    Crear un estimador de la familia y tarea indicadas
+    Retorna (estimador, hiperparámetros usados)
+    """
+    import importlib
+
+    module_name, class_name, defaults = ESTIMATOR_FAMILIES[family][task]
+    hyperparameters = {**defaults, **params}
+    estimator_class = getattr(importlib.import_module(module_name), class_name)
+
+    if ESTIMATOR_FAMILIES[family]['parallel']:
+        estimator = estimator_class(n_jobs=n_jobs, **hyperparameters)
+    else:
+        estimator = estimator_class(**hyperparameters)
+
+    if ESTIMATOR_FAMILIES[family].get('scaled'):
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+        estimator = Pipeline([('scaler', StandardScaler()), ('model', estimator)])
+    return estimator, hyperparameters
+
+def is_incremental(family):
+    """True si la familia se puede entrenar por bloques con partial_fit"""
+    return ESTIMATOR_FAMILIES[family].get('incremental', False)
+
+def is_multi_output(family):
+    """True si la familia predice varios targets con un solo estimador"""
+    return ESTIMATOR_FAMILIES[family].get('multi_output', False)
+
+def read_tuned_hyperparameters(path=TUNED_HYPERPARAMETERS_PATH):
+    """Resultados de tune_models.py por modelo ({} si no se ha ejecutado)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def tuned_family(model_name):
+    """Familia elegida por tune_models.py para el modelo, o None"""
+    return read_tuned_hyperparameters().get(model_name, {}).get('family')
+
+def load_tuned_hyperparameters(model_name, family, path=TUNED_HYPERPARAMETERS_PATH):
+    """
+    Configuración ajustada por tune_models.py para el modelo, o None si no existe
+    o si se eligió para otra familia
+    """
+    tuned = read_tuned_hyperparameters(path).get(model_name)
+    if not tuned or tuned.get('family') != family:
+        return None
+    return tuned
+
+def parse_family_overrides(values):
+    """
+    Convertir ['attendance=hist_gradient_boosting', 'linear'] en un dict por modelo
+    Un valor sin '=' aplica a todos los modelos (clave '*')
+    """
+    overrides = {}
+    for value in values or []:
+        name, _, family = value.partition('=')
+        if family:
+            overrides[name] = family
+        else:
+            overrides['*'] = name
+    return overrides
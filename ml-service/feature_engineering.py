@@ -0,0 +1,355 @@
+# feature_engineering.py
+"""
+Ingeniería de features vectorizada sobre DataFrames crudos de analíticas
+Calcula fechas, horas pico, visitas pico y etiquetas con operaciones de columna
+(NumPy/pandas) en lugar de recorrer los documentos uno por uno
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+SATURATION_LABELS = {0: 'Normal', 1: 'Baja', 2: 'Media', 3: 'Alta'}
+
+HOURS_PER_DAY = 24
+HOURLY_PROFILE_COLUMNS = [f'visits_h{hour:02d}' for hour in range(HOURS_PER_DAY)]
+
+# Franjas de hora punta [inicio, fin): entrada, comida y salida
+RUSH_WINDOWS = [(7, 10), (13, 15), (18, 20)]
+
+# Reglas de etiquetado de los extractores: score ponderado de columnas y cortes
+# crecientes (cada corte superado sube un nivel de rule['labels'])
+MOBILITY_DEMAND_RULE = {
+    'weights': {'viewCount': 0.4, 'uniqueVisitors': 0.3, 'eventsCount': 10},
+    'cuts': np.array([50.0, 100.0]),
+    'labels': ['Baja', 'Media', 'Alta']
+}
+SATURATION_RULE = {
+    'weights': {'viewCount': 0.3, 'uniqueVisitors': 0.2, 'peakVisits': 0.5},
+    'cuts': np.array([50.0, 100.0, 150.0]),
+    'labels': [0, 1, 2, 3]
+}
+
+# Tipo compacto de cada columna conocida (features, targets y perfil horario)
+DTYPE_PLAN = {
+    'viewCount': 'int32',
+    'uniqueVisitors': 'int32',
+    'eventsCount': 'int32',
+    'peakVisits': 'int32',
+    'rushVisits': 'int32',
+    'mobilityDemand': 'int32',
+    'dayOfWeek': 'uint8',
+    'hour': 'uint8',
+    'peakHour': 'uint8',
+    'category_count': 'uint8',
+    'type': 'uint8',
+    'saturationLevel': 'uint8',
+    'averageViewDuration': 'float32',
+    'popularityScore': 'float32',
+    'peakHourSpread': 'float32',
+    'attendance': 'float32',
+    'buildingId': 'category',
+    'mobility_demand': 'category',
+    **{column: 'int32' for column in HOURLY_PROFILE_COLUMNS}
+}
+
+# Tipo de las matrices de features para inferencia (los árboles de sklearn trabajan en float32)
+INFERENCE_DTYPE = np.float32
+
+def fits_dtype(values, dtype):
+    """True si todos los valores se pueden representar en dtype sin desbordar ni perder enteros"""
+    values = np.asarray(values)
+    if len(values) == 0:
+        return True
+    if np.issubdtype(dtype, np.integer):
+        if values.dtype.kind not in 'iuf' or (values.dtype.kind == 'f' and not np.all(np.mod(values, 1) == 0)):
+            return False
+        info = np.iinfo(dtype)
+        return bool(values.min() >= info.min and values.max() <= info.max)
+    if np.issubdtype(dtype, np.floating):
+        return values.dtype.kind in 'iuf' and bool(np.all(np.abs(values[np.isfinite(values)]) <= np.finfo(dtype).max))
+    return True
+
+def apply_dtype_plan(df, plan=None):
+    """
+    Convertir las columnas del DataFrame a los tipos compactos de DTYPE_PLAN
+    Las columnas fuera del plan, o cuyos valores no caben en el tipo (desborde,
+    decimales o faltantes en un entero), se dejan como están
+    """
+    plan = DTYPE_PLAN if plan is None else plan
+    converted = {}
+    for column, dtype in plan.items():
+        if column not in df.columns or str(df[column].dtype) == dtype:
+            continue
+        if dtype == 'category':
+            converted[column] = df[column].astype('category')
+        elif not df[column].isna().any() and fits_dtype(df[column].to_numpy(), np.dtype(dtype)):
+            converted[column] = df[column].to_numpy().astype(dtype)
+    return df.assign(**converted) if converted else df
+
+def feature_array(values, features):
+    """Matriz (1, n_features) para inferencia con los valores en el orden del modelo"""
+    return np.array([[values[feature] for feature in features]], dtype=INFERENCE_DTYPE)
+
+def feature_matrix(rows, features):
+    """Matriz (filas, n_features) para inferencia por lote, una fila por dict de valores"""
+    return np.array([[values[feature] for feature in features] for values in rows], dtype=INFERENCE_DTYPE)
+
+def raw_frame(documents, columns):
+    """
+    Convertir documentos de MongoDB en un DataFrame columnar
+    Garantiza que existan todas las columnas pedidas (NaN si faltan)
+    """
+    df = pd.DataFrame(documents)
+    return df.reindex(columns=columns)
+
+def numeric_column(raw, column, default=0):
+    """Columna numérica con valores faltantes reemplazados por default"""
+    values = pd.to_numeric(raw[column], errors='coerce').fillna(default)
+    # Conservar enteros cuando la columna solo tenía enteros (NaN la convierte en float)
+    if values.dtype.kind == 'f' and np.all(np.mod(values.to_numpy(), 1) == 0):
+        values = values.astype('int64')
+    return values
+
+def parse_dates(values):
+    """
+    Convertir fechas (datetime o texto ISO, con 'Z' opcional) a datetime64
+    Las fechas inválidas o faltantes quedan como NaT, igual que otros tipos (números:
+    pandas los interpretaría como AAAAMMDD o como época)
+    """
+    values = pd.Series(values, dtype=object)
+    values = values.where(values.map(lambda value: isinstance(value, (str, datetime))), None)
+    dates = pd.to_datetime(values, errors='coerce', utc=True, format='ISO8601')
+    return dates.dt.tz_localize(None)
+
+def time_features(dates, default_day=0, default_hour=12):
+    """Día de la semana (0=Lunes) y hora, con valores por defecto donde no hay fecha"""
+    day_of_week = dates.dt.weekday.fillna(default_day).astype(int)
+    hour = dates.dt.hour.fillna(default_hour).astype(int)
+    return day_of_week, hour
+
+def explode_peak_hours(peak_hours):
+    """
+    Aplanar la lista irregular de {hour, count} en un DataFrame con columnas
+    row (posición de la fila original), hour y count
+    """
+    lists = pd.Series(peak_hours, dtype=object).reset_index(drop=True)
+    lists = lists.where(lists.map(lambda value: isinstance(value, list)), None)
+    exploded = lists.explode().dropna()
+
+    entries = pd.DataFrame({
+        'row': exploded.index.to_numpy(),
+        'hour': [entry.get('hour') for entry in exploded],
+        'count': [entry.get('count') for entry in exploded],
+    })
+    entries['hour'] = pd.to_numeric(entries['hour'], errors='coerce')
+    entries['count'] = pd.to_numeric(entries['count'], errors='coerce').fillna(0)
+    return entries, len(lists)
+
+def peak_hours_matrix(peak_hours):
+    """
+    Expandir peakHours a una matriz densa (n_filas, 24) con las visitas de cada hora
+    Las horas repetidas se suman y las entradas sin hora válida (0-23) se ignoran: la
+    matriz alimenta el perfil horario, la dispersión y las franjas punta; peakHour y
+    peakVisits salen de la lista (first_peak_hour, peak_hours_total)
+    """
+    entries, n_rows = explode_peak_hours(peak_hours)
+    valid = entries['hour'].between(0, HOURS_PER_DAY - 1)
+    entries = entries[valid]
+
+    matrix = np.zeros((n_rows, HOURS_PER_DAY), dtype=np.int32)
+    np.add.at(
+        matrix,
+        (entries['row'].to_numpy(), entries['hour'].to_numpy(dtype=int)),
+        entries['count'].to_numpy(dtype=np.int32)
+    )
+    return matrix
+
+def peak_hour(hourly, default=12):
+    """
+    Hora con más visitas de cada fila de la matriz densa (la más temprana en caso de
+    empate, como la primera entrada de un peakHours ordenado por hora)
+    Filas sin visitas reciben default
+    """
+    return np.where(hourly.any(axis=1), hourly.argmax(axis=1), default)
+
+def peak_visits(hourly):
+    """Total de visitas de cada fila de la matriz densa"""
+    return hourly.sum(axis=1)
+
+def first_peak_hour(peak_hours, default=12, missing_hour=12):
+    """
+    Hora de la entrada de peakHours con más visitas, como max(peakHours, key=count):
+    en empate (también si todas tienen 0 visitas) gana la primera entrada de la lista
+    y su hora se toma tal cual, aunque esté fuera de 0-23
+    Filas sin entradas reciben default; una entrada ganadora sin hora, missing_hour
+    """
+    entries, n_rows = explode_peak_hours(peak_hours)
+    hours = np.full(n_rows, default, dtype=np.float64)
+    if len(entries):
+        # idxmax retorna la primera posición con el máximo (las entradas siguen el orden de la lista)
+        winners = entries.groupby('row')['count'].idxmax()
+        hours[winners.index.to_numpy()] = entries['hour'].loc[winners.to_numpy()].fillna(missing_hour).to_numpy()
+    return hours.astype(np.int64)
+
+def peak_hours_total(peak_hours):
+    """
+    Suma de los count de todas las entradas de peakHours por fila, como
+    sum(count for entry in peakHours): también cuentan las horas fuera de 0-23
+    """
+    entries, n_rows = explode_peak_hours(peak_hours)
+    totals = entries.groupby('row')['count'].sum().reindex(range(n_rows), fill_value=0).to_numpy()
+    # Conservar enteros cuando todos los count lo son
+    if totals.dtype.kind == 'f' and np.all(np.mod(totals, 1) == 0):
+        totals = totals.astype(np.int64)
+    return totals
+
+def hourly_spread(hourly):
+    """Desviación estándar de la hora de visita (0 si la fila no tiene visitas)"""
+    totals = hourly.sum(axis=1)
+    safe_totals = np.where(totals > 0, totals, 1)
+    hours = np.arange(HOURS_PER_DAY)
+    mean_hour = (hourly @ hours) / safe_totals
+    variance = (hourly @ (hours ** 2)) / safe_totals - mean_hour ** 2
+    return np.where(totals > 0, np.sqrt(np.clip(variance, 0, None)), 0.0)
+
+def rush_visits(hourly):
+    """Visitas dentro de las franjas de hora punta del campus (RUSH_WINDOWS)"""
+    mask = np.zeros(HOURS_PER_DAY, dtype=bool)
+    for start, end in RUSH_WINDOWS:
+        mask[start:end] = True
+    return hourly[:, mask].sum(axis=1)
+
+def hourly_profile_frame(hourly):
+    """Perfil horario como columnas visits_h00 ... visits_h23"""
+    return pd.DataFrame(hourly, columns=HOURLY_PROFILE_COLUMNS)
+
+def events_per_row(dates, building_ids, event_dates, event_buildings):
+    """
+    Número de eventos en el mismo edificio y día de cada fila,
+    contando desde la fecha de la fila hasta el final de ese día
+    """
+    rows = pd.DataFrame({
+        'row': np.arange(len(dates)),
+        'building': pd.Series(building_ids).to_numpy(),
+        'date': pd.Series(dates).to_numpy(),
+    }).dropna(subset=['building', 'date'])
+    rows['day'] = rows['date'].dt.normalize()
+
+    events = pd.DataFrame({
+        'building': pd.Series(event_buildings, dtype=object).to_numpy(),
+        'event_date': parse_dates(event_dates).to_numpy(),
+    }).dropna()
+    events['day'] = events['event_date'].dt.normalize()
+
+    matches = rows.merge(events, on=['building', 'day'])
+    matches = matches[matches['event_date'] >= matches['date']]
+    counts = matches.groupby('row').size()
+    return counts.reindex(range(len(dates)), fill_value=0).to_numpy()
+
+def expand_to_hourly(daily, days, cubes, key='buildingId'):
+    """
+    Reemplazar cada fila diaria por una fila por hora con actividad en los cubos horarios
+    viewCount, uniqueVisitors, dayOfWeek y hour salen del cubo; el resto de columnas se
+    conserva de la fila diaria del mismo recurso y día, incluidas las etiquetas: las
+    reglas usan cortes calibrados para totales diarios, y peakVisits y eventsCount
+    siguen siendo los del día
+    Las filas diarias sin cubos de su recurso y día se conservan como filas diarias, y
+    sin ningún cubo se retorna el DataFrame diario (con aviso en ambos casos)
+    """
+    hourly_columns = ['viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour']
+    if len(cubes) == 0:
+        print('⚠️  No hay cubos horarios en la ventana: se usan las filas diarias')
+        return daily
+
+    cube_hours = parse_dates(cubes['hour'])
+    cube_frame = pd.DataFrame({
+        key: cubes['resourceId'].to_numpy(),
+        '_day': cube_hours.dt.normalize().to_numpy(),
+        '_start': cube_hours.to_numpy(),
+        'viewCount': numeric_column(cubes, 'viewCount').to_numpy(),
+        'uniqueVisitors': numeric_column(cubes, 'uniqueVisitors').to_numpy(),
+        'dayOfWeek': cube_hours.dt.weekday.to_numpy(),
+        'hour': cube_hours.dt.hour.to_numpy(),
+    })
+
+    days = pd.Series(days).to_numpy()
+    keyed = daily.drop(columns=hourly_columns).assign(_day=days, _row=np.arange(len(daily)))
+    merged = keyed.merge(cube_frame, on=[key, '_day'])
+
+    # Filas sin cubos (rollup atrasado o sin actividad registrada): se conservan diarias
+    uncovered = ~np.isin(np.arange(len(daily)), merged['_row'].to_numpy())
+    if uncovered.any():
+        print(f'⚠️  {int(uncovered.sum())} de {len(daily)} filas diarias sin cubos horarios: se conservan como diarias')
+    kept = daily[uncovered].assign(_start=days[uncovered] + np.timedelta64(12, 'h'))
+
+    expanded = pd.concat([merged[list(daily.columns) + ['_start']], kept], ignore_index=True)
+    return expanded.sort_values([key, '_start'], kind='stable')[list(daily.columns)].reset_index(drop=True)
+
+def fallback_chain(raw, columns, default=0):
+    """
+    Primer valor verdadero de la lista de columnas, como `a or b or c`
+    La última columna se usa tal cual (con default si falta)
+    """
+    result = numeric_column(raw, columns[-1], default)
+    for column in reversed(columns[:-1]):
+        values = pd.to_numeric(raw[column], errors='coerce')
+        result = values.where(values.notna() & (values != 0), result)
+    return result
+
+def rule_levels(rule, values):
+    """
+    Nivel de cada fila según una regla de etiquetado (índice en rule['labels'])
+    values: {columna: array o escalar}. El score se suma en el orden de rule['weights']
+    y cada corte superado (score > corte) sube un nivel; score faltante = nivel 0
+    """
+    score = sum(np.asarray(values[column]) * weight for column, weight in rule['weights'].items())
+    levels = np.searchsorted(rule['cuts'], score, side='left')
+    return np.where(np.isnan(score), 0, levels)
+
+def compile_rule(rule, features):
+    """
+    Evaluador vectorizado de la regla sobre matrices (n, len(features)) en el orden
+    del modelo: retorna función(X) -> etiquetas de rule['labels']
+    """
+    columns = [(features.index(column), weight) for column, weight in rule['weights'].items()]
+    labels = np.asarray(rule['labels'])
+
+    def evaluate(X):
+        X = np.asarray(X, dtype=np.float64)
+        score = sum(X[:, index] * weight for index, weight in columns)
+        return labels[np.where(np.isnan(score), 0, np.searchsorted(rule['cuts'], score, side='left'))]
+
+    return evaluate
+
+def mobility_demand_labels(view_count, unique_visitors, events_count):
+    """Demanda de movilidad (Alta/Media/Baja) a partir de vistas, visitantes y eventos"""
+    levels = rule_levels(MOBILITY_DEMAND_RULE, {
+        'viewCount': view_count, 'uniqueVisitors': unique_visitors, 'eventsCount': events_count
+    })
+    return np.asarray(MOBILITY_DEMAND_RULE['labels'])[levels]
+
+def saturation_levels(view_count, unique_visitors, peak_visits):
+    """Nivel de saturación 3=Alta, 2=Media, 1=Baja, 0=Normal a partir del score ponderado"""
+    levels = rule_levels(SATURATION_RULE, {
+        'viewCount': view_count, 'uniqueVisitors': unique_visitors, 'peakVisits': peak_visits
+    })
+    return np.asarray(SATURATION_RULE['labels'])[levels]
+
+def threshold_saturation_levels(unique_visitors, view_count, popularity_score, entity_type):
+    """
+    Nivel de saturación por umbrales, distintos para edificios (type=0) y eventos (type=1)
+    La popularidad solo cuenta para eventos
+    """
+    uv = np.asarray(unique_visitors)
+    vc = np.asarray(view_count)
+    is_event = np.asarray(entity_type) == 1
+    ps = np.where(is_event, np.asarray(popularity_score), 0)
+
+    conditions = [
+        (np.where(is_event, uv > 100, uv > 150)) | (vc > np.where(is_event, 200, 300)) | (ps > 500),
+        (np.where(is_event, uv > 60, uv > 100)) | (vc > np.where(is_event, 120, 200)) | (ps > 300),
+        (np.where(is_event, uv > 30, uv > 50)) | (vc > np.where(is_event, 60, 100)) | (ps > 150),
+    ]
+    return np.select(conditions, [3, 2, 1], default=0)
@@ -0,0 +1,99 @@
+# feature_pruning.py
+"""
+Importancia por permutación de las features y poda del modelo
+- La importancia se mide en una partición de validación permutando cada columna (en
+  paralelo con joblib); el test queda reservado para las métricas finales
+- La poda re-entrena el modelo con las k features más importantes, de menor a mayor k,
+  y se queda con el subconjunto más pequeño cuyo score en validación no cae más de
+  FEATURE_PRUNING_TOLERANCE respecto al modelo con todas las features
+La lista podada se guarda en la metadata ('features') y api.py solo arma esas columnas
+"""
+
+import os
+
+import numpy as np
+from sklearn.base import clone
+
+# Caída máxima de score (R² o accuracy) aceptada al podar features
+FEATURE_PRUNING_TOLERANCE = float(os.getenv('FEATURE_PRUNING_TOLERANCE', 0.01))
+# Repeticiones de cada permutación
+PERMUTATION_REPEATS = int(os.getenv('PERMUTATION_REPEATS', 5))
+# Filas de validación usadas para medir la importancia
+PERMUTATION_MAX_ROWS = int(os.getenv('PERMUTATION_MAX_ROWS', 10000))
+
+def task_score(task, y_true, y_pred):
+    """R² en regresión, accuracy en clasificación"""
+    from sklearn.metrics import r2_score, accuracy_score
+    return float(r2_score(y_true, y_pred) if task == 'regression' else accuracy_score(y_true, y_pred))
+
+def permutation_importances(model, X_val, y_val, task, n_jobs=-1, repeats=None):
+    """
+    Importancia de cada feature (caída media del score en validación al permutarla)
+    ordenada de mayor a menor: [{'feature', 'importance', 'std'}]
+    """
+    from sklearn.inspection import permutation_importance
+
+    result = permutation_importance(
+        model, X_val, y_val,
+        scoring='r2' if task == 'regression' else 'accuracy',
+        n_repeats=repeats or PERMUTATION_REPEATS,
+        max_samples=min(1.0, PERMUTATION_MAX_ROWS / len(X_val)),
+        n_jobs=n_jobs,
+        random_state=42
+    )
+    ranking = [
+        {'feature': feature, 'importance': float(mean), 'std': float(std)}
+        for feature, mean, std in zip(X_val.columns, result.importances_mean, result.importances_std)
+    ]
+    return sorted(ranking, key=lambda entry: entry['importance'], reverse=True)
+
+def prune_features(model, X_train, y_train, X_val, y_val, task, importances, tolerance=None):
+    """
+    Re-entrenar una copia sin entrenar de `model` con las k features más importantes
+    (k = 1, 2, ...) hasta encontrar el subconjunto más pequeño dentro de la tolerancia
+    en validación
+    Retorna (modelo, features, resumen); con todas las features devuelve el modelo original
+    """
+    tolerance = FEATURE_PRUNING_TOLERANCE if tolerance is None else tolerance
+    ranked = [entry['feature'] for entry in importances]
+    baseline = task_score(task, y_val, model.predict(X_val))
+    summary = {'tolerance': tolerance, 'baseline_score': baseline, 'tried': []}
+
+    for k in range(1, len(ranked)):
+        features = ranked[:k]
+        candidate = clone(model).fit(X_train[features], y_train)
+        score = task_score(task, y_val, candidate.predict(X_val[features]))
+        summary['tried'].append({'n_features': k, 'score': score})
+        if score >= baseline - tolerance:
+            return candidate, features, {**summary, 'score': score,
+                                         'dropped': [f for f in X_train.columns if f not in features]}
+
+    return model, list(X_train.columns), {**summary, 'score': baseline, 'dropped': []}
+
+def print_importances(importances, kept=None):
+    """Tabla de importancias; marca las features descartadas por la poda"""
+    for entry in importances:
+        marker = '  ' if kept is None or entry['feature'] in kept else '✂️ '
+        print(f'   {marker} {entry["feature"]:<22} {entry["importance"]:+.4f} ± {entry["std"]:.4f}')
+
+def feature_selection(model, X_train, y_train, X_val, y_val, task, n_jobs=-1, prune=False, tolerance=None):
+    """
+    Importancias del modelo elegido (entrenado con X_train, medidas en X_val) y, con
+    prune=True, el modelo re-entrenado con el subconjunto mínimo de features
+    Retorna (modelo, features, {'importances', 'pruning'})
+    """
+    print('🔍 Calculando importancia por permutación en validación...')
+    importances = permutation_importances(model, X_val, y_val, task, n_jobs)
+    if not prune:
+        print_importances(importances)
+        return model, list(X_train.columns), {'importances': importances, 'pruning': None}
+
+    model, features, pruning = prune_features(model, X_train, y_train, X_val, y_val, task, importances, tolerance)
+    print_importances(importances, kept=features)
+    if pruning['dropped']:
+        print(f'✂️  Poda: {len(features)}/{len(X_train.columns)} features '
+              f'(score {pruning["score"]:.4f} frente a {pruning["baseline_score"]:.4f}, '
+              f'tolerancia {pruning["tolerance"]:g})')
+    else:
+        print('✂️  Poda: ningún subconjunto menor queda dentro de la tolerancia; se conservan todas')
+    return model, features, {'importances': importances, 'pruning': pruning}
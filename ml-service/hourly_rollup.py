@@ -0,0 +1,197 @@
+# hourly_rollup.py
+"""
+Job de agregación horaria de actividad
+Resume user_activity_logs en la colección hourly_activity_rollups (un documento por
+recurso y hora) usando una agregación con $merge. Una marca de agua guarda la última
+hora completa procesada, así que cada ejecución solo lee los logs nuevos más las
+últimas ROLLUP_LOOKBACK_HOURS horas, que se vuelven a agregar para incluir logs que
+llegaron tarde a horas ya materializadas.
+Todas las fechas se manejan en UTC con zona horaria (pymongo guarda los datetime en UTC).
+Compatible con MongoDB 4.2+ ($merge); no usa $dateTrunc (5.0+).
+"""
+
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+import os
+
+import pymongo
+from config import MONGO_URI
+
+ACTIVITY_COLLECTION = 'user_activity_logs'
+ROLLUP_COLLECTION = 'hourly_activity_rollups'
+WATERMARK_COLLECTION = 'rollup_watermarks'
+WATERMARK_ID = 'hourly_activity'
+
+# Margen para logs que llegan tarde: una hora solo se materializa cuando terminó hace ROLLUP_LAG_MINUTES
+ROLLUP_LAG_MINUTES = int(os.getenv('ROLLUP_LAG_MINUTES', 5))
+# Primera ejecución (sin marca de agua): cuántos días de logs procesar
+ROLLUP_INITIAL_DAYS = int(os.getenv('ROLLUP_INITIAL_DAYS', 180))
+# Horas ya materializadas que cada ejecución vuelve a agregar (logs que llegan tarde)
+ROLLUP_LOOKBACK_HOURS = int(os.getenv('ROLLUP_LOOKBACK_HOURS', 6))
+
+VIEW_ACTIONS = ['view_building', 'view_event']
+SEARCH_ACTIONS = ['search_building']
+
+def connect_to_mongodb():
+    """Conectar a MongoDB"""
+    try:
+        client = pymongo.MongoClient(MONGO_URI)
+        db = client.get_database()
+        client.admin.command('ping')
+        return db, client
+    except Exception as e:
+        print(f'❌ Error conectando a MongoDB: {e}')
+        raise
+
+def utc_now():
+    """Fecha actual en UTC con zona horaria"""
+    return datetime.now(timezone.utc)
+
+def as_utc(moment):
+    """Normalizar a UTC con zona horaria (pymongo devuelve datetime naive en UTC)"""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+def floor_hour(moment):
+    """Truncar una fecha al inicio de su hora"""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def get_watermark(db):
+    """Última hora (exclusiva) ya materializada, o None si nunca se ejecutó"""
+    doc = db[WATERMARK_COLLECTION].find_one({'_id': WATERMARK_ID})
+    return as_utc(doc['processedUntil']) if doc and doc.get('processedUntil') else None
+
+def set_watermark(db, processed_until):
+    """Guardar la marca de agua tras una ejecución correcta"""
+    db[WATERMARK_COLLECTION].update_one(
+        {'_id': WATERMARK_ID},
+        {'$set': {'processedUntil': processed_until, 'updatedAt': utc_now()}},
+        upsert=True
+    )
+
+def rollup_pipeline(start, end):
+    """
+    Agregación de los logs en [start, end) por recurso y hora
+    Las horas se recalculan completas y reemplazan el documento existente,
+    por lo que volver a ejecutar la misma ventana es idempotente
+    La hora se trunca con $dateFromParts en lugar de $dateTrunc (solo MongoDB 5.0+)
+    """
+    return [
+        {'$match': {
+            'timestamp': {'$gte': start, '$lt': end},
+            'action': {'$in': VIEW_ACTIONS + SEARCH_ACTIONS},
+            'resourceType': {'$in': ['building', 'event']},
+            'resourceId': {'$nin': [None, '']}
+        }},
+        {'$group': {
+            '_id': {
+                'resourceType': '$resourceType',
+                'resourceId': '$resourceId',
+                'hour': {'$dateFromParts': {
+                    'year': {'$year': '$timestamp'},
+                    'month': {'$month': '$timestamp'},
+                    'day': {'$dayOfMonth': '$timestamp'},
+                    'hour': {'$hour': '$timestamp'}
+                }}
+            },
+            'viewCount': {'$sum': {'$cond': [{'$in': ['$action', VIEW_ACTIONS]}, 1, 0]}},
+            'searchCount': {'$sum': {'$cond': [{'$in': ['$action', SEARCH_ACTIONS]}, 1, 0]}},
+            'users': {'$addToSet': '$userId'}
+        }},
+        {'$project': {
+            '_id': 1,
+            'resourceType': '$_id.resourceType',
+            'resourceId': '$_id.resourceId',
+            'hour': '$_id.hour',
+            # 0=Lunes ... 6=Domingo, igual que datetime.weekday()
+            'dayOfWeek': {'$subtract': [{'$isoDayOfWeek': '$_id.hour'}, 1]},
+            'hourOfDay': {'$hour': '$_id.hour'},
+            'viewCount': 1,
+            'searchCount': 1,
+            'uniqueVisitors': {'$size': '$users'},
+            'updatedAt': '$$NOW'
+        }},
+        {'$merge': {
+            'into': ROLLUP_COLLECTION,
+            'on': '_id',
+            'whenMatched': 'replace',
+            'whenNotMatched': 'insert'
+        }}
+    ]
+
+def run_rollup(db, now=None):
+    """
+    Procesar los logs desde la marca de agua (menos ROLLUP_LOOKBACK_HOURS) hasta la
+    última hora completa
+    Retorna (inicio, fin) de la ventana procesada o None si no había horas que agregar
+    """
+    now = as_utc(now) if now else utc_now()
+    end = floor_hour(now - timedelta(minutes=ROLLUP_LAG_MINUTES))
+    watermark = get_watermark(db)
+    if watermark is None:
+        start = floor_hour(now - timedelta(days=ROLLUP_INITIAL_DAYS))
+    else:
+        # Reemplazar de nuevo las últimas horas: $merge las recalcula completas
+        start = min(watermark, end - timedelta(hours=ROLLUP_LOOKBACK_HOURS))
+
+    if start >= end:
+        return None
+
+    db[ACTIVITY_COLLECTION].aggregate(rollup_pipeline(start, end), allowDiskUse=True)
+    set_watermark(db, end)
+    return start, end
+
+def ensure_indexes(db):
+    """Índice para que los extractores lean cubos por recurso y rango de horas"""
+    db[ROLLUP_COLLECTION].create_index([('resourceType', 1), ('resourceId', 1), ('hour', -1)])
+    db[ROLLUP_COLLECTION].create_index([('hour', -1)])
+
+def rebuild(db):
+    """Borrar los cubos y la marca de agua para recalcular todo desde cero"""
+    db[ROLLUP_COLLECTION].drop()
+    db[WATERMARK_COLLECTION].delete_one({'_id': WATERMARK_ID})
+
+def parse_args(argv=None):
+    """Opciones de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Agregación horaria incremental de user_activity_logs')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Recalcular todos los cubos desde cero (ignora la marca de agua)')
+    parser.add_argument('--interval', type=int, default=0,
+                        help='Repetir cada N segundos (0 = ejecutar una sola vez)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    db, client = connect_to_mongodb()
+
+    try:
+        if args.rebuild:
+            print('🧹 Reconstruyendo cubos horarios desde cero...')
+            rebuild(db)
+        ensure_indexes(db)
+
+        while True:
+            started = time.perf_counter()
+            window = run_rollup(db)
+            if window:
+                start, end = window
+                print(f'✅ Cubos horarios actualizados: {start.isoformat()} → {end.isoformat()} '
+                      f'({time.perf_counter() - started:.2f}s)')
+            else:
+                print('ℹ️  Sin horas nuevas que agregar')
+
+            if not args.interval:
+                return 0
+            time.sleep(args.interval)
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print('\n❌ Agregación cancelada por el usuario')
+        sys.exit(1)
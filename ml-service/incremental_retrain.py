@@ -0,0 +1,249 @@
+# incremental_retrain.py
+"""
+Re-entrenamiento incremental de los Random Forest de train_all_models.py
+Carga el modelo publicado, agrega árboles entrenados solo con los datos nuevos
+(warm_start) y retira los árboles más antiguos para mantener el tamaño del ensamble.
+El modelo actualizado solo se publica si pasa la validación contra el actual, junto
+con su árbol sustituto destilado de nuevo (el anterior imitaba al forest reemplazado).
+"""
+
+import os
+import sys
+import json
+import math
+import copy
+import argparse
+from datetime import datetime
+
+import joblib
+
+from train_all_models import MODEL_SPECS, model_paths, ensure_directories
+import leaf_quantiles
+from surrogate import fit_surrogate, save_surrogate, surrogate_path
+
+# Árboles que se reemplazan en cada actualización
+INCREMENTAL_TREES = int(os.getenv('INCREMENTAL_TREES', 20))
+# Pérdida máxima de score permitida frente al modelo actual para publicar
+INCREMENTAL_TOLERANCE = float(os.getenv('INCREMENTAL_TOLERANCE', 0.01))
+# Mínimo de registros nuevos para intentar una actualización
+INCREMENTAL_MIN_SAMPLES = int(os.getenv('INCREMENTAL_MIN_SAMPLES', 20))
+
+def load_artifact(name):
+    """Cargar (modelo, label_encoder, metadata) de un modelo publicado"""
+    model_path, metadata_path = model_paths(name)
+    if not os.path.exists(model_path) or not os.path.exists(metadata_path):
+        return None, None, None
+
+    loaded = joblib.load(model_path)
+    with open(metadata_path, 'r') as f:
+        metadata = json.load(f)
+
+    # El modelo de movilidad se guarda como dict con 'model' y 'label_encoder'
+    if isinstance(loaded, dict) and 'model' in loaded:
+        return loaded['model'], loaded.get('label_encoder'), metadata
+    return loaded, None, metadata
+
+def publish_artifact(name, model, label_encoder, metadata):
+    """Guardar modelo y metadata reemplazando los archivos de forma atómica"""
+    model_path, metadata_path = model_paths(name)
+    payload = {'model': model, 'label_encoder': label_encoder} if label_encoder is not None else model
+
+    joblib.dump(payload, f'{model_path}.tmp')
+    os.replace(f'{model_path}.tmp', model_path)
+    with open(f'{metadata_path}.tmp', 'w') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(f'{metadata_path}.tmp', metadata_path)
+
+def refresh_quantiles(name, candidate, n_new_trees, X_train, y_train, X_test, y_test):
+    """
+    Estadísticas por hoja del forest actualizado: las de los árboles que siguen se
+    conservan, las de los nuevos se calculan con los datos recientes y el intervalo
+    se recalibra. Retorna (estadísticas, resumen) o (None, None) si no aplica
+    """
+    path = leaf_quantiles.quantiles_path(MODEL_SPECS[name]['artifact'])
+    if not leaf_quantiles.supports_leaf_quantiles(candidate) or not os.path.exists(path):
+        return None, None
+    stats = leaf_quantiles.refresh_leaf_statistics(
+        leaf_quantiles.load_leaf_statistics(path), candidate, n_new_trees, X_train, y_train
+    )
+    leaf_quantiles.calibrate(candidate, stats, X_test, y_test)
+    return stats, {'levels': stats['levels'].tolist(), 'adjustment': stats['adjustment'], 'path': path}
+
+def refresh_surrogate(name, candidate, X_train, X_test, y_test):
+    """
+    Árbol sustituto destilado del forest actualizado con los datos recientes
+    Retorna (sustituto, resumen para la metadata)
+    """
+    spec = MODEL_SPECS[name]
+    surrogate, summary = fit_surrogate(candidate, X_train, X_test, y_test, spec['task'])
+    path = surrogate_path(spec['artifact'])
+    print(f'   🪶 Sustituto destilado de nuevo: fidelidad {summary["fidelity"]:.4f}, '
+          f'score {summary["score"]:.4f} vs {summary["model_score"]:.4f}')
+    return surrogate, {**summary, 'path': path}
+
+def days_since_training(metadata):
+    """Días transcurridos desde el último entrenamiento (mínimo 1)"""
+    trained_on = datetime.fromisoformat(metadata['trained_on'])
+    return max(1, math.ceil((datetime.now() - trained_on).total_seconds() / 86400))
+
+def score(model, X, y, task):
+    """R² para regresión, accuracy para clasificación"""
+    from sklearn.metrics import r2_score, accuracy_score
+    y_pred = model.predict(X)
+    return float(r2_score(y, y_pred) if task == 'regression' else accuracy_score(y, y_pred))
+
+def add_recent_trees(model, X, y, n_new_trees, n_jobs=-1):
+    """
+    Copia del forest con n_new_trees árboles entrenados sobre (X, y) y sin los
+    n_new_trees árboles más antiguos, de modo que el número total no cambia
+    """
+    from sklearn.utils.class_weight import compute_class_weight
+
+    candidate = copy.deepcopy(model)
+    n_trees = len(candidate.estimators_)
+    class_weight = getattr(candidate, 'class_weight', None)
+    candidate.set_params(warm_start=True, n_estimators=n_trees + n_new_trees, n_jobs=n_jobs)
+
+    # 'balanced' no es válido con warm_start: se fijan los pesos calculados sobre los datos nuevos
+    if class_weight == 'balanced':
+        weights = compute_class_weight('balanced', classes=candidate.classes_, y=y)
+        candidate.set_params(class_weight=dict(zip(candidate.classes_, weights)))
+    candidate.fit(X, y)
+
+    # Los árboles nuevos quedan al final; se retiran los primeros (los más antiguos)
+    candidate.estimators_ = candidate.estimators_[n_new_trees:]
+    candidate.set_params(warm_start=False, n_estimators=len(candidate.estimators_))
+    if class_weight is not None:
+        candidate.set_params(class_weight=class_weight)
+    return candidate
+
+def retrain_incremental(name, days_back=None, n_new_trees=None, tolerance=None, n_jobs=-1):
+    """
+    Actualizar un modelo con los datos recibidos desde su último entrenamiento
+    Retorna True si se publicó una versión nueva
+    """
+    from sklearn.model_selection import train_test_split
+
+    spec = MODEL_SPECS[name]
+    n_new_trees = n_new_trees or INCREMENTAL_TREES
+    tolerance = INCREMENTAL_TOLERANCE if tolerance is None else tolerance
+
+    print(f'\n🔁 {name.capitalize()}: actualización incremental')
+    model, label_encoder, metadata = load_artifact(name)
+    if model is None:
+        print('   ⚠️  No hay modelo publicado; ejecuta primero train_all_models.py')
+        return False
+    if not hasattr(model, 'estimators_'):
+        print(f'   ⚠️  {type(model).__name__} no es un forest; se requiere re-entrenamiento completo')
+        return False
+
+    days_back = days_back or days_since_training(metadata)
+    df = spec['extractor'](days_back=days_back)
+    if len(df) < INCREMENTAL_MIN_SAMPLES:
+        print(f'   ℹ️  Solo {len(df)} registros nuevos en {days_back} días; no se actualiza')
+        return False
+
+    features = metadata.get('features', spec['features'])
+    X = df[features]
+    y = df[spec['target']]
+
+    if label_encoder is not None:
+        unseen = set(y.unique()) - set(label_encoder.classes_)
+        if unseen:
+            print(f'   ⚠️  Clases desconocidas en los datos nuevos: {sorted(unseen)}; no se actualiza')
+            return False
+        y = label_encoder.transform(y)
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # Los árboles nuevos deben conocer todas las clases del forest para poder promediarse
+    if spec['task'] == 'classification' and set(model.classes_) - set(y_train):
+        print('   ⚠️  Los datos nuevos no contienen todas las clases del modelo; no se actualiza')
+        return False
+
+    n_new_trees = min(n_new_trees, len(model.estimators_))
+    candidate = add_recent_trees(model, X_train, y_train, n_new_trees, n_jobs)
+
+    # Compuerta de validación sobre los datos recientes no vistos
+    current_score = score(model, X_test, y_test, spec['task'])
+    candidate_score = score(candidate, X_test, y_test, spec['task'])
+    print(f'   📏 Score actual: {current_score:.4f} | Score actualizado: {candidate_score:.4f}')
+
+    if candidate_score < current_score - tolerance:
+        print(f'   ❌ La actualización empeora el modelo más de {tolerance}; no se publica')
+        return False
+
+    # Intervalos de predicción para los árboles nuevos (calibrados con los datos recientes)
+    stats, quantiles = refresh_quantiles(name, candidate, n_new_trees, X_train, y_train, X_test, y_test)
+    if quantiles:
+        metadata['quantiles'] = quantiles
+
+    # El sustituto debe imitar al forest publicado; si no se puede destilar se retira
+    surrogate = None
+    if metadata.get('surrogate') is not None:
+        try:
+            surrogate, metadata['surrogate'] = refresh_surrogate(name, candidate, X_train, X_test, y_test)
+        except Exception as e:
+            print(f'   ⚠️  No se pudo destilar el sustituto ({e}); se retira')
+            metadata.pop('surrogate')
+
+    metadata['trained_on'] = datetime.now().isoformat()
+    # El modelo ya no corresponde a la huella del último entrenamiento completo
+    metadata.pop('fingerprint', None)
+    metadata.setdefault('incremental_updates', []).append({
+        'updated_on': metadata['trained_on'],
+        'days_back': days_back,
+        'n_samples': len(df),
+        'trees_added': n_new_trees,
+        'trees_retired': n_new_trees,
+        'score_before': current_score,
+        'score_after': candidate_score
+    })
+    publish_artifact(name, candidate, label_encoder, metadata)
+    if stats is not None:
+        leaf_quantiles.save_leaf_statistics(stats, quantiles['path'])
+    if surrogate is not None:
+        save_surrogate(surrogate, metadata['surrogate']['path'])
+    print(f'   ✅ Publicado: {n_new_trees} árboles nuevos, {len(candidate.estimators_)} en total')
+    return True
+
+def parse_args(argv=None):
+    """Opciones de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Re-entrenamiento incremental de los Random Forest')
+    parser.add_argument('models', nargs='*',
+                        help=f'Modelos a actualizar: {", ".join(MODEL_SPECS)} (por defecto todos)')
+    parser.add_argument('--days', type=int, default=None,
+                        help='Días de datos nuevos a usar (por defecto desde el último entrenamiento)')
+    parser.add_argument('--trees', type=int, default=None,
+                        help=f'Árboles a reemplazar por modelo (por defecto {INCREMENTAL_TREES})')
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help=f'Pérdida de score tolerada (por defecto {INCREMENTAL_TOLERANCE})')
+    args = parser.parse_args(argv)
+    unknown = set(args.models) - set(MODEL_SPECS)
+    if unknown:
+        parser.error(f'Modelos desconocidos: {", ".join(sorted(unknown))}')
+    args.models = args.models or list(MODEL_SPECS)
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    ensure_directories()
+
+    published = {
+        name: retrain_incremental(name, args.days, args.trees, args.tolerance)
+        for name in args.models
+    }
+
+    print('\n📊 RESUMEN DE ACTUALIZACIÓN INCREMENTAL')
+    for name, success in published.items():
+        print(f'{"✅" if success else "⏭️ "} {name.capitalize()}: {"publicado" if success else "sin cambios"}')
+    if any(published.values()):
+        print('\n💡 Recarga los modelos en el servicio: POST /model/reload')
+    return 0
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print('\n❌ Actualización cancelada por el usuario')
+        sys.exit(1)
@@ -0,0 +1,140 @@
+# leaf_quantiles.py
+"""
+Intervalos de predicción para forests de regresión a partir de estadísticas por hoja
+Al entrenar se guarda, para cada nodo de cada árbol, su valor y los cuantiles
+(QUANTILE_LEVELS) del target de las filas de entrenamiento que caen en esa hoja.
+En inferencia basta con una búsqueda de hoja por árbol (forest.apply):
+- predicción y predicción de cada árbol = valor de la hoja (igual que forest.predict)
+- cuantiles = promedio entre árboles de los cuantiles de cada hoja
+Los extremos del intervalo se calibran con un conjunto aparte (conformal), de modo
+que [p10, p90] cubra ~80% de los valores reales
+"""
+
+import os
+import math
+
+import numpy as np
+
+QUANTILE_LEVELS = [0.1, 0.5, 0.9]
+
+def quantiles_path(artifact, models_dir='models'):
+    """Archivo de estadísticas por hoja que acompaña al .pkl del modelo"""
+    return f'{models_dir}/{artifact}_quantiles.npz'
+
+def supports_leaf_quantiles(model):
+    """True para forests de regresión (árboles con apply y sin clases)"""
+    return hasattr(model, 'estimators_') and hasattr(model, 'apply') and not hasattr(model, 'classes_')
+
+def node_counts(model):
+    """Número de nodos de cada árbol (identifica el forest al que pertenecen las estadísticas)"""
+    return np.array([tree.tree_.node_count for tree in model.estimators_])
+
+def node_offsets(counts):
+    """Primera fila de cada árbol en la tabla plana de nodos"""
+    return np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+
+def leaf_statistics(model, X, y, levels=None, trees=None):
+    """
+    Valor y cuantiles del target por nodo, en una tabla plana (nodos de todos los
+    árboles uno tras otro; offsets[t] = primera fila del árbol t)
+    trees limita el cálculo a esos árboles (por defecto todos los del forest)
+    Las hojas sin filas de (X, y) usan el valor del árbol como cuantil
+    """
+    trees = model.estimators_ if trees is None else trees
+    levels = np.asarray(levels or QUANTILE_LEVELS, dtype=np.float64)
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float64)
+    counts = np.array([tree.tree_.node_count for tree in trees])
+    offsets = node_offsets(counts)
+    values = np.concatenate([tree.tree_.value[:, 0, 0] for tree in trees])
+    quantiles = np.full((counts.sum(), len(levels)), np.nan, dtype=np.float32)
+
+    leaves = np.column_stack([tree.apply(X) for tree in trees])
+    for t in range(leaves.shape[1]):
+        # Filas ordenadas por hoja y luego por target: cada hoja es un tramo ordenado
+        order = np.lexsort((y, leaves[:, t]))
+        sorted_leaves, sorted_y = leaves[order, t], y[order]
+        nodes, starts, sizes = np.unique(sorted_leaves, return_index=True, return_counts=True)
+        position = starts[:, None] + levels[None, :] * (sizes[:, None] - 1)
+        lower = np.floor(position).astype(int)
+        upper = np.ceil(position).astype(int)
+        quantiles[offsets[t] + nodes] = sorted_y[lower] + (sorted_y[upper] - sorted_y[lower]) * (position - lower)
+
+    missing = np.isnan(quantiles)
+    quantiles[missing] = np.broadcast_to(values[:, None], quantiles.shape)[missing]
+    return {
+        'levels': levels,
+        'offsets': offsets,
+        'node_counts': counts,
+        'values': values,
+        'quantiles': quantiles,
+        'adjustment': 0.0
+    }
+
+def refresh_leaf_statistics(stats, model, n_new_trees, X, y):
+    """
+    Estadísticas tras reemplazar los n_new_trees árboles más antiguos por árboles
+    nuevos al final del forest: se conservan las filas de los árboles que siguen y
+    se calculan las de los nuevos con (X, y)
+    """
+    new = leaf_statistics(model, X, y, stats['levels'].tolist(), trees=model.estimators_[-n_new_trees:])
+    kept = slice(int(stats['offsets'][n_new_trees]), None)
+    counts = np.concatenate([stats['node_counts'][n_new_trees:], new['node_counts']])
+    return {
+        'levels': stats['levels'],
+        'offsets': node_offsets(counts),
+        'node_counts': counts,
+        'values': np.concatenate([stats['values'][kept], new['values']]),
+        'quantiles': np.concatenate([stats['quantiles'][kept], new['quantiles']]),
+        'adjustment': 0.0
+    }
+
+def matches(model, stats):
+    """True si las estadísticas se calcularon para este forest"""
+    return supports_leaf_quantiles(model) and np.array_equal(stats['node_counts'], node_counts(model))
+
+def predict_from_leaves(model, stats, X):
+    """
+    Una búsqueda de hoja por árbol para todas las filas de X
+    Retorna (predicción (n,), predicciones por árbol (n, árboles), cuantiles (n, niveles))
+    """
+    index = stats['offsets'] + model.apply(X)
+    per_tree = stats['values'][index]
+    quantiles = stats['quantiles'][index].mean(axis=1)
+    # Calibración: los niveles bajo la mediana bajan y los de arriba suben (o al revés si el ajuste es negativo)
+    quantiles += np.sign(stats['levels'] - 0.5) * stats['adjustment']
+    return per_tree.mean(axis=1), per_tree, np.maximum.accumulate(quantiles, axis=1)
+
+def interval_coverage(model, stats, X, y):
+    """Fracción de valores reales dentro del intervalo [nivel más bajo, nivel más alto]"""
+    _, _, quantiles = predict_from_leaves(model, stats, X)
+    y = np.asarray(y, dtype=np.float64)
+    return float(np.mean((y >= quantiles[:, 0]) & (y <= quantiles[:, -1])))
+
+def calibrate(model, stats, X, y):
+    """
+    Ajuste conformal de los extremos con filas no usadas para las estadísticas:
+    el intervalo se ensancha (o estrecha) lo justo para cubrir la fracción nominal
+    (nivel más alto - nivel más bajo) de los valores reales
+    """
+    stats['adjustment'] = 0.0
+    _, _, quantiles = predict_from_leaves(model, stats, X)
+    y = np.asarray(y, dtype=np.float64)
+    scores = np.maximum(quantiles[:, 0] - y, y - quantiles[:, -1])
+    coverage = stats['levels'][-1] - stats['levels'][0]
+    rank = min(len(scores), math.ceil((len(scores) + 1) * coverage))
+    stats['adjustment'] = float(np.sort(scores)[rank - 1])
+    return stats
+
+def save_leaf_statistics(stats, path):
+    """Guardar las estadísticas (npz sin comprimir, se cargan en milisegundos)"""
+    with open(f'{path}.tmp', 'wb') as f:
+        np.savez(f, **stats)
+    os.replace(f'{path}.tmp', path)
+
+def load_leaf_statistics(path):
+    """Cargar las estadísticas guardadas con save_leaf_statistics"""
+    with np.load(path) as data:
+        stats = {key: data[key] for key in data.files}
+    stats['adjustment'] = float(stats['adjustment'])
+    return stats
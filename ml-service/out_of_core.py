@@ -0,0 +1,151 @@
+# out_of_core.py
+"""
+Entrenamiento out-of-core para datasets más grandes que la memoria
+Los datos se recorren por bloques desde el snapshot (columnas mapeadas en memoria),
+así que la memoria usada depende de OUT_OF_CORE_CHUNK_ROWS y OUT_OF_CORE_MAX_ROWS
+y no del tamaño del dataset:
+- Muestra de reservorio de tamaño fijo, estratificada por clase en los clasificadores
+  (cada clase conserva su proporción del snapshot, así que el test sacado de la
+  muestra refleja la distribución real)
+- Entrenamiento con partial_fit sobre todos los bloques para las familias incrementales
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from snapshots import iter_snapshot_chunks, read_schema
+
+# Filas por bloque leído del snapshot
+OUT_OF_CORE_CHUNK_ROWS = int(os.getenv('OUT_OF_CORE_CHUNK_ROWS', 50000))
+# Tamaño máximo de la muestra que se carga en memoria
+OUT_OF_CORE_MAX_ROWS = int(os.getenv('OUT_OF_CORE_MAX_ROWS', 200000))
+# Pasadas sobre los bloques al entrenar con partial_fit
+OUT_OF_CORE_EPOCHS = int(os.getenv('OUT_OF_CORE_EPOCHS', 5))
+
+# Posición de cada fila en el snapshot (identifica las filas de test al recorrer los bloques)
+ROW_COLUMN = '_row'
+
+def stream_chunks(snapshot_path, columns, chunk_rows=None):
+    """Bloques del snapshot con las columnas pedidas y la posición global de cada fila"""
+    for start, chunk in iter_snapshot_chunks(snapshot_path, columns, chunk_rows or OUT_OF_CORE_CHUNK_ROWS):
+        chunk[ROW_COLUMN] = np.arange(start, start + len(chunk))
+        yield chunk
+
+def class_counts(snapshot_path, target, chunk_rows=None):
+    """Filas por clase del target, leyendo solo esa columna"""
+    counts = pd.Series(dtype='int64')
+    for chunk in stream_chunks(snapshot_path, [target], chunk_rows):
+        counts = counts.add(chunk[target].astype(object).value_counts(), fill_value=0)
+    return counts.astype('int64')
+
+def class_quotas(counts, capacity):
+    """
+    Cupo de filas por clase proporcional a su frecuencia en el snapshot (restos
+    mayores para que sumen la capacidad); toda clase presente recibe al menos una fila
+    """
+    total = int(counts.sum())
+    if total <= capacity:
+        return {label: int(count) for label, count in counts.items()}
+
+    exact = counts.astype(float) * capacity / total
+    quotas = np.floor(exact).astype('int64').clip(lower=(counts > 0).astype('int64'))
+    leftover = capacity - int(quotas.sum())
+    if leftover > 0:
+        for label in (exact - np.floor(exact)).sort_values(ascending=False).index[:leftover]:
+            quotas[label] += 1
+    return {label: int(min(quota, counts[label])) for label, quota in quotas.items()}
+
+def reservoir_sample(chunks, capacity, target=None, quotas=None, seed=42):
+    """
+    Muestra uniforme sin reemplazo de hasta `capacity` filas en una sola pasada
+    Cada fila recibe una clave aleatoria y se conservan las de menor clave (por
+    clase si se indican quotas), así que la memoria no pasa de capacity + un bloque
+    """
+    rng = np.random.default_rng(seed)
+    sample = None
+    for chunk in chunks:
+        chunk = chunk.assign(_key=rng.random(len(chunk)))
+        combined = chunk if sample is None else pd.concat([sample, chunk], ignore_index=True)
+        if quotas is None:
+            sample = combined.nsmallest(capacity, '_key')
+        else:
+            labels = combined[target].astype(object)
+            ranks = combined['_key'].groupby(labels).rank(method='first')
+            sample = combined[ranks <= labels.map(quotas).astype(float)]
+
+    if sample is None:
+        return pd.DataFrame()
+    return sample.drop(columns='_key').sort_values(ROW_COLUMN).reset_index(drop=True)
+
+def load_sample(snapshot_path, features, target, stratify=False, max_rows=None, chunk_rows=None):
+    """
+    Muestra acotada del snapshot con features, target, buildingId (si el snapshot lo
+    tiene, para los modelos por edificio) y posición de fila
+    stratify=True mantiene la proporción de cada clase del target (clasificadores)
+    """
+    max_rows = max_rows or OUT_OF_CORE_MAX_ROWS
+    available = {column['name'] for column in read_schema(snapshot_path)['columns']}
+    columns = (['buildingId'] if 'buildingId' in available and 'buildingId' not in features else []) + features + [target]
+    quotas = class_quotas(class_counts(snapshot_path, target, chunk_rows), max_rows) if stratify else None
+
+    sample = reservoir_sample(stream_chunks(snapshot_path, columns, chunk_rows), max_rows, target, quotas)
+    sample.attrs['out_of_core'] = {
+        'snapshot': str(snapshot_path),
+        'rows': read_schema(snapshot_path)['rows'],
+        'sample_rows': len(sample),
+        'stratified': bool(stratify),
+        'chunk_rows': chunk_rows or OUT_OF_CORE_CHUNK_ROWS
+    }
+    return sample
+
+def streaming_source(df, test_index, encode_target=None):
+    """
+    Fuente para entrenar con partial_fit sobre todo el snapshot de una muestra
+    out-of-core, excluyendo las filas usadas como test. None si df no es una muestra
+    """
+    info = df.attrs.get('out_of_core')
+    if not info:
+        return None
+    return {
+        'snapshot': info['snapshot'],
+        'rows': df[ROW_COLUMN],
+        'exclude': df.loc[test_index, ROW_COLUMN].to_numpy(),
+        'encode_target': encode_target
+    }
+
+def exclude_rows(source, index):
+    """Copia de la fuente que además excluye las filas de la muestra en index (p. ej. validación)"""
+    return {**source, 'exclude': np.concatenate([source['exclude'], source['rows'].loc[index].to_numpy()])}
+
+def fit_incremental(estimator, source, features, target, classes=None, epochs=None, chunk_rows=None):
+    """
+    Entrenar un estimador con partial_fit recorriendo el snapshot por bloques
+    Si es un Pipeline con StandardScaler, el scaler se ajusta en una pasada previa
+    """
+    steps = getattr(estimator, 'named_steps', None)
+    scaler = steps['scaler'] if steps else None
+    model = steps['model'] if steps else estimator
+    exclude = source['exclude']
+
+    def training_chunks():
+        for chunk in stream_chunks(source['snapshot'], features + [target], chunk_rows):
+            chunk = chunk[~np.isin(chunk[ROW_COLUMN].to_numpy(), exclude)]
+            if len(chunk) == 0:
+                continue
+            y = chunk[target].to_numpy()
+            yield chunk[features], source['encode_target'](y) if source['encode_target'] else y
+
+    if scaler is not None:
+        for X, _ in training_chunks():
+            scaler.partial_fit(X)
+
+    for _ in range(epochs or OUT_OF_CORE_EPOCHS):
+        for X, y in training_chunks():
+            X = scaler.transform(X) if scaler is not None else X
+            if classes is not None:
+                model.partial_fit(X, y, classes=classes)
+            else:
+                model.partial_fit(X, y)
+    return estimator
@@ -0,0 +1,171 @@
+# profiling.py
+"""
+Medición del costo de servir un modelo: latencia de inferencia (una fila y lote),
+memoria y tamaño del artefacto serializado, y selección del modelo más preciso
+que cumple el presupuesto de servicio (SLO)
+"""
+
+import io
+import os
+import time
+import warnings
+import tracemalloc
+
+import joblib
+import numpy as np
+
+from feature_engineering import INFERENCE_DTYPE
+
+# Presupuesto de servicio por modelo (0 = sin límite)
+SERVING_P99_MS = float(os.getenv('SERVING_P99_MS', 50))
+SERVING_MAX_ARTIFACT_MB = float(os.getenv('SERVING_MAX_ARTIFACT_MB', 50))
+SERVING_MAX_PREDICT_MB = float(os.getenv('SERVING_MAX_PREDICT_MB', 0))
+
+def artifact_size(model):
+    """Tamaño en bytes del modelo serializado con joblib (igual que el .pkl publicado)"""
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.getbuffer().nbytes
+
+def measure_latency(predict, X, repeats=200, warmup=5):
+    """
+    Latencias (ms) de llamar predict(X) `repeats` veces
+    Retorna dict con p50, p95, p99 y media
+    """
+    for _ in range(warmup):
+        predict(X)
+
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        started = time.perf_counter()
+        predict(X)
+        timings[i] = (time.perf_counter() - started) * 1000
+
+    return {
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'mean_ms': float(timings.mean())
+    }
+
+def predict_peak_memory(predict, X):
+    """Memoria máxima (bytes) asignada durante una llamada a predict(X)"""
+    tracemalloc.start()
+    try:
+        predict(X)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def serving_profile(model, X, batch_size=1000, single_repeats=200, batch_repeats=20):
+    """
+    Perfil de servicio de un modelo sobre filas representativas X
+    Incluye latencia de una fila (como en /predict/*), de un lote, memoria de
+    inferencia del lote y tamaño del artefacto
+    """
+    # La API predice con arrays de numpy en float32, sin nombres de columnas
+    X = np.asarray(X, dtype=INFERENCE_DTYPE)
+    single_row = X[:1]
+    batch = X[np.arange(batch_size) % len(X)]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        single = measure_latency(model.predict, single_row, repeats=single_repeats)
+        batched = measure_latency(model.predict, batch, repeats=batch_repeats)
+        peak_bytes = predict_peak_memory(model.predict, batch)
+
+    return {
+        'single_row': single,
+        'batch': {**batched, 'batch_size': batch_size, 'rows_per_second': batch_size / (batched['mean_ms'] / 1000)},
+        'predict_peak_bytes': peak_bytes,
+        'artifact_bytes': artifact_size(model)
+    }
+
+def serving_budget():
+    """Presupuesto de servicio configurado (0 = sin límite)"""
+    return {
+        'p99_ms': SERVING_P99_MS,
+        'max_artifact_mb': SERVING_MAX_ARTIFACT_MB,
+        'max_predict_mb': SERVING_MAX_PREDICT_MB
+    }
+
+def budget_violations(profile, budget=None):
+    """Lista de límites del presupuesto que el perfil excede (vacía si cumple)"""
+    budget = budget or serving_budget()
+    violations = []
+    if budget['p99_ms'] and profile['single_row']['p99_ms'] > budget['p99_ms']:
+        violations.append(f'p99 {profile["single_row"]["p99_ms"]:.1f} ms > {budget["p99_ms"]:g} ms')
+    if budget['max_artifact_mb'] and profile['artifact_bytes'] > budget['max_artifact_mb'] * 1024 ** 2:
+        violations.append(f'artefacto {profile["artifact_bytes"] / 1024 ** 2:.1f} MB > {budget["max_artifact_mb"]:g} MB')
+    if budget['max_predict_mb'] and profile['predict_peak_bytes'] > budget['max_predict_mb'] * 1024 ** 2:
+        violations.append(f'memoria {profile["predict_peak_bytes"] / 1024 ** 2:.1f} MB > {budget["max_predict_mb"]:g} MB')
+    return violations
+
+def fit_candidates(candidates, X_train, y_train, fitters=None):
+    """
+    Entrenar cada candidato ({nombre: estimador sin entrenar})
+    fitters permite entrenar un candidato de otra forma ({nombre: función(estimador)}),
+    p. ej. por bloques con partial_fit
+    Retorna {nombre: (modelo, segundos de entrenamiento)}
+    """
+    fitters = fitters or {}
+    fitted = {}
+    for name, model in candidates.items():
+        started = time.perf_counter()
+        if name in fitters:
+            fitters[name](model)
+        else:
+            model.fit(X_train, y_train)
+        fitted[name] = (model, time.perf_counter() - started)
+    return fitted
+
+def select_within_budget(candidates, X_train, y_train, X_val, y_val, task, budget=None, fitters=None,
+                         score=None, fitted=None, fallback=False):
+    """
+    Entrenar y perfilar cada candidato ({nombre: estimador sin entrenar}) y elegir el
+    más preciso (R² o accuracy en validación) entre los que cumplen el presupuesto
+    fitters: ver fit_candidates; fitted reemplaza el entrenamiento por candidatos ya
+    entrenados ({nombre: (modelo, segundos)}), p. ej. en otro proceso
+    score reemplaza la métrica (función(y_true, y_pred)), p. ej. para modelos multi-salida
+    Con fallback=True, si ninguno cumple se elige el más rápido (p99 de una fila)
+    Retorna (nombre, modelo, reporte por candidato); (None, None, reporte) si ninguno cumple
+    """
+    from sklearn.metrics import r2_score, accuracy_score
+
+    budget = budget or serving_budget()
+    fitted = fitted or fit_candidates(candidates, X_train, y_train, fitters)
+    report = []
+    for name, (model, fit_seconds) in fitted.items():
+        y_pred = model.predict(X_val)
+        if score is not None:
+            metric = score(y_val, y_pred)
+        else:
+            metric = r2_score(y_val, y_pred) if task == 'regression' else accuracy_score(y_val, y_pred)
+        profile = serving_profile(model, X_val, batch_size=1000, single_repeats=100, batch_repeats=5)
+        report.append({
+            'candidate': name,
+            'score': float(metric),
+            'fit_seconds': fit_seconds,
+            'serving_profile': profile,
+            'violations': budget_violations(profile, budget)
+        })
+
+    eligible = [entry for entry in report if not entry['violations']]
+    if eligible:
+        best = max(eligible, key=lambda entry: (entry['score'], -entry['serving_profile']['single_row']['p99_ms']))
+    elif fallback and report:
+        best = min(report, key=lambda entry: entry['serving_profile']['single_row']['p99_ms'])
+    else:
+        return None, None, report
+    return best['candidate'], fitted[best['candidate']][0], report
+
+def print_selection_report(report, chosen):
+    """Tabla de candidatos con score, latencia, tamaño y motivo de rechazo"""
+    for entry in report:
+        profile = entry['serving_profile']
+        marker = '👉' if entry['candidate'] == chosen else ('❌' if entry['violations'] else '  ')
+        print(f'   {marker} {entry["candidate"]:<24} score {entry["score"]:.4f} | '
+              f'p99 {profile["single_row"]["p99_ms"]:7.2f} ms | '
+              f'{profile["artifact_bytes"] / 1024 ** 2:6.2f} MB'
+              + (f' | rechazado: {"; ".join(entry["violations"])}' if entry['violations'] else ''))
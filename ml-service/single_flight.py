@@ -0,0 +1,67 @@
+# single_flight.py
+"""
+Coalescencia de solicitudes idénticas concurrentes (single-flight)
+La primera solicitud con una clave calcula el resultado en el threadpool; las que
+llegan con la misma clave mientras tanto esperan ese mismo cálculo en lugar de
+repetirlo. La clave combina el modelo cargado y el vector de features ya normalizado
+(float32 en el orden del modelo), de modo que payloads equivalentes comparten cálculo
+"""
+
+import asyncio
+
+from starlette.concurrency import run_in_threadpool
+
+# Cálculos en curso: clave → tarea con el resultado
+inflight = {}
+
+# Contadores para monitoreo (/health)
+stats = {'requests': 0, 'computations': 0, 'coalesced': 0}
+
+def flight_key(name, model, features):
+    """
+    Clave de una predicción: endpoint, versión del modelo (el objeto cargado, que
+    cambia en cada recarga) y bytes del vector de features normalizado
+    """
+    return name, id(model), features.shape, features.tobytes()
+
+def finish_flight(key, task):
+    """Sacar el cálculo terminado de los pendientes"""
+    inflight.pop(key, None)
+    if not task.cancelled():
+        # Marcar la excepción como leída aunque todas las solicitudes se hayan cancelado
+        task.exception()
+
+async def run_flight(compute, gate=None):
+    """Ejecutar compute() en el threadpool, dentro de gate() si se indica (admisión)"""
+    if gate is None:
+        return await run_in_threadpool(compute)
+    async with gate():
+        return await run_in_threadpool(compute)
+
+async def coalesce(key, compute, gate=None):
+    """
+    Resultado de compute() (función síncrona, se ejecuta en el threadpool)
+    compartido entre las solicitudes concurrentes con la misma clave
+    El cálculo es una tarea propia: si la solicitud que lo inició se cancela
+    (cliente desconectado), las demás siguen esperándolo
+    gate crea el context manager asíncrono que debe envolver el cálculo (p. ej. el
+    control de admisión); las solicitudes coalescidas no ocupan un lugar propio
+    """
+    stats['requests'] += 1
+    task = inflight.get(key)
+    if task is None:
+        stats['computations'] += 1
+        task = asyncio.ensure_future(run_flight(compute, gate))
+        inflight[key] = task
+        task.add_done_callback(lambda done: finish_flight(key, done))
+    else:
+        stats['coalesced'] += 1
+    return await asyncio.shield(task)
+
+def coalescing_stats():
+    """Contadores y fracción de solicitudes servidas por un cálculo compartido"""
+    return {
+        **stats,
+        'inflight': len(inflight),
+        'dedup_ratio': round(stats['coalesced'] / stats['requests'], 4) if stats['requests'] else 0.0
+    }
@@ -0,0 +1,267 @@
+# snapshots.py
+"""
+Snapshots de datos de entrenamiento en formato columnar
+Cada snapshot es un directorio con un archivo .npy por columna y un schema.json
+con tipos, número de filas y hash de contenido. Las columnas de texto se guardan
+codificadas como diccionario (códigos enteros + categorías) y todas las columnas
+se pueden cargar con memory mapping, sin parsear CSV.
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+from pathlib import Path
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_FORMAT_VERSION = 1
+# Directorio de los snapshots que leen el entrenamiento y la API
+# (SNAPSHOTS_DIR=data/synthetic entrena con los datasets de synthetic_data.py)
+SNAPSHOTS_DIR = Path(os.getenv('SNAPSHOTS_DIR') or Path(__file__).parent / 'data')
+SCHEMA_FILE = 'schema.json'
+COMPRESSED_FILE = 'columns.npz'
+
+def _encode_column(series):
+    """
+    Convertir una columna a (array, metadata de codificación)
+    Texto/objetos y categóricas -> códigos int32 con -1 para faltantes
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+        categorical = pd.Categorical(series.astype(object).where(series.notna(), None))
+        categories = [str(category) for category in categorical.categories]
+        codes = np.asarray(categorical.codes, dtype=np.int32)
+        return codes, {'encoding': 'dictionary', 'dtype': 'category', 'categories': categories}
+
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series.to_numpy(dtype='datetime64[ns]')
+        return values.view(np.int64), {'encoding': 'datetime', 'dtype': 'datetime64[ns]'}
+
+    values = series.to_numpy()
+    return values, {'encoding': 'plain', 'dtype': values.dtype.str}
+
+def _decode_column(values, spec):
+    """Reconstruir una columna a partir del array guardado y su metadata"""
+    if spec['encoding'] == 'dictionary':
+        return pd.Categorical.from_codes(np.asarray(values), categories=spec['categories'])
+    if spec['encoding'] == 'datetime':
+        return np.asarray(values).view('datetime64[ns]')
+    return values
+
+def content_hash(df):
+    """
+    Hash SHA-256 del contenido del DataFrame (nombres, tipos y valores de cada columna)
+    No depende de la fecha de extracción: los mismos datos producen el mismo hash
+    """
+    digest = hashlib.sha256()
+    for column in df.columns:
+        values, spec = _encode_column(df[column])
+        digest.update(str(column).encode('utf-8'))
+        digest.update(json.dumps(spec, sort_keys=True).encode('utf-8'))
+        digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+def save_snapshot(df, name, data_dir=None, compress=False, dedupe=True):
+    """
+    Guardar un DataFrame como snapshot {name}_{fecha}_{hash}/ dentro de data_dir
+    compress=True guarda las columnas en un .npz comprimido (no se puede mapear en memoria)
+    dedupe=True reutiliza el snapshot más reciente si tiene el mismo contenido
+    Retorna la ruta del snapshot
+    """
+    data_dir = Path(data_dir or SNAPSHOTS_DIR)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    digest = content_hash(df)
+    if dedupe:
+        previous = latest_snapshot(name, data_dir)
+        if previous is not None and read_schema(previous)['content_hash'] == digest:
+            return previous
+
+    columns = []
+    arrays = {}
+    for position, column in enumerate(df.columns):
+        values, spec = _encode_column(df[column])
+        key = f'col_{position:03d}'
+        arrays[key] = np.ascontiguousarray(values)
+        columns.append({'name': str(column), 'key': key, **spec})
+
+    created_at = datetime.now()
+    staging = _staging_dir(data_dir, f'{name}_{created_at.strftime("%Y%m%d_%H%M%S")}_{digest[:8]}')
+
+    if compress:
+        np.savez_compressed(staging / COMPRESSED_FILE, **arrays)
+    else:
+        for key, values in arrays.items():
+            np.save(staging / f'{key}.npy', values)
+
+    return _publish(staging, name, created_at, len(df), digest, compress, columns)
+
+def save_snapshot_chunks(chunks, name, data_dir=None, copy_rows=1_000_000):
+    """
+    Guardar un snapshot a partir de bloques de DataFrame sin tenerlos todos en memoria
+    Cada columna se escribe por bloques y al final se convierte a .npy y se calcula
+    el mismo hash que content_hash() daría sobre el DataFrame completo
+    Las columnas deben tener el mismo tipo (y las mismas categorías) en todos los bloques
+    Retorna la ruta del snapshot
+    """
+    data_dir = Path(data_dir or SNAPSHOTS_DIR)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    created_at = datetime.now()
+    staging = _staging_dir(data_dir, f'{name}_{created_at.strftime("%Y%m%d_%H%M%S")}_stream')
+
+    columns, dtypes, files = [], [], []
+    rows = 0
+    try:
+        for chunk in chunks:
+            encoded = [_encode_column(chunk[column]) for column in chunk.columns]
+            if not columns:
+                for position, (column, (values, spec)) in enumerate(zip(chunk.columns, encoded)):
+                    key = f'col_{position:03d}'
+                    columns.append({'name': str(column), 'key': key, **spec})
+                    dtypes.append(np.asarray(values).dtype)
+                    files.append(open(staging / f'{key}.raw', 'wb'))
+            for column, (values, spec), dtype, handle in zip(columns, encoded, dtypes, files):
+                if {key: value for key, value in column.items() if key not in ('name', 'key')} != spec:
+                    raise ValueError(f'La columna {column["name"]} cambió de tipo o categorías entre bloques')
+                handle.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+            rows += len(chunk)
+    finally:
+        for handle in files:
+            handle.close()
+
+    # Convertir cada columna a .npy copiando por bloques y calcular el hash en el mismo orden que content_hash
+    digest = hashlib.sha256()
+    for column, dtype in zip(columns, dtypes):
+        raw_path = staging / f'{column["key"]}.raw'
+        spec = {key: value for key, value in column.items() if key not in ('name', 'key')}
+        digest.update(column['name'].encode('utf-8'))
+        digest.update(json.dumps(spec, sort_keys=True).encode('utf-8'))
+
+        output = np.lib.format.open_memmap(staging / f'{column["key"]}.npy', mode='w+', dtype=dtype, shape=(rows,))
+        if rows:
+            source = np.memmap(raw_path, dtype=dtype, mode='r', shape=(rows,))
+            for start in range(0, rows, copy_rows):
+                block = np.asarray(source[start:start + copy_rows])
+                output[start:start + len(block)] = block
+                digest.update(block.tobytes())
+            del source
+        output.flush()
+        del output
+        raw_path.unlink()
+
+    digest = digest.hexdigest()
+    final = _staging_dir(data_dir, f'{name}_{created_at.strftime("%Y%m%d_%H%M%S")}_{digest[:8]}')
+    final.rmdir()
+    staging.rename(final)
+    return _publish(final, name, created_at, rows, digest, False, columns)
+
+def _staging_dir(data_dir, snapshot_name):
+    """Directorio temporal .{snapshot}.tmp vacío donde se escribe antes de publicar"""
+    staging = data_dir / f'.{snapshot_name}.tmp'
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir()
+    return staging
+
+def _publish(staging, name, created_at, rows, digest, compressed, columns):
+    """Escribir el schema.json y renombrar el directorio temporal al nombre definitivo"""
+    schema = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'name': name,
+        'created_at': created_at.isoformat(),
+        'rows': int(rows),
+        'content_hash': digest,
+        'compressed': bool(compressed),
+        'columns': columns
+    }
+    with open(staging / SCHEMA_FILE, 'w', encoding='utf-8') as f:
+        json.dump(schema, f, indent=2)
+
+    # Renombrar al final para que nunca se lea un snapshot a medio escribir
+    target = staging.parent / staging.name[1:-len('.tmp')]
+    if target.exists():
+        shutil.rmtree(staging)
+    else:
+        staging.rename(target)
+    return target
+
+def read_schema(path):
+    """Leer el schema.json de un snapshot"""
+    with open(Path(path) / SCHEMA_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_snapshot(path, mmap=True):
+    """
+    Cargar un snapshot como DataFrame
+    Con mmap=True las columnas numéricas se mapean en memoria sin copiarse
+    """
+    path = Path(path)
+    schema = read_schema(path)
+
+    if schema['compressed']:
+        with np.load(path / COMPRESSED_FILE) as archive:
+            arrays = {spec['key']: archive[spec['key']] for spec in schema['columns']}
+    else:
+        mmap_mode = 'r' if mmap else None
+        arrays = {
+            spec['key']: np.load(path / f'{spec["key"]}.npy', mmap_mode=mmap_mode)
+            for spec in schema['columns']
+        }
+
+    data = {spec['name']: _decode_column(arrays[spec['key']], spec) for spec in schema['columns']}
+    return pd.DataFrame(data, copy=False)
+
+def iter_snapshot_chunks(path, columns=None, chunk_rows=50000):
+    """
+    Recorrer un snapshot en bloques de chunk_rows filas como DataFrames
+    Las columnas se mapean en memoria, así que solo se lee el bloque actual
+    Retorna tuplas (fila inicial, DataFrame del bloque)
+    """
+    path = Path(path)
+    schema = read_schema(path)
+    specs = [spec for spec in schema['columns'] if columns is None or spec['name'] in columns]
+
+    if schema['compressed']:
+        # Un .npz comprimido no se puede mapear: cada columna se descomprime completa
+        with np.load(path / COMPRESSED_FILE) as archive:
+            arrays = {spec['key']: archive[spec['key']] for spec in specs}
+    else:
+        arrays = {spec['key']: np.load(path / f'{spec["key"]}.npy', mmap_mode='r') for spec in specs}
+
+    for start in range(0, schema['rows'], chunk_rows):
+        data = {
+            spec['name']: _decode_column(np.array(arrays[spec['key']][start:start + chunk_rows]), spec)
+            for spec in specs
+        }
+        yield start, pd.DataFrame(data)
+
+def list_snapshots(name=None, data_dir=None):
+    """Snapshots disponibles (opcionalmente de un solo tipo), del más antiguo al más reciente"""
+    data_dir = Path(data_dir or SNAPSHOTS_DIR)
+    if not data_dir.exists():
+        return []
+
+    snapshots = []
+    for schema_path in data_dir.glob(f'*/{SCHEMA_FILE}'):
+        schema = read_schema(schema_path.parent)
+        if name is None or schema['name'] == name:
+            snapshots.append((schema['created_at'], schema_path.parent))
+    return [path for _, path in sorted(snapshots)]
+
+def latest_snapshot(name, data_dir=None):
+    """Ruta del snapshot más reciente de un tipo, o None si no hay"""
+    snapshots = list_snapshots(name, data_dir)
+    return snapshots[-1] if snapshots else None
+
+if __name__ == '__main__':
+    name = sys.argv[1] if len(sys.argv) > 1 else None
+    print('📦 SNAPSHOTS DE DATOS')
+    print('=' * 60)
+    for path in list_snapshots(name):
+        schema = read_schema(path)
+        size_kb = sum(f.stat().st_size for f in path.iterdir()) / 1024
+        print(f'{path.name}: {schema["rows"]} filas, {len(schema["columns"])} columnas, '
+              f'{size_kb:.1f} KB, hash {schema["content_hash"][:12]}')
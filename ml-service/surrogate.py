@@ -0,0 +1,75 @@
+# surrogate.py
+"""
+Modelos sustitutos livianos para degradar el servicio bajo carga
+Al entrenar cada modelo se destila un árbol de decisión poco profundo ajustado a las
+predicciones del modelo elegido (no al target), que se guarda junto al .pkl como
+<artefacto>_surrogate.pkl. La API responde con él cuando el modelo principal está
+saturado (ver degradation.py)
+"""
+
+import os
+import warnings
+
+import joblib
+import numpy as np
+
+from feature_engineering import INFERENCE_DTYPE
+from profiling import measure_latency
+
+# Profundidad máxima del árbol sustituto
+SURROGATE_MAX_DEPTH = int(os.getenv('SURROGATE_MAX_DEPTH', 6))
+
+def surrogate_path(artifact, models_dir='models'):
+    """Archivo del modelo sustituto que acompaña al .pkl del modelo"""
+    return f'{models_dir}/{artifact}_surrogate.pkl'
+
+def agreement(task, reference, predicted):
+    """
+    Concordancia entre dos predicciones: R² en regresión, fracción de aciertos en
+    clasificación (promedio de los targets en modelos multi-salida)
+    """
+    from sklearn.metrics import r2_score
+
+    if task == 'regression':
+        return float(r2_score(reference, predicted))
+    return float(np.mean(np.asarray(reference) == np.asarray(predicted)))
+
+def fit_surrogate(model, X_train, X_test, y_test, task, max_depth=None):
+    """
+    Destilar un árbol de decisión de profundidad max_depth a partir de las
+    predicciones de `model` en X_train
+    Retorna (árbol, resumen con fidelidad al modelo, score frente al target y latencias)
+    """
+    from sklearn.tree import DecisionTreeRegressor, DecisionTreeClassifier
+
+    max_depth = max_depth or SURROGATE_MAX_DEPTH
+    tree_class = DecisionTreeRegressor if task == 'regression' else DecisionTreeClassifier
+    surrogate = tree_class(max_depth=max_depth, random_state=42)
+    surrogate.fit(X_train, model.predict(X_train))
+
+    teacher = model.predict(X_test)
+    student = surrogate.predict(X_test)
+    single_row = np.asarray(X_test[:1], dtype=INFERENCE_DTYPE)
+    # El árbol se ajustó con nombres de columnas y aquí se mide con el vector float32
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        model_latency = measure_latency(model.predict, single_row, repeats=100)
+        surrogate_latency = measure_latency(surrogate.predict, single_row, repeats=100)
+    return surrogate, {
+        'model_type': type(surrogate).__name__,
+        'max_depth': max_depth,
+        'fidelity': agreement(task, teacher, student),
+        'score': agreement(task, y_test, student),
+        'model_score': agreement(task, y_test, teacher),
+        'p50_ms': surrogate_latency['p50_ms'],
+        'model_p50_ms': model_latency['p50_ms']
+    }
+
+def save_surrogate(surrogate, path):
+    """Guardar el sustituto (escritura atómica: la API nunca lee un archivo a medias)"""
+    joblib.dump(surrogate, f'{path}.tmp')
+    os.replace(f'{path}.tmp', path)
+
+def load_surrogate(path):
+    """Sustituto guardado con save_surrogate, o None si no existe"""
+    return joblib.load(path) if os.path.exists(path) else None
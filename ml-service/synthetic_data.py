@@ -0,0 +1,392 @@
+# synthetic_data.py
+"""
+Generadores sintéticos escalables para pruebas de carga de entrenamiento y servicio
+- Totalmente vectorizados y generados por bloques con semillas independientes
+  (el mismo seed produce los mismos datos sin importar el tamaño de bloque elegido
+  para escribir)
+- Estacionalidad realista por día de la semana y hora, con un tráfico base y una
+  hora pico propios de cada edificio de SELECTED_BUILDINGS
+- Los datasets tienen las mismas columnas que los extractores y se pueden escribir
+  como snapshot (por bloques, sin cargar todo en memoria) o como documentos crudos
+  en una MongoDB local con inserciones masivas
+- Los snapshots van a SYNTHETIC_SNAPSHOTS_DIR (data/synthetic/), fuera de los que
+  latest_snapshot() encuentra en data/: el entrenamiento solo los usa si se pide
+  con SNAPSHOTS_DIR=data/synthetic
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from data_extractor_updated import SELECTED_BUILDINGS
+from feature_engineering import (
+    HOURS_PER_DAY,
+    apply_dtype_plan,
+    peak_hour,
+    peak_visits,
+    hourly_spread,
+    rush_visits,
+    mobility_demand_labels,
+    saturation_levels,
+)
+from snapshots import save_snapshot_chunks
+
+# Directorio de los snapshots sintéticos (separado de data/ para no mezclarlos con los reales)
+SYNTHETIC_SNAPSHOTS_DIR = Path(__file__).parent / 'data' / 'synthetic'
+
+DATASETS = ['event_data', 'mobility_data', 'saturation_data', 'building_load_data']
+
+# Colección cruda de MongoDB de la que sale cada dataset
+SOURCE_COLLECTIONS = {
+    'event_data': 'event_analytics',
+    'mobility_data': 'building_analytics',
+    'saturation_data': 'building_analytics',
+    'building_load_data': 'building_analytics'
+}
+
+# Actividad relativa por día (0=Lunes ... 6=Domingo): campus casi vacío en fin de semana
+WEEKDAY_FACTORS = np.array([1.0, 1.08, 1.05, 1.0, 0.85, 0.3, 0.12])
+
+# Peso de cada hora del día: entrada, comida y salida de clases
+HOURLY_WEIGHTS = np.array([
+    0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.2, 1.0,
+    2.6, 2.4, 1.8, 1.6, 2.0, 2.5, 1.9, 1.5,
+    1.4, 1.6, 2.1, 1.7, 0.9, 0.5, 0.2, 0.0
+])
+
+# Horas de inicio posibles de un evento (8:00 a 20:00)
+EVENT_HOURS = np.arange(8, 21)
+
+# Horas que se guardan en peakHours (las de más visitas)
+PEAK_HOURS_KEPT = 3
+
+DEFAULT_DAYS = 180
+DEFAULT_CHUNK_ROWS = 100000
+# Filas por bloque de generación: fija el resultado para un seed dado
+GENERATION_BLOCK_ROWS = 10000
+
+def building_profiles(seed):
+    """
+    Perfil fijo de cada edificio: visitantes diarios base, desplazamiento de su hora
+    pico y duración media de visita. Depende solo del seed
+    """
+    rng = np.random.default_rng([seed, 0])
+    n = len(SELECTED_BUILDINGS)
+    hourly = np.stack([np.roll(HOURLY_WEIGHTS, shift) for shift in rng.integers(-1, 2, n)])
+    return {
+        'base_visitors': rng.lognormal(mean=4.6, sigma=0.45, size=n),
+        'hourly_pvals': hourly / hourly.sum(axis=1, keepdims=True),
+        'view_duration': rng.uniform(40, 180, n)
+    }
+
+def random_days(rng, n, days):
+    """Fechas (a medianoche) uniformes en los últimos `days` días y su día de la semana"""
+    today = np.datetime64(datetime.now().date(), 'D')
+    dates = today - rng.integers(0, days, n).astype('timedelta64[D]')
+    return dates, ((dates.astype('datetime64[D]').view('int64') - 4) % 7)  # 1970-01-01 fue jueves
+
+def building_day_block(rng, n, profiles, days):
+    """
+    Filas edificio-día crudas: visitas por hora con la estacionalidad del edificio,
+    vistas, duración y eventos del día. peakHours conserva solo las horas de más visitas
+    """
+    building = rng.integers(0, len(SELECTED_BUILDINGS), n)
+    dates, day_of_week = random_days(rng, n, days)
+
+    expected = profiles['base_visitors'][building] * WEEKDAY_FACTORS[day_of_week]
+    unique_visitors = rng.poisson(expected)
+    view_count = unique_visitors + rng.poisson(unique_visitors * 1.25)
+
+    # Visitas por hora: multinomial por edificio con su perfil horario
+    hourly = np.zeros((n, HOURS_PER_DAY), dtype=np.int32)
+    for index in np.unique(building):
+        rows = building == index
+        hourly[rows] = rng.multinomial(view_count[rows], profiles['hourly_pvals'][index])
+
+    # peakHours solo registra las PEAK_HOURS_KEPT horas con más visitas
+    top = np.argpartition(hourly, -PEAK_HOURS_KEPT, axis=1)[:, -PEAK_HOURS_KEPT:]
+    peak_hours = np.zeros_like(hourly)
+    np.put_along_axis(peak_hours, top, np.take_along_axis(hourly, top, axis=1), axis=1)
+
+    return {
+        'buildingId': np.asarray(SELECTED_BUILDINGS, dtype=object)[building],
+        'date': dates,
+        'dayOfWeek': day_of_week,
+        'viewCount': view_count,
+        'uniqueVisitors': unique_visitors,
+        'peakHours': peak_hours,
+        'averageViewDuration': np.round(rng.gamma(4.0, profiles['view_duration'][building] / 4.0), 1),
+        'eventsCount': rng.poisson(np.where(day_of_week < 5, 1.2, 0.2))
+    }
+
+def event_block(rng, n, profiles, days):
+    """Filas crudas de analíticas de eventos con la estacionalidad del edificio y la hora"""
+    building = rng.integers(0, len(SELECTED_BUILDINGS), n)
+    dates, day_of_week = random_days(rng, n, days)
+    hour = rng.choice(EVENT_HOURS, n, p=HOURLY_WEIGHTS[EVENT_HOURS] / HOURLY_WEIGHTS[EVENT_HOURS].sum())
+
+    interest = profiles['base_visitors'][building] * WEEKDAY_FACTORS[day_of_week] * HOURLY_WEIGHTS[hour] / 2
+    view_count = rng.poisson(interest * rng.gamma(2.0, 1.0, n))
+    unique_visitors = rng.binomial(view_count, rng.uniform(0.35, 0.75, n))
+    category_count = rng.integers(1, 5, n)
+    popularity_score = np.round(view_count * 0.5 + unique_visitors * 1.2 + rng.normal(0, 5, n).clip(0), 2)
+    attendance = np.maximum(0, view_count * 0.3 + unique_visitors * 1.5 + rng.normal(0, 10, n)).astype(int)
+
+    return {
+        'buildingId': np.asarray(SELECTED_BUILDINGS, dtype=object)[building],
+        'date': dates + hour.astype('timedelta64[h]'),
+        'dayOfWeek': day_of_week,
+        'hour': hour,
+        'viewCount': view_count,
+        'uniqueVisitors': unique_visitors,
+        'category_count': category_count,
+        'popularityScore': popularity_score,
+        'actualAttendance': attendance
+    }
+
+def to_dataset(name, raw):
+    """Columnas del dataset `name` con las mismas reglas que data_extractor_updated.py"""
+    n = len(raw['viewCount'])
+    if name == 'event_data':
+        df = pd.DataFrame({
+            'viewCount': raw['viewCount'],
+            'uniqueVisitors': raw['uniqueVisitors'],
+            'dayOfWeek': raw['dayOfWeek'],
+            'hour': raw['hour'],
+            'category_count': raw['category_count'],
+            'popularityScore': raw['popularityScore'],
+            'attendance': raw['actualAttendance']
+        })
+        return apply_dtype_plan(df)
+
+    hourly = raw['peakHours']
+    common = {
+        'buildingId': pd.Categorical(raw['buildingId'], categories=SELECTED_BUILDINGS),
+        'viewCount': raw['viewCount'],
+        'uniqueVisitors': raw['uniqueVisitors'],
+        'dayOfWeek': raw['dayOfWeek'],
+        'hour': np.full(n, 12)
+    }
+    if name == 'mobility_data':
+        df = pd.DataFrame({
+            **common,
+            'peakHour': peak_hour(hourly, default=12),
+            'eventsCount': raw['eventsCount'],
+            'averageViewDuration': raw['averageViewDuration'],
+            'peakHourSpread': hourly_spread(hourly),
+            'rushVisits': rush_visits(hourly),
+            'mobility_demand': pd.Categorical(
+                mobility_demand_labels(raw['viewCount'], raw['uniqueVisitors'], raw['eventsCount']),
+                categories=['Alta', 'Baja', 'Media']
+            )
+        })
+    elif name == 'building_load_data':
+        total_peak_visits = peak_visits(hourly)
+        df = pd.DataFrame({
+            **common,
+            'peakHour': peak_hour(hourly, default=12),
+            'eventsCount': raw['eventsCount'],
+            'averageViewDuration': raw['averageViewDuration'],
+            'peakVisits': total_peak_visits,
+            'peakHourSpread': hourly_spread(hourly),
+            'rushVisits': rush_visits(hourly),
+            'mobility_demand': pd.Categorical(
+                mobility_demand_labels(raw['viewCount'], raw['uniqueVisitors'], raw['eventsCount']),
+                categories=['Alta', 'Baja', 'Media']
+            ),
+            'saturationLevel': saturation_levels(raw['viewCount'], raw['uniqueVisitors'], total_peak_visits)
+        })
+    else:
+        total_peak_visits = peak_visits(hourly)
+        df = pd.DataFrame({
+            **common,
+            'peakVisits': total_peak_visits,
+            'averageViewDuration': raw['averageViewDuration'],
+            'popularityScore': np.zeros(n),
+            'type': np.zeros(n, dtype=int),
+            'peakHourSpread': hourly_spread(hourly),
+            'rushVisits': rush_visits(hourly),
+            'saturationLevel': saturation_levels(raw['viewCount'], raw['uniqueVisitors'], total_peak_visits)
+        })
+    return apply_dtype_plan(df)
+
+def raw_blocks(name, n_rows, seed=42, days=DEFAULT_DAYS):
+    """
+    Bloques crudos de GENERATION_BLOCK_ROWS filas; cada bloque usa su propia semilla
+    derivada de (seed, número de bloque), así el resultado no depende de cómo se agrupen
+    """
+    profiles = building_profiles(seed)
+    block = event_block if name == 'event_data' else building_day_block
+    for number, start in enumerate(range(0, n_rows, GENERATION_BLOCK_ROWS)):
+        rng = np.random.default_rng([seed, 1, number])
+        yield block(rng, min(GENERATION_BLOCK_ROWS, n_rows - start), profiles, days)
+
+def _group_blocks(blocks, chunk_rows, combine):
+    """Agrupar bloques de generación en bloques de salida de ~chunk_rows filas"""
+    pending, pending_rows = [], 0
+    for block in blocks:
+        pending.append(block)
+        pending_rows += len(block['viewCount'])
+        if pending_rows >= chunk_rows:
+            yield combine(pending)
+            pending, pending_rows = [], 0
+    if pending:
+        yield combine(pending)
+
+def _concat_raw(blocks):
+    return {key: np.concatenate([block[key] for block in blocks]) for key in blocks[0]}
+
+def generate_chunks(name, n_rows, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42, days=DEFAULT_DAYS):
+    """DataFrames del dataset `name` en bloques de ~chunk_rows filas"""
+    for raw in _group_blocks(raw_blocks(name, n_rows, seed, days), chunk_rows, _concat_raw):
+        yield to_dataset(name, raw)
+
+def generate(name, n_rows, seed=42, days=DEFAULT_DAYS):
+    """Dataset completo en memoria (para tamaños que caben en RAM)"""
+    return pd.concat(list(generate_chunks(name, n_rows, max(n_rows, 1), seed, days)), ignore_index=True)
+
+def write_snapshot(name, n_rows, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42, days=DEFAULT_DAYS, data_dir=None):
+    """Escribir el dataset como snapshot (en SYNTHETIC_SNAPSHOTS_DIR) sin tenerlo completo en memoria"""
+    return save_snapshot_chunks(generate_chunks(name, n_rows, chunk_rows, seed, days), name,
+                                data_dir or SYNTHETIC_SNAPSHOTS_DIR)
+
+def to_documents(name, raw, now):
+    """Documentos crudos de MongoDB (igual forma que los del backend) marcados como sintéticos"""
+    dates = raw['date'].astype('datetime64[ms]').astype(datetime)
+    if name == 'event_data':
+        return [
+            {
+                'buildingId': building,
+                'date': date,
+                'viewCount': int(views),
+                'uniqueVisitors': int(visitors),
+                'category': ['sintetico'] * int(categories),
+                'popularityScore': float(popularity),
+                'actualAttendance': int(attendance),
+                'synthetic': True,
+                'createdAt': now
+            }
+            for building, date, views, visitors, categories, popularity, attendance in zip(
+                raw['buildingId'], dates, raw['viewCount'], raw['uniqueVisitors'],
+                raw['category_count'], raw['popularityScore'], raw['actualAttendance']
+            )
+        ]
+
+    rows, hour_index = np.nonzero(raw['peakHours'])
+    counts = raw['peakHours'][rows, hour_index]
+    splits = np.searchsorted(rows, np.arange(1, len(dates)))
+    peak_hours = [
+        [{'hour': int(hour), 'count': int(count)} for hour, count in zip(row_hours, row_counts)]
+        for row_hours, row_counts in zip(np.split(hour_index, splits), np.split(counts, splits))
+    ]
+    return [
+        {
+            'buildingId': building,
+            'date': date,
+            'viewCount': int(views),
+            'uniqueVisitors': int(visitors),
+            'peakHours': peaks,
+            'averageViewDuration': float(duration),
+            'synthetic': True,
+            'createdAt': now
+        }
+        for building, date, views, visitors, peaks, duration in zip(
+            raw['buildingId'], dates, raw['viewCount'], raw['uniqueVisitors'],
+            peak_hours, raw['averageViewDuration']
+        )
+    ]
+
+def write_mongo(name, n_rows, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42, days=DEFAULT_DAYS, mongo_uri=None):
+    """
+    Insertar los documentos crudos del dataset en su colección de origen con insert_many
+    Los documentos llevan synthetic=True para poder borrarlos con --drop-synthetic
+    """
+    import pymongo
+    from config import MONGO_URI
+
+    client = pymongo.MongoClient(mongo_uri or MONGO_URI)
+    try:
+        collection = client.get_database()[SOURCE_COLLECTIONS[name]]
+        now = datetime.utcnow()
+        inserted = 0
+        for raw in _group_blocks(raw_blocks(name, n_rows, seed, days), chunk_rows, _concat_raw):
+            result = collection.insert_many(to_documents(name, raw, now), ordered=False)
+            inserted += len(result.inserted_ids)
+            print(f'   📝 {inserted}/{n_rows} documentos en {collection.name}')
+        return inserted
+    finally:
+        client.close()
+
+def drop_synthetic(mongo_uri=None):
+    """Borrar los documentos sintéticos de las colecciones de origen"""
+    import pymongo
+    from config import MONGO_URI
+
+    client = pymongo.MongoClient(mongo_uri or MONGO_URI)
+    try:
+        db = client.get_database()
+        for collection in sorted(set(SOURCE_COLLECTIONS.values())):
+            deleted = db[collection].delete_many({'synthetic': True}).deleted_count
+            print(f'🧹 {collection}: {deleted} documentos sintéticos eliminados')
+    finally:
+        client.close()
+
+def parse_args(argv=None):
+    """Opciones de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Generar datasets sintéticos para pruebas de carga')
+    parser.add_argument('datasets', nargs='*', help=f'Datasets a generar: {", ".join(DATASETS)} (por defecto todos)')
+    parser.add_argument('--rows', type=int, default=1000000, help='Filas por dataset')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help='Filas por bloque escrito')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla base')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help='Días hacia atrás que cubren las fechas')
+    parser.add_argument('--data-dir', default=str(SYNTHETIC_SNAPSHOTS_DIR),
+                        help='Directorio de los snapshots (por defecto data/synthetic/, que el entrenamiento '
+                             'solo lee con SNAPSHOTS_DIR=data/synthetic)')
+    parser.add_argument('--mongo', action='store_true',
+                        help='Insertar documentos crudos en MongoDB (MONGO_URI) en lugar de escribir snapshots')
+    parser.add_argument('--mongo-uri', default=None, help='URI de MongoDB (por defecto MONGO_URI)')
+    parser.add_argument('--drop-synthetic', action='store_true',
+                        help='Borrar de MongoDB los documentos sintéticos insertados antes')
+    args = parser.parse_args(argv)
+    unknown = set(args.datasets) - set(DATASETS)
+    if unknown:
+        parser.error(f'Datasets desconocidos: {", ".join(sorted(unknown))}')
+    args.datasets = args.datasets or list(DATASETS)
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.drop_synthetic:
+        drop_synthetic(args.mongo_uri)
+        return 0
+
+    # mobility_data y saturation_data salen de la misma colección: insertar una sola vez
+    datasets = args.datasets
+    if args.mongo:
+        datasets = list({SOURCE_COLLECTIONS[name]: name for name in reversed(datasets)}.values())
+
+    for name in datasets:
+        started = time.perf_counter()
+        print(f'\n🧪 {name}: {args.rows} filas (seed {args.seed}, bloques de {args.chunk_rows})')
+        if args.mongo:
+            count = write_mongo(name, args.rows, args.chunk_rows, args.seed, args.days, args.mongo_uri)
+            target = SOURCE_COLLECTIONS[name]
+        else:
+            target = write_snapshot(name, args.rows, args.chunk_rows, args.seed, args.days, args.data_dir)
+            count = args.rows
+        elapsed = time.perf_counter() - started
+        print(f'✅ {count} filas → {target} ({elapsed:.1f}s, {count / elapsed:,.0f} filas/s)')
+    return 0
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print('\n❌ Generación cancelada por el usuario')
+        sys.exit(1)
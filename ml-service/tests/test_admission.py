@@ -0,0 +1,90 @@
+# tests/test_admission.py
+"""
+Pruebas del control de admisión (admission.py): limpieza de la cola cuando una
+solicitud agota su espera o se cancela, y desplazamiento de bulk por interactivas
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import admission
+from admission import acquire, release, queue_depth, gate
+
+@pytest.fixture(autouse=True)
+def small_limits(monkeypatch):
+    """Un cálculo a la vez, cola de 3 y 50 ms de espera; estado limpio en cada prueba"""
+    monkeypatch.setattr(admission, 'ADMISSION_MAX_INFLIGHT', 1)
+    monkeypatch.setattr(admission, 'ADMISSION_MAX_QUEUE', 3)
+    monkeypatch.setattr(admission, 'ADMISSION_QUEUE_TIMEOUT_MS', 50)
+    monkeypatch.setattr(admission, 'gates', {})
+
+async def rejection(name, lane):
+    """Detalle del 429 de una solicitud que no consigue lugar"""
+    with pytest.raises(HTTPException) as error:
+        await acquire(name, lane)
+    assert error.value.status_code == 429
+    return error.value.detail
+
+def test_timed_out_waiters_leave_the_queue():
+    async def scenario():
+        await acquire('m', 'interactive')
+        details = await asyncio.gather(*(rejection('m', 'interactive') for _ in range(3)))
+        assert all('espera agotada' in detail for detail in details)
+        assert queue_depth('m') == 0
+        # La siguiente solicitud espera su turno en lugar de encontrar la cola llena
+        assert 'espera agotada' in await rejection('m', 'interactive')
+        release('m')
+        assert gate('m')['active'] == 0
+
+    asyncio.run(scenario())
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        await acquire('m', 'bulk')
+        waiting = asyncio.ensure_future(acquire('m', 'bulk'))
+        await asyncio.sleep(0.01)
+        assert queue_depth('m') == 1
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert queue_depth('m') == 0
+        # El lugar liberado no se pierde en la solicitud cancelada
+        release('m')
+        assert gate('m')['active'] == 0
+
+    asyncio.run(scenario())
+
+def test_interactive_displaces_newest_bulk(monkeypatch):
+    monkeypatch.setattr(admission, 'ADMISSION_QUEUE_TIMEOUT_MS', 1000)
+    monkeypatch.setattr(admission, 'ADMISSION_MAX_QUEUE', 2)
+
+    async def scenario():
+        await acquire('m', 'interactive')
+        oldest = asyncio.ensure_future(acquire('m', 'bulk'))
+        newest = asyncio.ensure_future(acquire('m', 'bulk'))
+        await asyncio.sleep(0.01)
+        assert queue_depth('m') == 2
+
+        interactive = asyncio.ensure_future(acquire('m', 'interactive'))
+        with pytest.raises(HTTPException) as error:
+            await newest
+        assert error.value.status_code == 429 and 'desplazada' in error.value.detail
+        assert queue_depth('m') == 2
+
+        # Al liberarse el lugar pasa primero la interactiva, después la bulk que quedó
+        release('m')
+        await interactive
+        assert not oldest.done()
+        release('m')
+        await oldest
+        release('m')
+        assert gate('m')['active'] == 0
+        assert gate('m')['rejected'] == {'interactive': 0, 'bulk': 1}
+
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+# tests/test_api.py
+"""
+Pruebas de los endpoints de predicción de api.py con modelos pequeños en memoria
+(no necesitan models/ ni MongoDB)
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestRegressor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import api
+from warmup import mark_ready
+
+EVENT = {'viewCount': 120, 'uniqueVisitors': 45, 'dayOfWeek': 2, 'hour': 14,
+         'category_count': 2, 'popularityScore': 0.7}
+
+@pytest.fixture
+def client():
+    """Cliente sin lifespan: cada prueba publica sus propios modelos"""
+    return TestClient(api.app)
+
+@pytest.fixture
+def attendance_without_stats(monkeypatch):
+    """Forest de asistencia publicado sin estadísticas por hoja (sin _quantiles.npz)"""
+    features = api.DEFAULT_FEATURES['attendance']
+    rng = np.random.default_rng(0)
+    X = rng.random((60, len(features))) * 100
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, X[:, 0] + X[:, 1])
+    monkeypatch.setattr(api, 'attendance_model', model)
+    monkeypatch.setattr(api, 'attendance_metadata', {'model_type': 'RandomForestRegressor', 'features': features})
+    monkeypatch.setattr(api, 'attendance_quantiles', None)
+    mark_ready('attendance', model, {})
+    return model
+
+def test_attendance_without_leaf_statistics(client, attendance_without_stats):
+    response = client.post('/predict/attendance', json=EVENT)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['quantiles'] is None
+    assert body['prediction'] >= 0
+    assert body['served_by'] == 'primary'
+
+def test_attendance_batch_without_leaf_statistics(client, attendance_without_stats):
+    response = client.post('/predict/attendance/batch', json={'items': [EVENT, {**EVENT, 'viewCount': 10}]})
+
+    assert response.status_code == 200
+    predictions = response.json()['predictions']
+    assert len(predictions) == 2
+    assert all(prediction['quantiles'] is None for prediction in predictions)
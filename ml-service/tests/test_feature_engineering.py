@@ -0,0 +1,355 @@
+# tests/test_feature_engineering.py
+"""
+Paridad de la ingeniería de features vectorizada (feature_engineering.py) con los
+ciclos por documento que reemplazó en data_extractor_updated.py,
+train_mobility_model.py y train_saturation_model.py
+Los ciclos de referencia son los originales sin las consultas a MongoDB; los
+documentos incluyen los casos borde de peakHours, fechas y cortes de las reglas
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import train_mobility_model
+import train_saturation_model
+from data_extractor_updated import event_frame, mobility_frame, saturation_frame
+from feature_engineering import first_peak_hour, peak_hours_total
+
+DAY = datetime(2026, 10, 5, 9, 30)
+
+# Analíticas de edificios (las fechas llegan de MongoDB como datetime o faltan)
+BUILDING_ANALYTICS = [
+    {'buildingId': 'E-12', 'date': DAY, 'viewCount': 100, 'uniqueVisitors': 40, 'averageViewDuration': 3.5,
+     'peakHours': [{'hour': 9, 'count': 12}, {'hour': 14, 'count': 30}, {'hour': 16, 'count': 5}]},
+    {'buildingId': 'E-13', 'date': DAY, 'viewCount': 80, 'uniqueVisitors': 20, 'peakHours': []},
+    {'buildingId': 'E-14', 'date': DAY, 'viewCount': 60, 'uniqueVisitors': 30},
+    # Todas las entradas en cero: gana la primera
+    {'buildingId': 'E-16', 'date': DAY, 'viewCount': 10, 'uniqueVisitors': 5,
+     'peakHours': [{'hour': 15, 'count': 0}, {'hour': 8, 'count': 0}]},
+    # Empate: gana la primera de la lista, no la hora más temprana
+    {'buildingId': 'E-18', 'date': DAY, 'viewCount': 90, 'uniqueVisitors': 50,
+     'peakHours': [{'hour': 17, 'count': 7}, {'hour': 10, 'count': 7}]},
+    # Horas fuera de 0-23: cuentan en peakVisits y pueden ser la hora pico
+    {'buildingId': 'E-19', 'date': DAY, 'viewCount': 120, 'uniqueVisitors': 60,
+     'peakHours': [{'hour': 25, 'count': 40}, {'hour': -1, 'count': 3}, {'hour': 11, 'count': 10}]},
+    # Entradas sin hora o sin count
+    {'buildingId': 'E-20', 'date': DAY, 'viewCount': 30, 'uniqueVisitors': 10,
+     'peakHours': [{'count': 6}, {'hour': 13}]},
+    # Sin fecha
+    {'buildingId': 'E-21', 'date': None, 'viewCount': 200, 'uniqueVisitors': 90,
+     'peakHours': [{'hour': 12, 'count': 4}]},
+    {'buildingId': 'E-23', 'viewCount': 70, 'uniqueVisitors': 35},
+    # Score de saturación exactamente en los cortes 50, 100 y 150
+    {'buildingId': 'E-25', 'date': DAY, 'viewCount': 0, 'uniqueVisitors': 0,
+     'peakHours': [{'hour': 10, 'count': 100}]},
+    {'buildingId': 'E-26', 'date': DAY, 'viewCount': 0, 'uniqueVisitors': 0,
+     'peakHours': [{'hour': 10, 'count': 150}, {'hour': 11, 'count': 50}]},
+    {'buildingId': 'E-27', 'date': DAY, 'viewCount': 0, 'uniqueVisitors': 0,
+     'peakHours': [{'hour': 10, 'count': 300}]},
+    # Score de movilidad exactamente en los cortes 50 y 100 (5 y 10 eventos ese día)
+    {'buildingId': 'E-27-B', 'date': DAY, 'viewCount': 0, 'uniqueVisitors': 0, 'peakHours': []},
+    {'buildingId': 'E-12', 'date': datetime(2026, 10, 6, 8), 'viewCount': 0, 'uniqueVisitors': 0}
+]
+
+# Eventos del mismo día: solo cuentan los que empiezan desde la fecha de la analítica
+EVENTS = (
+    [{'building': 'E-27-B', 'date': datetime(2026, 10, 5, 10 + i)} for i in range(5)]
+    + [{'building': 'E-12', 'date': datetime(2026, 10, 6, 8 + i)} for i in range(10)]
+    + [{'building': 'E-12', 'date': datetime(2026, 10, 5, 8)},
+       {'building': 'E-12', 'date': datetime(2026, 10, 5, 18)},
+       {'building': 'E-13', 'date': datetime(2026, 10, 6, 1)}]
+)
+
+EVENT_ANALYTICS = [
+    {'date': DAY, 'viewCount': 150, 'uniqueVisitors': 70, 'category': ['a', 'b'], 'popularityScore': 320,
+     'actualAttendance': 55},
+    {'date': '2026-10-07T18:45:00Z', 'viewCount': 20, 'uniqueVisitors': 8, 'category': [],
+     'actualAttendance': 0, 'attendancePrediction': 12},
+    {'date': '2026-10-08T07:15:00', 'viewCount': 5, 'uniqueVisitors': 3, 'popularityScore': 150},
+    {'date': None, 'viewCount': 210, 'uniqueVisitors': 101, 'category': ['x'], 'popularityScore': 500},
+    {'viewCount': 61, 'uniqueVisitors': 31, 'popularityScore': 151, 'attendancePrediction': 0}
+]
+
+# Documentos de los entrenadores independientes: fechas como texto ISO o datetime;
+# las que no son ni lo uno ni lo otro se descartan
+LEGACY_BUILDING_ANALYTICS = BUILDING_ANALYTICS[:7] + [
+    {'buildingId': 'E-21', 'date': '2026-10-05T16:00:00Z', 'viewCount': 301, 'uniqueVisitors': 20,
+     'peakHours': [{'hour': 16, 'count': 9}]},
+    {'buildingId': 'E-23', 'date': None, 'viewCount': 70, 'uniqueVisitors': 35},
+    {'buildingId': 'E-25', 'date': 20261005, 'viewCount': 70, 'uniqueVisitors': 35},
+    {'buildingId': 'E-26', 'date': DAY, 'viewCount': 200, 'uniqueVisitors': 100},
+    {'buildingId': 'E-27', 'date': DAY, 'viewCount': 100, 'uniqueVisitors': 150}
+]
+LEGACY_EVENTS = [
+    {'building_assigned': 'E-12', 'date_time': '2026-10-05T20:00:00Z'},
+    {'building_assigned': 'E-12', 'date_time': datetime(2026, 10, 5, 7)},
+    {'building_assigned': 'E-21', 'date_time': '2026-10-05T01:00:00Z'},
+    {'building_assigned': 'E-18', 'date_time': 'mañana'},
+    {'building_assigned': 'E-18', 'date_time': None},
+    {'building_assigned': 'E-19', 'date_time': '2026-10-06T10:00:00Z'}
+]
+
+class FakeCollection:
+    """Colección en memoria: find retorna todos los documentos (los filtros se aplican después)"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, *args, **kwargs):
+        return list(self.documents)
+
+class FakeDb:
+    def __init__(self, **collections):
+        for name, documents in collections.items():
+            setattr(self, name, FakeCollection(documents))
+
+def parse_loop_date(value):
+    """Fecha de un documento como la interpretaban los ciclos originales (None si se descarta)"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value if isinstance(value, datetime) else None
+
+def loop_peak_hour(peak_hours, default=12):
+    if peak_hours and len(peak_hours) > 0:
+        return max(peak_hours, key=lambda x: x.get('count', 0)).get('hour', 12)
+    return default
+
+def loop_event_rows(documents):
+    """Ciclo original de extract_event_data"""
+    data = []
+    for analytics in documents:
+        event_date = analytics.get('date')
+        if isinstance(event_date, str):
+            event_date = datetime.fromisoformat(event_date.replace('Z', '+00:00'))
+        if event_date:
+            day_of_week, hour = event_date.weekday(), event_date.hour
+        else:
+            day_of_week, hour = 0, 12
+        data.append({
+            'viewCount': analytics.get('viewCount', 0),
+            'uniqueVisitors': analytics.get('uniqueVisitors', 0),
+            'dayOfWeek': day_of_week,
+            'hour': hour,
+            'category_count': len(analytics.get('category', [])),
+            'popularityScore': analytics.get('popularityScore', 0),
+            'attendance': analytics.get('actualAttendance') or analytics.get('attendancePrediction') or analytics.get('uniqueVisitors', 0)
+        })
+    return pd.DataFrame(data)
+
+def loop_mobility_rows(documents, events):
+    """Ciclo original de extract_mobility_data (count_documents sobre la lista de eventos)"""
+    data = []
+    for analytics in documents:
+        date = analytics.get('date')
+        building_id = analytics.get('buildingId')
+        events_count = 0
+        if date and building_id:
+            end_of_day = datetime.combine(date, datetime.max.time())
+            events_count = sum(1 for event in events
+                               if event['building'] == building_id and date <= event['date'] < end_of_day)
+        view_count = analytics.get('viewCount', 0)
+        unique_visitors = analytics.get('uniqueVisitors', 0)
+        score = (view_count * 0.4) + (unique_visitors * 0.3) + (events_count * 10)
+        demand = 'Alta' if score > 100 else 'Media' if score > 50 else 'Baja'
+        data.append({
+            'buildingId': building_id,
+            'viewCount': view_count,
+            'uniqueVisitors': unique_visitors,
+            'dayOfWeek': date.weekday() if date else 0,
+            'hour': 12,
+            'peakHour': loop_peak_hour(analytics.get('peakHours', [])),
+            'eventsCount': events_count,
+            'averageViewDuration': analytics.get('averageViewDuration', 0),
+            'mobility_demand': demand
+        })
+    return pd.DataFrame(data)
+
+def loop_saturation_rows(documents):
+    """Ciclo original de extract_saturation_data"""
+    data = []
+    for analytics in documents:
+        peak_visits = sum(ph.get('count', 0) for ph in analytics.get('peakHours', []))
+        view_count = analytics.get('viewCount', 0)
+        unique_visitors = analytics.get('uniqueVisitors', 0)
+        score = (view_count * 0.3) + (unique_visitors * 0.2) + (peak_visits * 0.5)
+        saturation = 3 if score > 150 else 2 if score > 100 else 1 if score > 50 else 0
+        data.append({
+            'buildingId': analytics.get('buildingId'),
+            'viewCount': view_count,
+            'uniqueVisitors': unique_visitors,
+            'dayOfWeek': analytics.get('date').weekday() if analytics.get('date') else 0,
+            'hour': 12,
+            'peakVisits': peak_visits,
+            'averageViewDuration': analytics.get('averageViewDuration', 0),
+            'popularityScore': 0,
+            'type': 0,
+            'saturationLevel': saturation
+        })
+    return pd.DataFrame(data)
+
+def loop_legacy_mobility_rows(documents, events):
+    """Ciclo original de train_mobility_model.extract_mobility_data"""
+    events_by_building = {}
+    for event in events:
+        event_date = event.get('date_time')
+        if isinstance(event_date, str):
+            try:
+                event_date = datetime.fromisoformat(event_date.replace('Z', '+00:00'))
+            except ValueError:
+                continue
+        elif not isinstance(event_date, datetime):
+            continue
+        day_counts = events_by_building.setdefault(event['building_assigned'], {})
+        day_counts[event_date.date()] = day_counts.get(event_date.date(), 0) + 1
+
+    data = []
+    for analytics in documents:
+        analytics_date = parse_loop_date(analytics.get('date'))
+        if analytics_date is None:
+            continue
+        events_count = events_by_building.get(analytics.get('buildingId'), {}).get(analytics_date.date(), 0)
+        data.append({
+            'viewCount': analytics.get('viewCount', 0),
+            'uniqueVisitors': analytics.get('uniqueVisitors', 0),
+            'dayOfWeek': analytics_date.weekday(),
+            'hour': analytics_date.hour,
+            'peakHour': loop_peak_hour(analytics.get('peakHours', []), default=0),
+            'eventsCount': events_count,
+            'averageViewDuration': analytics.get('averageViewDuration', 0),
+            'mobilityDemand': analytics.get('uniqueVisitors', 0) * (1 + events_count * 0.5)
+        })
+    return pd.DataFrame(data)
+
+def loop_legacy_saturation_rows(building_documents, event_documents):
+    """Ciclo original de train_saturation_model.extract_saturation_data"""
+    data = []
+    for analytics in building_documents:
+        analytics_date = parse_loop_date(analytics.get('date'))
+        if analytics_date is None:
+            continue
+        peak_hours = analytics.get('peakHours', [])
+        unique_visitors = analytics.get('uniqueVisitors', 0)
+        view_count = analytics.get('viewCount', 0)
+        if unique_visitors > 150 or view_count > 300:
+            level = 3
+        elif unique_visitors > 100 or view_count > 200:
+            level = 2
+        elif unique_visitors > 50 or view_count > 100:
+            level = 1
+        else:
+            level = 0
+        data.append({
+            'viewCount': view_count,
+            'uniqueVisitors': unique_visitors,
+            'dayOfWeek': analytics_date.weekday(),
+            'hour': analytics_date.hour,
+            'peakVisits': sum(ph.get('count', 0) for ph in peak_hours) if peak_hours else 0,
+            'averageViewDuration': analytics.get('averageViewDuration', 0),
+            'type': 0,
+            'saturationLevel': level
+        })
+    for analytics in event_documents:
+        analytics_date = parse_loop_date(analytics.get('date'))
+        if analytics_date is None:
+            continue
+        unique_visitors = analytics.get('uniqueVisitors', 0)
+        view_count = analytics.get('viewCount', 0)
+        popularity_score = analytics.get('popularityScore', 0)
+        if unique_visitors > 100 or view_count > 200 or popularity_score > 500:
+            level = 3
+        elif unique_visitors > 60 or view_count > 120 or popularity_score > 300:
+            level = 2
+        elif unique_visitors > 30 or view_count > 60 or popularity_score > 150:
+            level = 1
+        else:
+            level = 0
+        data.append({
+            'viewCount': view_count,
+            'uniqueVisitors': unique_visitors,
+            'dayOfWeek': analytics_date.weekday(),
+            'hour': analytics_date.hour,
+            'peakVisits': 0,
+            'averageViewDuration': 0,
+            'popularityScore': popularity_score,
+            'type': 1,
+            'saturationLevel': level
+        })
+    return pd.DataFrame(data)
+
+def assert_same_rows(result, expected):
+    """Mismas filas, columnas del ciclo y valores (los tipos compactos pueden diferir)"""
+    pd.testing.assert_frame_equal(
+        result[list(expected.columns)].reset_index(drop=True).astype(object),
+        expected.astype(object),
+        check_dtype=False
+    )
+
+@pytest.fixture
+def legacy_db(monkeypatch):
+    """Entrenadores independientes leyendo colecciones en memoria en lugar de MongoDB"""
+    db = FakeDb(building_analytics=LEGACY_BUILDING_ANALYTICS, events=LEGACY_EVENTS,
+                event_analytics=EVENT_ANALYTICS)
+    fetch = lambda collection, *args, **kwargs: collection.find()
+    for module in (train_mobility_model, train_saturation_model):
+        monkeypatch.setattr(module, 'connect_to_mongodb', lambda: db)
+        monkeypatch.setattr(module, 'fetch_partitioned', fetch)
+    return db
+
+def test_peak_hours_edge_cases():
+    peak_hours = [doc.get('peakHours', []) for doc in BUILDING_ANALYTICS]
+    assert first_peak_hour(peak_hours).tolist() == [loop_peak_hour(ph) for ph in peak_hours]
+    assert first_peak_hour(peak_hours, default=0).tolist() == [loop_peak_hour(ph, default=0) for ph in peak_hours]
+    assert peak_hours_total(peak_hours).tolist() == [sum(ph.get('count', 0) for ph in hours) for hours in peak_hours]
+
+def test_event_rows_match_loop():
+    assert_same_rows(event_frame(EVENT_ANALYTICS), loop_event_rows(EVENT_ANALYTICS))
+
+def test_mobility_rows_match_loop():
+    expected = loop_mobility_rows(BUILDING_ANALYTICS, EVENTS)
+    result = mobility_frame(FakeDb(events=EVENTS), BUILDING_ANALYTICS)
+    assert_same_rows(result, expected)
+    # Los cortes exactos de la regla no suben de nivel (score > corte)
+    assert expected['mobility_demand'].tolist()[-2:] == ['Baja', 'Media']
+
+def test_saturation_rows_match_loop():
+    expected = loop_saturation_rows(BUILDING_ANALYTICS)
+    assert_same_rows(saturation_frame(BUILDING_ANALYTICS), expected)
+    assert expected['saturationLevel'].tolist()[9:12] == [0, 1, 2]
+
+def test_legacy_mobility_rows_match_loop(legacy_db):
+    assert_same_rows(train_mobility_model.extract_mobility_data(),
+                     loop_legacy_mobility_rows(LEGACY_BUILDING_ANALYTICS, LEGACY_EVENTS))
+
+def test_legacy_saturation_rows_match_loop(legacy_db):
+    assert_same_rows(train_saturation_model.extract_saturation_data(),
+                     loop_legacy_saturation_rows(LEGACY_BUILDING_ANALYTICS, EVENT_ANALYTICS))
+
+def test_hourly_rows_keep_daily_labels_and_uncovered_days():
+    cubes = pd.DataFrame({
+        'resourceId': ['E-12', 'E-12', 'E-25'],
+        'hour': [datetime(2026, 10, 5, 9), datetime(2026, 10, 5, 14), datetime(2026, 10, 5, 10)],
+        'viewCount': [3, 4, 1],
+        'uniqueVisitors': [2, 2, 1]
+    })
+    daily = saturation_frame(BUILDING_ANALYTICS)
+    hourly = saturation_frame(BUILDING_ANALYTICS, cubes=cubes)
+
+    # Dos filas horarias de E-12 el día 5 con el nivel y peakVisits del día
+    e12 = hourly[(hourly['buildingId'] == 'E-12') & (hourly['hour'] != 12)]
+    assert e12['hour'].tolist() == [9, 14]
+    assert e12['viewCount'].tolist() == [3, 4]
+    assert set(e12['saturationLevel']) == {daily['saturationLevel'][0]}
+    assert set(e12['peakVisits']) == {daily['peakVisits'][0]}
+    # Las filas sin cubos se conservan como diarias
+    assert len(hourly) == len(daily) + 1
+    assert (hourly['buildingId'] == 'E-13').sum() == 1
+
+def test_hourly_rows_without_cubes_fall_back_to_daily():
+    empty = pd.DataFrame(columns=['resourceId', 'hour', 'viewCount', 'uniqueVisitors'])
+    assert_same_rows(saturation_frame(BUILDING_ANALYTICS, cubes=empty), saturation_frame(BUILDING_ANALYTICS))
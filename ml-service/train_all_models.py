@@ -6,16 +6,117 @@ Usa datos de los 13 edificios modulares
 
 import sys
 import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
 
 # Importar extractores
 from data_extractor_updated import (
     extract_event_data,
     extract_mobility_data,
     extract_saturation_data,
+    extract_building_load_data,
     verify_data_quality
 )
+from snapshots import latest_snapshot, load_snapshot, content_hash
+from feature_engineering import apply_dtype_plan
+from estimators import (
+    candidate_families, build_estimator, parse_family_overrides, load_tuned_hyperparameters,
+    is_incremental, is_multi_output, ESTIMATOR_FAMILIES
+)
+from out_of_core import load_sample, streaming_source, exclude_rows, fit_incremental
+from profiling import (
+    fit_candidates, select_within_budget, serving_budget, serving_profile, print_selection_report
+)
+from feature_pruning import feature_selection, FEATURE_PRUNING_TOLERANCE
+from building_models import (
+    train_building_models, BUILDING_MODEL_MIN_SAMPLES, BUILDING_MODEL_TREES, BUILDING_MODEL_MAX_DEPTH
+)
+from surrogate import fit_surrogate, save_surrogate, surrogate_path, SURROGATE_MAX_DEPTH
+import leaf_quantiles
+
+# Resultado de un entrenamiento omitido porque datos y configuración no cambiaron
+SKIPPED = 'skipped'
+# Resultado de un entrenamiento en paralelo cuyos candidatos esperan el perfilado en serie
+PENDING = 'pending'
+
+# Fracción del entrenamiento reservada para elegir la familia (test solo se usa en el reporte final)
+VALIDATION_SIZE = 0.2
+# Candidatos entrenados en el pool de procesos, a la espera de perfilarse en serie
+CANDIDATES_DIR = Path('models/candidates')
+# Tiempo de reloj de la última ejecución --sequential completa por configuración
+# (referencia para la aceleración del modo en paralelo)
+TIMINGS_PATH = Path('models/training_timings.json')
+
+# Código que determina cómo se entrena un modelo (forma parte de la huella)
+FINGERPRINT_SOURCES = [
+    'train_all_models.py', 'estimators.py', 'profiling.py', 'out_of_core.py', 'feature_pruning.py', 'leaf_quantiles.py',
+    'building_models.py', 'surrogate.py'
+]
+
+# Definición de cada modelo: dataset, features, target y archivos del artefacto
+MODEL_SPECS = {
+    'attendance': {
+        'dataset': 'event_data',
+        'extractor': extract_event_data,
+        'features': ['viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour', 'category_count', 'popularityScore'],
+        'target': 'attendance',
+        'task': 'regression',
+        'artifact': 'attendance_predictor'
+    },
+    'mobility': {
+        'dataset': 'mobility_data',
+        'extractor': extract_mobility_data,
+        'features': ['viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour', 'peakHour', 'eventsCount', 'averageViewDuration'],
+        'target': 'mobility_demand',
+        'task': 'classification',
+        'artifact': 'mobility_demand_predictor'
+    },
+    'saturation': {
+        'dataset': 'saturation_data',
+        'extractor': extract_saturation_data,
+        'features': ['viewCount', 'uniqueVisitors', 'peakVisits', 'averageViewDuration', 'popularityScore', 'type'],
+        'target': 'saturationLevel',
+        'task': 'classification',
+        'artifact': 'saturation_predictor'
+    }
+}
+
+# Modelos multi-salida: un solo estimador predice varios targets con las mismas features
+# (fuera de MODEL_SPECS porque el re-entrenamiento incremental y el ajuste de
+# hiperparámetros trabajan con un solo target)
+MULTI_OUTPUT_SPECS = {
+    'building_load': {
+        'dataset': 'building_load_data',
+        'extractor': extract_building_load_data,
+        'features': ['viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour', 'peakHour', 'eventsCount',
+                     'averageViewDuration', 'peakVisits'],
+        'targets': ['mobility_demand', 'saturationLevel'],
+        'task': 'classification',
+        'artifact': 'building_load_predictor'
+    }
+}
+
+def model_spec(name):
+    """Definición de un modelo de MODEL_SPECS o MULTI_OUTPUT_SPECS"""
+    return MODEL_SPECS[name] if name in MODEL_SPECS else MULTI_OUTPUT_SPECS[name]
+
+def target_columns(spec):
+    """Columnas target de un modelo (una sola salvo en los multi-salida)"""
+    return spec.get('targets') or [spec['target']]
+
+def model_paths(name):
+    """Rutas del modelo (.pkl) y su metadata (.json)"""
+    artifact = model_spec(name)['artifact']
+    return f'models/{artifact}.pkl', f'models/{artifact}_metadata.json'
 
 def ensure_directories():
     """Crear directorios necesarios"""
@@ -24,7 +125,300 @@ def ensure_directories():
         Path(dir_name).mkdir(exist_ok=True)
         print(f'✅ Directorio {dir_name}/ verificado')
 
-def train_attendance_model():
+def load_training_data(name, extractor, from_snapshot=False):
+    """
+    Obtener el dataset de entrenamiento: el snapshot más reciente si se pide
+    (carga mapeada en memoria, sin consultar MongoDB) o una extracción nueva
+    """
+    if from_snapshot:
+        snapshot_path = latest_snapshot(name)
+        if snapshot_path is not None:
+            # Los snapshots anteriores al plan de tipos se compactan al cargarlos
+            df = apply_dtype_plan(load_snapshot(snapshot_path))
+            print(f'📦 Snapshot cargado: {snapshot_path.name} ({len(df)} registros)')
+            return df
+        print(f'⚠️  No hay snapshots de {name}, extrayendo de MongoDB...')
+    return extractor(days_back=90)
+
+def load_model_data(name, from_snapshot=False, out_of_core=False):
+    """
+    Dataset de entrenamiento de un modelo: completo, o en modo out-of-core una
+    muestra de tamaño fijo leída por bloques del snapshot (estratificada por clase
+    en los clasificadores)
+    En modo out-of-core la extracción también va por bloques: cada partición de
+    MongoDB se escribe directo al snapshot sin armar el DataFrame completo
+    """
+    spec = model_spec(name)
+    if not out_of_core:
+        return load_training_data(spec['dataset'], spec['extractor'], from_snapshot)
+
+    snapshot_path = latest_snapshot(spec['dataset']) if from_snapshot else None
+    if snapshot_path is None:
+        print(f'📥 Extrayendo {spec["dataset"]} por bloques a un snapshot...')
+        snapshot_path = spec['extractor'](days_back=90, chunked=True)
+
+    # En los multi-salida la muestra se estratifica por el primer target
+    targets = target_columns(spec)
+    df = load_sample(snapshot_path, spec['features'] + targets[1:], targets[0],
+                     stratify=spec['task'] == 'classification')
+    info = df.attrs['out_of_core']
+    print(f'📦 Out-of-core: muestra de {info["sample_rows"]} de {info["rows"]} registros '
+          f'({"estratificada" if info["stratified"] else "uniforme"}, bloques de {info["chunk_rows"]})')
+    return df
+
+def training_fingerprint(name, df, families, prune_features=False, building_models=False):
+    """
+    Huella del entrenamiento de un modelo:
+    - data_hash: hash del contenido de las columnas de features y target
+      (y buildingId con modelos por edificio)
+    - config_hash: hash de features, familias candidatas con sus hiperparámetros
+      (incluidos los ajustados), presupuesto de servicio, poda de features, modelos
+      por edificio, profundidad del sustituto, versión de scikit-learn y código
+    """
+    import sklearn
+
+    spec = model_spec(name)
+    code_digest = hashlib.sha256()
+    for source in FINGERPRINT_SOURCES:
+        code_digest.update((Path(__file__).parent / source).read_bytes())
+
+    config = {
+        'features': spec['features'],
+        'target': target_columns(spec),
+        'candidates': {
+            family: build_estimator(family, spec['task'],
+                                    **(load_tuned_hyperparameters(name, family) or {}).get('params', {}))[1]
+            for family in families
+        },
+        'serving_budget': serving_budget(),
+        'feature_pruning': FEATURE_PRUNING_TOLERANCE if prune_features else None,
+        'building_models': [BUILDING_MODEL_MIN_SAMPLES, BUILDING_MODEL_TREES, BUILDING_MODEL_MAX_DEPTH]
+                           if building_models else None,
+        'surrogate_max_depth': SURROGATE_MAX_DEPTH,
+        'out_of_core': bool(df.attrs.get('out_of_core')),
+        'sklearn': sklearn.__version__,
+        'code': code_digest.hexdigest()
+    }
+    return {
+        'data_hash': content_hash(df[spec['features'] + target_columns(spec)
+                                     + (['buildingId'] if building_models and 'buildingId' in df else [])]),
+        'config_hash': hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    }
+
+def is_up_to_date(name, fingerprint):
+    """True si el artefacto publicado se entrenó con la misma huella"""
+    model_path, metadata_path = model_paths(name)
+    if not os.path.exists(model_path) or not os.path.exists(metadata_path):
+        return False
+    with open(metadata_path, 'r') as f:
+        return json.load(f).get('fingerprint') == fingerprint
+
+def fit_leaf_quantiles(name, model, X_train, y_train, X_test, y_test):
+    """
+    Estadísticas por hoja para intervalos de predicción de un forest de regresión,
+    calibradas con la primera mitad de test y evaluadas con la segunda
+    Otros modelos no tienen intervalos: se borra el archivo de un entrenamiento anterior
+    Retorna el resumen para la metadata o None
+    """
+    path = leaf_quantiles.quantiles_path(MODEL_SPECS[name]['artifact'])
+    if not leaf_quantiles.supports_leaf_quantiles(model):
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+
+    half = len(X_test) // 2
+    stats = leaf_quantiles.leaf_statistics(model, X_train, y_train)
+    leaf_quantiles.calibrate(model, stats, X_test[:half], y_test[:half])
+    coverage = leaf_quantiles.interval_coverage(model, stats, X_test[half:], y_test[half:])
+    leaf_quantiles.save_leaf_statistics(stats, path)
+    print(f'📐 Intervalos p{round(stats["levels"][0] * 100)}-p{round(stats["levels"][-1] * 100)}: '
+          f'cobertura {coverage:.1%} en test (ajuste {stats["adjustment"]:+.2f}) → {path}')
+    return {
+        'levels': stats['levels'].tolist(),
+        'adjustment': stats['adjustment'],
+        'coverage': coverage,
+        'path': path
+    }
+
+def fit_surrogate_model(name, model, X_train, X_test, y_test):
+    """
+    Árbol sustituto destilado del modelo elegido, que la API usa bajo carga
+    Retorna el resumen para la metadata (fidelidad, score y latencias)
+    """
+    spec = model_spec(name)
+    surrogate, summary = fit_surrogate(model, X_train, X_test, y_test, spec['task'])
+    path = surrogate_path(spec['artifact'])
+    save_surrogate(surrogate, path)
+    print(f'🪶 Sustituto {summary["model_type"]} (profundidad {summary["max_depth"]}): '
+          f'fidelidad {summary["fidelity"]:.4f}, score {summary["score"]:.4f} vs {summary["model_score"]:.4f}, '
+          f'p50 {summary["p50_ms"]:.3f} ms vs {summary["model_p50_ms"]:.3f} ms → {path}')
+    return {**summary, 'path': path}
+
+def fit_building_models(name, df, n_jobs=-1, encoder=None):
+    """
+    Modelos compactos por edificio de un modelo global (--building-models)
+    Retorna el resumen por edificio, o None si el dataset no trae buildingId
+    """
+    if 'buildingId' not in df:
+        print('⚠️  El dataset no incluye buildingId; se omiten los modelos por edificio')
+        return None
+    spec = MODEL_SPECS[name]
+    return train_building_models(df, spec['features'], spec['target'], spec['task'], spec['artifact'],
+                                 n_jobs, encoder)
+
+def configure_estimator(name, family, n_jobs=-1):
+    """
+    Estimador de la familia elegida, con los hiperparámetros de tune_models.py si existen
+    Retorna (estimador, hiperparámetros, resumen de la búsqueda o None)
+    """
+    tuned = load_tuned_hyperparameters(name, family)
+    model, hyperparameters = build_estimator(family, model_spec(name)['task'], n_jobs,
+                                             **(tuned['params'] if tuned else {}))
+    tuning = None
+    if tuned:
+        print(f'🎛️  Usando hiperparámetros ajustados ({tuned["tuned_on"]}, CV {tuned["cv_score"]:.4f})')
+        tuning = {key: tuned[key] for key in ('tuned_on', 'cv_score', 'p50_ms', 'artifact_bytes', 'n_candidates')}
+    return model, hyperparameters, tuning
+
+def stage_candidates(name, fitted):
+    """Guardar los candidatos entrenados en el pool para perfilarlos en serie al terminar"""
+    directory = CANDIDATES_DIR / name
+    directory.mkdir(parents=True, exist_ok=True)
+    joblib.dump(fitted, directory / 'candidates.pkl')
+
+def load_staged_candidates(name):
+    """Candidatos que dejó el pool ({familia: (modelo, segundos)}), o None; se borran al leerlos"""
+    path = CANDIDATES_DIR / name / 'candidates.pkl'
+    if not path.exists():
+        return None
+    fitted = joblib.load(path)
+    shutil.rmtree(path.parent)
+    return fitted
+
+def choose_candidate(name, families, X_train, y_train, n_jobs=-1, stream=None, classes=None, score=None,
+                     fallback=False, phase=None):
+    """
+    Elegir la familia con una partición de validación separada del entrenamiento
+    (test queda intacto para las métricas publicadas); refit_chosen la re-entrena
+    después con todo el entrenamiento
+    phase='fit' solo entrena los candidatos y los deja en CANDIDATES_DIR (retorna
+    PENDING): el perfil de servicio se mide después en serie (phase='publish'), sin
+    otros entrenamientos compitiendo por la CPU
+    Con stream (modo out-of-core) las familias incrementales se entrenan con partial_fit
+    sobre todo el snapshot en lugar de solo la muestra
+    fallback: ver select_within_budget
+    Retorna dict con el modelo elegido (entrenado sin la validación), familia,
+    hiperparámetros, reporte y particiones; None si ninguno cumple
+    """
+    from sklearn.model_selection import train_test_split
+
+    spec = model_spec(name)
+    target = target_columns(spec)[0]
+    configured = {family: configure_estimator(name, family, n_jobs) for family in families}
+    estimators = {family: estimator for family, (estimator, _, _) in configured.items()}
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=VALIDATION_SIZE, random_state=42)
+
+    fitters = {}
+    if stream:
+        # Tampoco las familias incrementales ven las filas de validación
+        selection_stream = exclude_rows(stream, X_val.index)
+        fitters = {
+            family: (lambda estimator: fit_incremental(estimator, selection_stream, spec['features'], target, classes))
+            for family in families if is_incremental(family)
+        }
+
+    if phase == 'fit':
+        print(f'🎯 Entrenando candidatos ({", ".join(families)}); el perfil se mide al terminar el pool...')
+        stage_candidates(name, fit_candidates(estimators, X_fit, y_fit, fitters))
+        return PENDING
+
+    fitted = load_staged_candidates(name) if phase == 'publish' else None
+    print(f'🎯 {"Perfilando" if fitted else "Entrenando"} candidatos ({", ".join(families)})...')
+    chosen, model, report = select_within_budget(estimators, X_fit, y_fit, X_val, y_val, spec['task'],
+                                                 fitters=fitters, score=score, fitted=fitted, fallback=fallback)
+    print_selection_report(report, chosen)
+    if chosen is None:
+        print(f'❌ Ningún candidato cumple el presupuesto de servicio {serving_budget()}')
+        return None
+    budget_met = not next(entry for entry in report if entry['candidate'] == chosen)['violations']
+    if not budget_met:
+        print(f'⚠️  Ningún candidato cumple el presupuesto de servicio {serving_budget()}; '
+              f'se usa el más rápido ({chosen})')
+
+    _, hyperparameters, tuning = configured[chosen]
+    return {
+        'model': model,
+        'family': chosen,
+        'hyperparameters': hyperparameters,
+        'tuning': tuning,
+        'budget_met': budget_met,
+        'candidates': [
+            {key: entry[key] for key in ('candidate', 'score', 'fit_seconds', 'violations')}
+            for entry in report
+        ],
+        'streamed': chosen in fitters,
+        'stream': stream,
+        'classes': classes,
+        'fit': (X_fit, y_fit),
+        'validation': (X_val, y_val)
+    }
+
+def refit_chosen(name, selection, X_train, y_train, features=None):
+    """
+    Re-entrenar una copia sin entrenar del modelo elegido con todo el entrenamiento
+    (partición de ajuste + validación), solo con `features` si se podaron
+    Los modelos entrenados por bloques se re-entrenan recorriendo el snapshot sin excluir la validación
+    """
+    from sklearn.base import clone
+
+    spec = model_spec(name)
+    model = clone(selection['model'])
+    if selection['streamed']:
+        return fit_incremental(model, selection['stream'], spec['features'], target_columns(spec)[0],
+                               selection['classes'])
+    features = features or list(X_train.columns)
+    return model.fit(X_train[features], y_train)
+
+def select_model(name, families, X_train, y_train, X_test, y_test, n_jobs=-1, stream=None, prune_features=False,
+                 phase=None):
+    """
+    Elegir la familia más precisa que cumple el presupuesto (choose_candidate)
+    Después se mide la importancia por permutación de las features en validación y,
+    con prune_features, se busca el subconjunto mínimo dentro de la tolerancia; el
+    modelo final se re-entrena con todo el entrenamiento (test solo se usa en el reporte)
+    Retorna dict con modelo, familia, features, hiperparámetros, perfil y reporte,
+    None si ninguno cumple o PENDING (phase='fit')
+    """
+    spec = MODEL_SPECS[name]
+    classes = np.unique(np.concatenate([y_train, y_test])) if stream and spec['task'] == 'classification' else None
+    selection = choose_candidate(name, families, X_train, y_train, n_jobs, stream, classes, phase=phase)
+    if selection is None or selection == PENDING:
+        return selection
+
+    # Un modelo entrenado por bloques no se puede re-entrenar solo con la muestra
+    streamed = selection['streamed']
+    if prune_features and streamed:
+        print('⚠️  Modelo entrenado por bloques: se omite la poda de features')
+    X_fit, y_fit = selection['fit']
+    X_val, y_val = selection['validation']
+    _, features, selection_info = feature_selection(
+        selection['model'], X_fit, y_fit, X_val, y_val, spec['task'], n_jobs,
+        prune=prune_features and not streamed
+    )
+    model = refit_chosen(name, selection, X_train, y_train, features)
+    return {
+        **selection,
+        'model': model,
+        'features': features,
+        'feature_importances': selection_info['importances'],
+        'feature_pruning': selection_info['pruning'],
+        # Perfil del modelo publicado, medido sin entrenamientos en paralelo
+        'serving_profile': serving_profile(model, X_val[features], batch_size=1000, single_repeats=100,
+                                           batch_repeats=5)
+    }
+
+def train_attendance_model(from_snapshot=False, n_jobs=-1, families=None, force=False, out_of_core=False,
+                           prune_features=False, building_models=False, phase=None):
     """Entrenar modelo de predicción de asistencia"""
     print('\n' + '='*60)
     print('1️⃣  MODELO DE PREDICCIÓN DE ASISTENCIA A EVENTOS')
@@ -33,45 +427,48 @@ def train_attendance_model():
     try:
         # Extraer datos
         print('📊 Extrayendo datos de eventos...')
-        df = extract_event_data(days_back=90)
+        spec = MODEL_SPECS['attendance']
+        df = load_model_data('attendance', from_snapshot, out_of_core)
         
         if len(df) < 10:
             print('❌ No hay suficientes datos para entrenar')
             print('   Ejecuta: cd ../../backend && npm run generate-fake-data')
             return False
         
+        # Conservar el modelo publicado si los datos y la configuración no cambiaron
+        families = families or candidate_families('attendance')
+        fingerprint = training_fingerprint('attendance', df, families, prune_features)
+        if not force and is_up_to_date('attendance', fingerprint):
+            print('⏭️  Datos y configuración sin cambios; se conserva el modelo publicado')
+            return SKIPPED
+        
         # Importar librerías ML
         from sklearn.model_selection import train_test_split
-        from sklearn.ensemble import RandomForestRegressor
         from sklearn.metrics import mean_squared_error, r2_score
         import joblib
         import json
         
         # Preparar features y target
-        feature_columns = ['viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour', 'category_count', 'popularityScore']
+        feature_columns = spec['features']
         X = df[feature_columns]
-        y = df['attendance']
+        y = df[spec['target']]
         
         # Split
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42
         )
         
-        # Entrenar con hiperparámetros mejorados
-        print('🎯 Entrenando modelo con hiperparámetros optimizados...')
-        model = RandomForestRegressor(
-            n_estimators=200,           # Más árboles para mejor precisión
-            max_depth=15,               # Mayor profundidad para capturar patrones complejos
-            random_state=42,
-            min_samples_split=4,        # Ajustado para mejor generalización
-            min_samples_leaf=2,
-            max_features='sqrt',        # Mejor selección de features
-            n_jobs=-1                   # Usar todos los cores disponibles
-        )
-        model.fit(X_train, y_train)
+        # Entrenar las familias candidatas y elegir la más precisa dentro del presupuesto de servicio
+        selection = select_model('attendance', families, X_train, y_train, X_test, y_test, n_jobs,
+                                 stream=streaming_source(df, X_test.index), prune_features=prune_features,
+                                 phase=phase)
+        if selection is None or selection == PENDING:
+            return selection or False
+        model = selection['model']
+        feature_columns = selection['features']
         
         # Evaluar
-        y_pred = model.predict(X_test)
+        y_pred = model.predict(X_test[feature_columns])
         r2 = r2_score(y_test, y_pred)
         mse = mean_squared_error(y_test, y_pred)
         
@@ -79,29 +476,44 @@ def train_attendance_model():
         print(f'📏 MSE: {mse:.4f}')
         
         # Guardar modelo
-        model_path = 'models/attendance_predictor.pkl'
+        model_path, metadata_path = model_paths('attendance')
         joblib.dump(model, model_path)
         print(f'💾 Modelo guardado en {model_path}')
         
+        # Estadísticas por hoja para los intervalos de predicción de la API
+        quantiles = fit_leaf_quantiles('attendance', model, X_train[feature_columns], y_train,
+                                       X_test[feature_columns], y_test)
+        
+        # Árbol sustituto para servir bajo carga
+        surrogate = fit_surrogate_model('attendance', model, X_train[feature_columns],
+                                        X_test[feature_columns], y_test)
+        
         # Guardar metadata
         metadata = {
-            'model_type': 'RandomForestRegressor',
+            'model_type': type(model).__name__,
+            'model_family': selection['family'],
             'trained_on': datetime.now().isoformat(),
             'features': feature_columns,
             'n_samples': len(df),
             'r2_score': float(r2),
             'mse': float(mse),
-            'hyperparameters': {
-                'n_estimators': 200,
-                'max_depth': 15,
-                'random_state': 42,
-                'min_samples_split': 4,
-                'min_samples_leaf': 2,
-                'max_features': 'sqrt'
+            'quantiles': quantiles,
+            'surrogate': surrogate,
+            'feature_importances': selection['feature_importances'],
+            'feature_pruning': selection['feature_pruning'],
+            'hyperparameters': selection['hyperparameters'],
+            'tuning': selection['tuning'],
+            'serving_profile': selection['serving_profile'],
+            'serving_budget': serving_budget(),
+            'serving_budget_met': selection['budget_met'],
+            'candidates': selection['candidates'],
+            'fingerprint': fingerprint,
+            'out_of_core': df.attrs.get('out_of_core') and {
+                **df.attrs['out_of_core'], 'streamed': selection['streamed']
             }
         }
         
-        with open('models/attendance_predictor_metadata.json', 'w') as f:
+        with open(metadata_path, 'w') as f:
             json.dump(metadata, f, indent=2)
         
         print('✅ Modelo de asistencia entrenado correctamente')
@@ -111,7 +523,8 @@ def train_attendance_model():
         print(f'❌ Error entrenando modelo de asistencia: {e}')
         return False
 
-def train_mobility_model():
+def train_mobility_model(from_snapshot=False, n_jobs=-1, families=None, force=False, out_of_core=False,
+                           prune_features=False, building_models=False, phase=None):
     """Entrenar modelo de predicción de demanda de movilidad"""
     print('\n' + '='*60)
     print('2️⃣  MODELO DE PREDICCIÓN DE DEMANDA DE MOVILIDAD')
@@ -120,24 +533,31 @@ def train_mobility_model():
     try:
         # Extraer datos
         print('📊 Extrayendo datos de movilidad...')
-        df = extract_mobility_data(days_back=90)
+        spec = MODEL_SPECS['mobility']
+        df = load_model_data('mobility', from_snapshot, out_of_core)
         
         if len(df) < 10:
             print('❌ No hay suficientes datos para entrenar')
             return False
         
+        # Conservar el modelo publicado si los datos y la configuración no cambiaron
+        families = families or candidate_families('mobility')
+        fingerprint = training_fingerprint('mobility', df, families, prune_features, building_models)
+        if not force and is_up_to_date('mobility', fingerprint):
+            print('⏭️  Datos y configuración sin cambios; se conserva el modelo publicado')
+            return SKIPPED
+        
         # Importar librerías ML
         from sklearn.model_selection import train_test_split
-        from sklearn.ensemble import RandomForestClassifier
         from sklearn.metrics import accuracy_score, classification_report
         from sklearn.preprocessing import LabelEncoder
         import joblib
         import json
         
         # Preparar features y target
-        feature_columns = ['viewCount', 'uniqueVisitors', 'dayOfWeek', 'hour', 'peakHour', 'eventsCount', 'averageViewDuration']
+        feature_columns = spec['features']
         X = df[feature_columns]
-        y = df['mobility_demand']
+        y = df[spec['target']]
         
         # Encodear target
         le = LabelEncoder()
@@ -148,22 +568,17 @@ def train_mobility_model():
             X, y_encoded, test_size=0.2, random_state=42
         )
         
-        # Entrenar con hiperparámetros mejorados
-        print('🎯 Entrenando modelo con hiperparámetros optimizados...')
-        model = RandomForestClassifier(
-            n_estimators=200,
-            max_depth=15,
-            random_state=42,
-            class_weight='balanced',
-            min_samples_split=4,
-            min_samples_leaf=2,
-            max_features='sqrt',
-            n_jobs=-1
-        )
-        model.fit(X_train, y_train)
+        # Entrenar las familias candidatas y elegir la más precisa dentro del presupuesto de servicio
+        selection = select_model('mobility', families, X_train, y_train, X_test, y_test, n_jobs,
+                                 stream=streaming_source(df, X_test.index, encode_target=le.transform),
+                                 prune_features=prune_features, phase=phase)
+        if selection is None or selection == PENDING:
+            return selection or False
+        model = selection['model']
+        feature_columns = selection['features']
         
         # Evaluar
-        y_pred = model.predict(X_test)
+        y_pred = model.predict(X_test[feature_columns])
         accuracy = accuracy_score(y_test, y_pred)
         
         print(f'📏 Accuracy: {accuracy:.4f}')
@@ -171,33 +586,43 @@ def train_mobility_model():
         print(classification_report(y_test, y_pred, target_names=le.classes_))
         
         # Guardar modelo
-        model_path = 'models/mobility_demand_predictor.pkl'
+        model_path, metadata_path = model_paths('mobility')
         joblib.dump({
             'model': model,
             'label_encoder': le
         }, model_path)
         print(f'💾 Modelo guardado en {model_path}')
         
+        # Árbol sustituto para servir bajo carga
+        surrogate = fit_surrogate_model('mobility', model, X_train[feature_columns],
+                                        X_test[feature_columns], y_test)
+        
         # Guardar metadata
         metadata = {
-            'model_type': 'RandomForestClassifier',
+            'model_type': type(model).__name__,
+            'model_family': selection['family'],
             'trained_on': datetime.now().isoformat(),
             'features': feature_columns,
             'classes': le.classes_.tolist(),
             'n_samples': len(df),
             'accuracy': float(accuracy),
-            'hyperparameters': {
-                'n_estimators': 200,
-                'max_depth': 15,
-                'random_state': 42,
-                'class_weight': 'balanced',
-                'min_samples_split': 4,
-                'min_samples_leaf': 2,
-                'max_features': 'sqrt'
-            }
+            'surrogate': surrogate,
+            'feature_importances': selection['feature_importances'],
+            'feature_pruning': selection['feature_pruning'],
+            'hyperparameters': selection['hyperparameters'],
+            'tuning': selection['tuning'],
+            'serving_profile': selection['serving_profile'],
+            'serving_budget': serving_budget(),
+            'serving_budget_met': selection['budget_met'],
+            'candidates': selection['candidates'],
+            'fingerprint': fingerprint,
+            'out_of_core': df.attrs.get('out_of_core') and {
+                **df.attrs['out_of_core'], 'streamed': selection['streamed']
+            },
+            'building_models': fit_building_models('mobility', df, n_jobs, encoder=le) if building_models else None
         }
         
-        with open('models/mobility_demand_predictor_metadata.json', 'w') as f:
+        with open(metadata_path, 'w') as f:
             json.dump(metadata, f, indent=2)
         
         print('✅ Modelo de movilidad entrenado correctamente')
@@ -209,7 +634,8 @@ def train_mobility_model():
         traceback.print_exc()
         return False
 
-def train_saturation_model():
+def train_saturation_model(from_snapshot=False, n_jobs=-1, families=None, force=False, out_of_core=False,
+                           prune_features=False, building_models=False, phase=None):
     """Entrenar modelo de predicción de saturación"""
     print('\n' + '='*60)
     print('3️⃣  MODELO DE PREDICCIÓN DE NIVEL DE SATURACIÓN')
@@ -218,45 +644,47 @@ def train_saturation_model():
     try:
         # Extraer datos
         print('📊 Extrayendo datos de saturación...')
-        df = extract_saturation_data(days_back=90)
+        spec = MODEL_SPECS['saturation']
+        df = load_model_data('saturation', from_snapshot, out_of_core)
         
         if len(df) < 10:
             print('❌ No hay suficientes datos para entrenar')
             return False
         
+        # Conservar el modelo publicado si los datos y la configuración no cambiaron
+        families = families or candidate_families('saturation')
+        fingerprint = training_fingerprint('saturation', df, families, prune_features, building_models)
+        if not force and is_up_to_date('saturation', fingerprint):
+            print('⏭️  Datos y configuración sin cambios; se conserva el modelo publicado')
+            return SKIPPED
+        
         # Importar librerías ML
         from sklearn.model_selection import train_test_split
-        from sklearn.ensemble import RandomForestClassifier
         from sklearn.metrics import accuracy_score, classification_report
         import joblib
         import json
         
         # Preparar features y target
-        feature_columns = ['viewCount', 'uniqueVisitors', 'peakVisits', 'averageViewDuration', 'popularityScore', 'type']
+        feature_columns = spec['features']
         X = df[feature_columns]
-        y = df['saturationLevel']
+        y = df[spec['target']]
         
         # Split
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42
         )
         
-        # Entrenar con hiperparámetros mejorados
-        print('🎯 Entrenando modelo con hiperparámetros optimizados...')
-        model = RandomForestClassifier(
-            n_estimators=200,
-            max_depth=15,
-            random_state=42,
-            class_weight='balanced',
-            min_samples_split=4,
-            min_samples_leaf=2,
-            max_features='sqrt',
-            n_jobs=-1
-        )
-        model.fit(X_train, y_train)
+        # Entrenar las familias candidatas y elegir la más precisa dentro del presupuesto de servicio
+        selection = select_model('saturation', families, X_train, y_train, X_test, y_test, n_jobs,
+                                 stream=streaming_source(df, X_test.index), prune_features=prune_features,
+                                 phase=phase)
+        if selection is None or selection == PENDING:
+            return selection or False
+        model = selection['model']
+        feature_columns = selection['features']
         
         # Evaluar
-        y_pred = model.predict(X_test)
+        y_pred = model.predict(X_test[feature_columns])
         accuracy = accuracy_score(y_test, y_pred)
         
         print(f'📏 Accuracy: {accuracy:.4f}')
@@ -270,31 +698,41 @@ def train_saturation_model():
         print(classification_report(y_test, y_pred, target_names=class_names, labels=unique_classes))
         
         # Guardar modelo
-        model_path = 'models/saturation_predictor.pkl'
+        model_path, metadata_path = model_paths('saturation')
         joblib.dump(model, model_path)
         print(f'💾 Modelo guardado en {model_path}')
         
+        # Árbol sustituto para servir bajo carga
+        surrogate = fit_surrogate_model('saturation', model, X_train[feature_columns],
+                                        X_test[feature_columns], y_test)
+        
         # Guardar metadata
         metadata = {
-            'model_type': 'RandomForestClassifier',
+            'model_type': type(model).__name__,
+            'model_family': selection['family'],
             'trained_on': datetime.now().isoformat(),
             'features': feature_columns,
             'classes': [int(c) for c in unique_classes],
             'class_labels': saturation_labels,
             'n_samples': len(df),
             'accuracy': float(accuracy),
-            'hyperparameters': {
-                'n_estimators': 200,
-                'max_depth': 15,
-                'random_state': 42,
-                'class_weight': 'balanced',
-                'min_samples_split': 4,
-                'min_samples_leaf': 2,
-                'max_features': 'sqrt'
-            }
+            'surrogate': surrogate,
+            'feature_importances': selection['feature_importances'],
+            'feature_pruning': selection['feature_pruning'],
+            'hyperparameters': selection['hyperparameters'],
+            'tuning': selection['tuning'],
+            'serving_profile': selection['serving_profile'],
+            'serving_budget': serving_budget(),
+            'serving_budget_met': selection['budget_met'],
+            'candidates': selection['candidates'],
+            'fingerprint': fingerprint,
+            'out_of_core': df.attrs.get('out_of_core') and {
+                **df.attrs['out_of_core'], 'streamed': selection['streamed']
+            },
+            'building_models': fit_building_models('saturation', df, n_jobs) if building_models else None
         }
         
-        with open('models/saturation_predictor_metadata.json', 'w') as f:
+        with open(metadata_path, 'w') as f:
             json.dump(metadata, f, indent=2)
         
         print('✅ Modelo de saturación entrenado correctamente')
@@ -306,50 +744,333 @@ def train_saturation_model():
         traceback.print_exc()
         return False
 
-def main():
+def train_building_load_model(from_snapshot=False, n_jobs=-1, families=None, force=False, out_of_core=False,
+                              prune_features=False, building_models=False, phase=None):
+    """
+    Entrenar el modelo multi-salida de carga de edificios: un solo forest predice
+    la demanda de movilidad y el nivel de saturación en una pasada
+    (/predict/building-load recorre un ensemble en lugar de dos)
+    """
+    print('\n' + '='*60)
+    print('4️⃣  MODELO MULTI-SALIDA DE CARGA DE EDIFICIOS')
+    print('='*60)
+    
+    try:
+        print('📊 Extrayendo datos de carga de edificios...')
+        spec = MULTI_OUTPUT_SPECS['building_load']
+        df = load_model_data('building_load', from_snapshot, out_of_core)
+        
+        if len(df) < 10:
+            print('❌ No hay suficientes datos para entrenar')
+            return False
+        
+        # Solo las familias que predicen varios targets con un estimador
+        requested = families or candidate_families('building_load')
+        families = [family for family in requested if is_multi_output(family)]
+        if not families:
+            families = [family for family in ESTIMATOR_FAMILIES if is_multi_output(family)]
+            print(f'⚠️  {", ".join(requested)} no admite varias salidas; se usa {", ".join(families)}')
+        
+        fingerprint = training_fingerprint('building_load', df, families)
+        if not force and is_up_to_date('building_load', fingerprint):
+            print('⏭️  Datos y configuración sin cambios; se conserva el modelo publicado')
+            return SKIPPED
+        if prune_features:
+            print('⚠️  La poda de features no aplica a modelos multi-salida; se conservan todas')
+        
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score
+        from sklearn.preprocessing import LabelEncoder
+        import joblib
+        import json
+        
+        feature_columns = spec['features']
+        mobility_target, saturation_target = spec['targets']
+        X = df[feature_columns]
+        
+        # Una columna por target: demanda encodeada y nivel de saturación (0-3)
+        le = LabelEncoder()
+        y = np.column_stack([
+            le.fit_transform(df[mobility_target]),
+            df[saturation_target].to_numpy(dtype=int)
+        ])
+        
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42
+        )
+        
+        def mean_accuracy(y_true, y_pred):
+            """Accuracy promedio de los targets"""
+            return float(np.mean([accuracy_score(y_true[:, i], y_pred[:, i]) for i in range(y_true.shape[1])]))
+        
+        # Un modelo multi-salida siempre se publica: si ninguno cumple, el más rápido
+        selection = choose_candidate('building_load', families, X_train, y_train, n_jobs, score=mean_accuracy,
+                                     fallback=True, phase=phase)
+        if selection is None or selection == PENDING:
+            return selection or False
+        model = refit_chosen('building_load', selection, X_train, y_train)
+        X_val, _ = selection['validation']
+        
+        # Evaluar cada salida por separado
+        y_pred = model.predict(X_test)
+        accuracy = {
+            target: float(accuracy_score(y_test[:, i], y_pred[:, i]))
+            for i, target in enumerate(spec['targets'])
+        }
+        for target, value in accuracy.items():
+            print(f'📏 Accuracy {target}: {value:.4f}')
+        
+        model_path, metadata_path = model_paths('building_load')
+        joblib.dump({
+            'model': model,
+            'label_encoder': le
+        }, model_path)
+        print(f'💾 Modelo guardado en {model_path}')
+        
+        # Árbol sustituto multi-salida para servir bajo carga
+        surrogate = fit_surrogate_model('building_load', model, X_train, X_test, y_test)
+        
+        metadata = {
+            'model_type': type(model).__name__,
+            'model_family': selection['family'],
+            'trained_on': datetime.now().isoformat(),
+            'features': feature_columns,
+            'targets': spec['targets'],
+            'classes': {
+                mobility_target: le.classes_.tolist(),
+                saturation_target: np.unique(y[:, 1]).tolist()
+            },
+            'n_samples': len(df),
+            'accuracy': accuracy,
+            'surrogate': surrogate,
+            'hyperparameters': selection['hyperparameters'],
+            'tuning': selection['tuning'],
+            'serving_profile': serving_profile(model, X_val, batch_size=1000, single_repeats=100, batch_repeats=5),
+            'serving_budget': serving_budget(),
+            'serving_budget_met': selection['budget_met'],
+            'candidates': selection['candidates'],
+            'fingerprint': fingerprint,
+            'out_of_core': df.attrs.get('out_of_core') or None
+        }
+        
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        
+        print('✅ Modelo de carga de edificios entrenado correctamente')
+        return True
+        
+    except Exception as e:
+        print(f'❌ Error entrenando modelo de carga de edificios: {e}')
+        import traceback
+        traceback.print_exc()
+        return False
+
+TRAINERS = {
+    'attendance': train_attendance_model,
+    'mobility': train_mobility_model,
+    'saturation': train_saturation_model,
+    'building_load': train_building_load_model
+}
+
+def split_core_budget(total_cores, names):
+    """
+    Repartir los cores disponibles entre los modelos
+    Retorna (procesos simultáneos, {nombre: cores}): como máximo un proceso por core;
+    con menos cores que modelos cada modelo usa 1 core y los demás esperan en cola
+    """
+    total_cores = max(1, total_cores)
+    workers = min(total_cores, len(names))
+    if workers < len(names):
+        return workers, {name: 1 for name in names}
+    base, extra = divmod(total_cores, len(names))
+    return workers, {name: base + (1 if i < extra else 0) for i, name in enumerate(names)}
+
+def run_training_job(name, from_snapshot, n_jobs, families=None, force=False, out_of_core=False,
+                     prune_features=False, building_models=False, phase=None):
+    """
+    Pipeline completo de un modelo (extraer → entrenar → evaluar → guardar) con su tiempo
+    phase: ver choose_candidate
+    """
+    started = time.perf_counter()
+    success = TRAINERS[name](from_snapshot=from_snapshot, n_jobs=n_jobs, families=families,
+                             force=force, out_of_core=out_of_core, prune_features=prune_features,
+                             building_models=building_models, phase=phase)
+    return success, time.perf_counter() - started
+
+def train_models(names, from_snapshot=False, total_cores=None, parallel=True, families=None, force=False,
+                 out_of_core=False, prune_features=False, building_models=False):
+    """
+    Entrenar los modelos indicados, en paralelo (un proceso por modelo, sin superar los cores) o uno tras otro
+    En paralelo el pool solo entrena los candidatos; al terminar, cada modelo se perfila,
+    elige y publica en serie con todos los cores, para que la latencia medida no
+    incluya la contención con los demás entrenamientos
+    Retorna ({nombre: True/False/SKIPPED}, {nombre: segundos}, segundos totales de reloj)
+    """
+    total_cores = total_cores or os.cpu_count() or 1
+    families = {name: candidate_families(name, families) for name in names}
+    started = time.perf_counter()
+    results, durations = {}, {}
+    
+    if parallel and len(names) > 1:
+        workers, budget = split_core_budget(total_cores, names)
+        print(f'\n⚙️  Entrenamiento en paralelo: {total_cores} cores, {workers} procesos → ' +
+              ', '.join(f'{name}={cores}' for name, cores in budget.items()))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                name: executor.submit(run_training_job, name, from_snapshot, budget[name], families[name], force,
+                                      out_of_core, prune_features, building_models, 'fit')
+                for name in names
+            }
+            for name, future in futures.items():
+                try:
+                    results[name], durations[name] = future.result()
+                except Exception as e:
+                    print(f'❌ Error en el proceso de {name}: {e}')
+                    results[name], durations[name] = False, 0.0
+        
+        # Los datos ya quedaron en snapshots: la segunda pasada no vuelve a extraer
+        pending = [name for name in names if results[name] == PENDING]
+        if pending:
+            print(f'\n📏 Perfilando y publicando en serie: {", ".join(pending)}')
+        for name in pending:
+            results[name], seconds = run_training_job(name, True, total_cores, families[name], force, out_of_core,
+                                                      prune_features, building_models, 'publish')
+            durations[name] += seconds
+    else:
+        for name in names:
+            results[name], durations[name] = run_training_job(name, from_snapshot, total_cores, families[name], force,
+                                                                out_of_core, prune_features, building_models)
+    
+    return results, durations, time.perf_counter() - started
+
+def timing_key(names, total_cores, from_snapshot, families, out_of_core, prune_features, building_models):
+    """Configuración que determina el tiempo de un entrenamiento completo (clave de TIMINGS_PATH)"""
+    return json.dumps({
+        'models': sorted(names), 'cores': total_cores, 'from_snapshot': from_snapshot, 'families': families,
+        'out_of_core': out_of_core, 'prune_features': prune_features, 'building_models': building_models
+    }, sort_keys=True, default=str)
+
+def sequential_baseline(key):
+    """Segundos de reloj de la última ejecución en secuencia con la misma configuración, o None"""
+    if not TIMINGS_PATH.exists():
+        return None
+    with open(TIMINGS_PATH, 'r') as f:
+        entry = json.load(f).get(key)
+    return entry['wall_clock_s'] if entry else None
+
+def save_sequential_baseline(key, wall_clock):
+    """Guardar el tiempo de reloj de una ejecución en secuencia completa"""
+    timings = {}
+    if TIMINGS_PATH.exists():
+        with open(TIMINGS_PATH, 'r') as f:
+            timings = json.load(f)
+    timings[key] = {'wall_clock_s': wall_clock, 'recorded_on': datetime.now().isoformat()}
+    with open(f'{TIMINGS_PATH}.tmp', 'w') as f:
+        json.dump(timings, f, indent=2)
+    os.replace(f'{TIMINGS_PATH}.tmp', TIMINGS_PATH)
+
+def parse_args(argv=None):
+    """Opciones de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Re-entrenar todos los modelos ML')
+    parser.add_argument('--from-snapshot', action='store_true',
+                        help='Entrenar con los snapshots más recientes en data/ en lugar de extraer de MongoDB')
+    parser.add_argument('--sequential', action='store_true',
+                        help='Entrenar los modelos uno tras otro en lugar de en paralelo')
+    parser.add_argument('--cores', type=int, default=None,
+                        help='Total de cores a repartir entre los modelos (por defecto todos)')
+    parser.add_argument('--family', action='append', default=[],
+                        help=f'Familia de estimador ({", ".join(ESTIMATOR_FAMILIES)}); '
+                             'para todos o por modelo: --family attendance=hist_gradient_boosting. '
+                             'Sin este flag se evalúan todas las familias y se elige la más precisa '
+                             'que cumple el presupuesto de servicio (SERVING_*)')
+    parser.add_argument('--out-of-core', action='store_true',
+                        help='Leer el snapshot por bloques: muestra de tamaño fijo (OUT_OF_CORE_MAX_ROWS) '
+                             'y partial_fit sobre todos los datos para las familias incrementales')
+    parser.add_argument('--prune-features', action='store_true',
+                        help='Re-entrenar con el menor subconjunto de features (por importancia por permutación) '
+                             'cuyo score no cae más de FEATURE_PRUNING_TOLERANCE')
+    parser.add_argument('--building-models', action='store_true',
+                        help='Entrenar además un modelo compacto por edificio para movilidad y saturación '
+                             '(models/buildings/<edificio>/; la API los usa con buildingId)')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-entrenar aunque los datos y la configuración no hayan cambiado')
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Entrenar todos los modelos"""
+    args = parse_args(argv)
+    
     print('\n' + '='*60)
     print('🚀 ENTRENAMIENTO DE TODOS LOS MODELOS ML')
     print('   13 Edificios Modulares')
     print('='*60)
     
     # Verificar calidad de datos
-    print('\n🔍 Verificando datos en MongoDB...')
-    verify_data_quality()
+    if not args.from_snapshot:
+        print('\n🔍 Verificando datos en MongoDB...')
+        verify_data_quality()
     
     print('\n⏳ Preparando entorno...')
     ensure_directories()
     
-    # Resultados
-    results = {
-        'attendance': False,
-        'mobility': False,
-        'saturation': False
-    }
-    
     # Entrenar cada modelo
-    results['attendance'] = train_attendance_model()
-    results['mobility'] = train_mobility_model()
-    results['saturation'] = train_saturation_model()
+    total_cores = args.cores or os.cpu_count() or 1
+    families = parse_family_overrides(args.family)
+    results, durations, wall_clock = train_models(
+        list(TRAINERS), args.from_snapshot, total_cores, parallel=not args.sequential,
+        families=families, force=args.force, out_of_core=args.out_of_core,
+        prune_features=args.prune_features, building_models=args.building_models
+    )
     
     # Resumen final
     print('\n' + '='*60)
     print('📊 RESUMEN DE ENTRENAMIENTO')
     print('='*60)
     
-    success_count = sum(results.values())
+    success_count = sum(1 for result in results.values() if result)
     total_count = len(results)
+    retrained = [name for name, result in results.items() if result is True]
     
-    for model_name, success in results.items():
-        status = '✅' if success else '❌'
-        print(f'{status} {model_name.capitalize()}: {"Éxito" if success else "Error"}')
+    for model_name, result in results.items():
+        if result == SKIPPED:
+            status, label = '⏭️ ', 'Sin cambios'
+        else:
+            status, label = ('✅', 'Éxito') if result else ('❌', 'Error')
+        print(f'{status} {model_name.capitalize()}: {label} ({durations[model_name]:.1f}s)')
+    
+    # Aceleración solo frente a una ejecución --sequential real con la misma configuración:
+    # los tiempos por modelo en paralelo se midieron compitiendo por los cores (con menos
+    # cores cada uno), así que su suma no es lo que tardaría en secuencia
+    key = timing_key(list(TRAINERS), total_cores, args.from_snapshot, families, args.out_of_core,
+                     args.prune_features, args.building_models)
+    # Solo cuentan las ejecuciones que re-entrenaron todo (un modelo omitido no tarda lo mismo)
+    complete = all(result is True for result in results.values())
+    if args.sequential:
+        print(f'\n⏱️  Tiempo total: {wall_clock:.1f}s en secuencia')
+        if complete:
+            save_sequential_baseline(key, wall_clock)
+    else:
+        print(f'\n⏱️  Tiempo total: {wall_clock:.1f}s (suma de los trabajos concurrentes: '
+              f'{sum(durations.values()):.1f}s)')
+        baseline = sequential_baseline(key) if complete else None
+        if baseline:
+            print(f'   Aceleración frente a --sequential ({baseline:.1f}s): x{baseline / wall_clock:.2f}')
+        elif complete:
+            print('   Sin referencia en secuencia para esta configuración: '
+                  'ejecuta con --sequential --force para medir la aceleración')
     
     print('\n' + '='*60)
     if success_count == total_count:
         print('🎉 TODOS LOS MODELOS ENTRENADOS EXITOSAMENTE')
         print('='*60)
+        if not retrained:
+            print('\nℹ️  Ningún modelo cambió; no es necesario recargar el servicio')
+            print('   Usa --force para re-entrenar de todos modos')
+            print()
+            return 0
         print('\n📝 Siguiente paso:')
         print('   python main.py  # Iniciar servicio ML')
+        print('   (o POST /model/reload si el servicio ya está en ejecución)')
         print()
         return 0
     else:
@@ -15,6 +15,9 @@ from datetime import datetime, timedelta
 from config import MODELS_DIR
 import pymongo
 from config import MONGO_URI
+from data_extractor_updated import fetch_partitioned
+from profiling import select_within_budget, print_selection_report, serving_budget
+from feature_engineering import apply_dtype_plan, raw_frame, numeric_column, parse_dates, first_peak_hour, events_per_row
 
 def connect_to_mongodb():
     """Conectar a MongoDB"""
@@ -27,94 +30,53 @@ def connect_to_mongodb():
         print(f'❌ Error conectando a MongoDB: {e}')
         raise
 
-def extract_mobility_data(days_back=90):
+def extract_mobility_data(days_back=90, workers=None):
     """
     Extraer datos de movilidad entre edificios
     """
     db = connect_to_mongodb()
-    cutoff_date = datetime.now() - timedelta(days=days_back)
     
     # Obtener analíticas de edificios
-    building_analytics = list(db.building_analytics.find({
-        'date': {'$gte': cutoff_date}
-    }))
+    building_analytics = fetch_partitioned(db.building_analytics, {}, days_back, workers=workers)
     
     # Obtener eventos para ver qué edificios tienen eventos
-    events = list(db.events.find({
-        'createdAt': {'$gte': cutoff_date}
-    }))
-    
-    # Preparar datos de movilidad
-    data = []
-    
-    # Crear diccionario de eventos por edificio y fecha
-    events_by_building = {}
-    for event in events:
-        building_id = event.get('building_assigned')
-        event_date = event.get('date_time')
-        if building_id and event_date:
-            if isinstance(event_date, str):
-                try:
-                    event_date = datetime.fromisoformat(event_date.replace('Z', '+00:00'))
-                except:
-                    continue
-            elif isinstance(event_date, datetime):
-                pass
-            else:
-                continue
-            date_key = event_date.date()
-            if building_id not in events_by_building:
-                events_by_building[building_id] = {}
-            if date_key not in events_by_building[building_id]:
-                events_by_building[building_id][date_key] = 0
-            events_by_building[building_id][date_key] += 1
-    
-    for analytics in building_analytics:
-        building_id = analytics.get('buildingId')
-        analytics_date = analytics.get('date')
-        
-        if isinstance(analytics_date, str):
-            analytics_date = datetime.fromisoformat(analytics_date.replace('Z', '+00:00'))
-        elif isinstance(analytics_date, datetime):
-            pass
-        else:
-            continue
-        
-        date_key = analytics_date.date()
-        day_of_week = analytics_date.weekday()
-        hour = analytics_date.hour if hasattr(analytics_date, 'hour') else 12
-        
-        # Obtener peak hours
-        peak_hours = analytics.get('peakHours', [])
-        max_peak_hour = 0
-        if peak_hours and len(peak_hours) > 0:
-            max_peak = max(peak_hours, key=lambda x: x.get('count', 0))
-            max_peak_hour = max_peak.get('hour', 12)
-        
-        # Número de eventos en ese edificio ese día
-        events_count = events_by_building.get(building_id, {}).get(date_key, 0)
-        
-        row = {
-            'viewCount': analytics.get('viewCount', 0),
-            'uniqueVisitors': analytics.get('uniqueVisitors', 0),
-            'dayOfWeek': day_of_week,
-            'hour': hour,
-            'peakHour': max_peak_hour,
-            'eventsCount': events_count,
-            'averageViewDuration': analytics.get('averageViewDuration', 0),
-            # Target: demanda de movilidad = visitantes únicos * factor de eventos
-            'mobilityDemand': analytics.get('uniqueVisitors', 0) * (1 + events_count * 0.5)
-        }
-        
-        data.append(row)
-    
-    df = pd.DataFrame(data)
+    events = fetch_partitioned(db.events, {}, days_back, date_field='createdAt', workers=workers)
+    
+    # Preparar datos de movilidad (operaciones por columna)
+    raw = raw_frame(building_analytics, [
+        'buildingId', 'date', 'viewCount', 'uniqueVisitors', 'peakHours', 'averageViewDuration'
+    ])
+    dates = parse_dates(raw['date'])
+    # Descartar analíticas sin fecha válida
+    raw = raw[dates.notna().to_numpy()].reset_index(drop=True)
+    dates = dates[dates.notna()].reset_index(drop=True)
+    
+    # Número de eventos en ese edificio ese día (un evento puede estar en varios edificios)
+    event_frame = raw_frame(events, ['building_assigned', 'date_time']).explode('building_assigned')
+    events_count = events_per_row(
+        dates.dt.normalize(), raw['buildingId'],
+        event_frame['date_time'], event_frame['building_assigned']
+    )
+    
+    unique_visitors = numeric_column(raw, 'uniqueVisitors')
+    
+    df = pd.DataFrame({
+        'viewCount': numeric_column(raw, 'viewCount'),
+        'uniqueVisitors': unique_visitors,
+        'dayOfWeek': dates.dt.weekday,
+        'hour': dates.dt.hour,
+        'peakHour': first_peak_hour(raw['peakHours'], default=0),
+        'eventsCount': events_count,
+        'averageViewDuration': numeric_column(raw, 'averageViewDuration'),
+        # Target: demanda de movilidad = visitantes únicos * factor de eventos
+        'mobilityDemand': unique_visitors * (1 + events_count * 0.5)
+    })
     
     if len(df) == 0:
         print('⚠️  No hay datos de movilidad. Generando datos sintéticos...')
         return generate_synthetic_mobility_data()
     
-    return df
+    return apply_dtype_plan(df)
 
 def generate_synthetic_mobility_data(n_samples=200):
     """Generar datos sintéticos para desarrollo"""
@@ -137,7 +99,7 @@ def generate_synthetic_mobility_data(n_samples=200):
     ).astype(int)
     data['mobilityDemand'] = np.maximum(data['mobilityDemand'], 0)
     
-    return pd.DataFrame(data)
+    return apply_dtype_plan(pd.DataFrame(data))
 
 def train_mobility_model():
     """
@@ -169,16 +131,20 @@ def train_mobility_model():
     
     print(f'📈 Entrenando con {len(X_train)} muestras...')
     
-    # Usar Random Forest si hay suficientes datos, sino Linear Regression
-    if len(df) >= 50:
-        model = RandomForestRegressor(n_estimators=100, random_state=42, max_depth=10)
-        model_name = 'RandomForest'
-    else:
-        model = LinearRegression()
-        model_name = 'LinearRegression'
-    
-    # Entrenar
+    # Elegir el modelo más preciso que cumple el presupuesto de servicio
+    candidates = {
+        'RandomForest': RandomForestRegressor(n_estimators=100, random_state=42, max_depth=10),
+        'LinearRegression': LinearRegression()
+    }
+    # Se elige con una partición de validación; test solo se usa para el reporte final
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.2, random_state=42)
+    model_name, model, report = select_within_budget(candidates, X_fit, y_fit, X_val, y_val, 'regression')
+    print_selection_report(report, model_name)
+    if model is None:
+        print(f'❌ Ningún modelo cumple el presupuesto de servicio {serving_budget()}')
+        return None, None
     model.fit(X_train, y_train)
+    serving = next(entry['serving_profile'] for entry in report if entry['candidate'] == model_name)
     
     # Evaluar
     y_pred = model.predict(X_test)
@@ -206,7 +172,8 @@ def train_mobility_model():
             'mae': float(mae),
             'rmse': float(np.sqrt(mse)),
             'r2': float(r2)
-        }
+        },
+        'serving_profile': serving
     }
     
     metadata_path = f'{MODELS_DIR}/mobility_demand_predictor_metadata.json'
@@ -10,6 +10,8 @@ import os
 from datetime import datetime
 from config import MODELS_DIR
 from data_extractor import extract_event_data
+from profiling import select_within_budget, print_selection_report, serving_budget
+from feature_engineering import apply_dtype_plan
 
 def prepare_features(df):
     """
@@ -52,16 +54,20 @@ def train_attendance_model(use_random_forest=False):
     
     print(f'📈 Entrenando con {len(X_train)} muestras...')
     
-    # Elegir modelo
-    if use_random_forest and len(df) >= 50:
-        model = RandomForestRegressor(n_estimators=100, random_state=42, max_depth=10)
-        model_name = 'RandomForest'
-    else:
-        model = LinearRegression()
-        model_name = 'LinearRegression'
-    
-    # Entrenar
+    # Elegir el modelo más preciso que cumple el presupuesto de servicio
+    candidates = {'LinearRegression': LinearRegression()}
+    if use_random_forest:
+        candidates['RandomForest'] = RandomForestRegressor(n_estimators=100, random_state=42, max_depth=10)
+    
+    # Se elige con una partición de validación; test solo se usa para el reporte final
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.2, random_state=42)
+    model_name, model, report = select_within_budget(candidates, X_fit, y_fit, X_val, y_val, 'regression')
+    print_selection_report(report, model_name)
+    if model is None:
+        print(f'❌ Ningún modelo cumple el presupuesto de servicio {serving_budget()}')
+        return None, None
     model.fit(X_train, y_train)
+    serving = next(entry['serving_profile'] for entry in report if entry['candidate'] == model_name)
     
     # Evaluar
     y_pred = model.predict(X_test)
@@ -89,7 +95,8 @@ def train_attendance_model(use_random_forest=False):
             'mae': float(mae),
             'rmse': float(np.sqrt(mse)),
             'r2': float(r2)
-        }
+        },
+        'serving_profile': serving
     }
     
     import json
@@ -124,13 +131,13 @@ def generate_synthetic_data(n_samples=100):
     ).astype(int)
     data['attendance'] = np.maximum(data['attendance'], 0)  # No negativos
     
-    return pd.DataFrame(data)
+    return apply_dtype_plan(pd.DataFrame(data))
 
 if __name__ == '__main__':
     print('🚀 Iniciando entrenamiento del modelo...')
     print('=' * 50)
     
-    # Intentar Random Forest primero, si hay suficientes datos
+    # Evaluar también Random Forest (se elige según precisión y presupuesto de servicio)
     model, metadata = train_attendance_model(use_random_forest=True)
     
     print('\n✅ Entrenamiento completado!')
@@ -15,6 +15,9 @@ from datetime import datetime, timedelta
 from config import MODELS_DIR
 import pymongo
 from config import MONGO_URI
+from data_extractor_updated import fetch_partitioned
+from profiling import select_within_budget, print_selection_report, serving_budget
+from feature_engineering import apply_dtype_plan, raw_frame, numeric_column, parse_dates, peak_hours_total, threshold_saturation_levels
 
 def connect_to_mongodb():
     """Conectar a MongoDB"""
@@ -27,112 +30,69 @@ def connect_to_mongodb():
         print(f'❌ Error conectando a MongoDB: {e}')
         raise
 
-def extract_saturation_data(days_back=90):
+def extract_saturation_data(days_back=90, workers=None):
     """
     Extraer datos de saturaciones (edificios y eventos)
     """
     db = connect_to_mongodb()
-    cutoff_date = datetime.now() - timedelta(days=days_back)
     
-    # Obtener analíticas de edificios
-    building_analytics = list(db.building_analytics.find({
-        'date': {'$gte': cutoff_date}
-    }))
-    
-    # Obtener analíticas de eventos
-    event_analytics = list(db.event_analytics.find({
-        'date': {'$gte': cutoff_date}
-    }))
-    
-    data = []
-    
-    # Datos de edificios
-    for analytics in building_analytics:
-        analytics_date = analytics.get('date')
-        if isinstance(analytics_date, str):
-            analytics_date = datetime.fromisoformat(analytics_date.replace('Z', '+00:00'))
-        elif not isinstance(analytics_date, datetime):
-            continue
-        
-        day_of_week = analytics_date.weekday()
-        hour = analytics_date.hour if hasattr(analytics_date, 'hour') else 12
-        
-        peak_hours = analytics.get('peakHours', [])
-        total_peak_visits = sum(ph.get('count', 0) for ph in peak_hours) if peak_hours else 0
-        
-        # Determinar saturación basado en umbrales
-        # Saturación = 3 (Alta), 2 (Media), 1 (Baja), 0 (Normal)
-        unique_visitors = analytics.get('uniqueVisitors', 0)
-        view_count = analytics.get('viewCount', 0)
-        
-        if unique_visitors > 150 or view_count > 300:
-            saturation_level = 3  # Alta saturación
-        elif unique_visitors > 100 or view_count > 200:
-            saturation_level = 2  # Media saturación
-        elif unique_visitors > 50 or view_count > 100:
-            saturation_level = 1  # Baja saturación
-        else:
-            saturation_level = 0  # Normal
-        
-        row = {
-            'viewCount': view_count,
-            'uniqueVisitors': unique_visitors,
-            'dayOfWeek': day_of_week,
-            'hour': hour,
-            'peakVisits': total_peak_visits,
-            'averageViewDuration': analytics.get('averageViewDuration', 0),
-            'type': 0,  # 0 = Edificio, 1 = Evento
-            'saturationLevel': saturation_level
-        }
-        
-        data.append(row)
+    # Obtener analíticas de edificios y de eventos (particiones de fecha en paralelo)
+    building_analytics = fetch_partitioned(db.building_analytics, {}, days_back, workers=workers)
+    event_analytics = fetch_partitioned(db.event_analytics, {}, days_back, workers=workers)
+    
+    # Datos de edificios (las analíticas sin fecha válida se descartan)
+    buildings = raw_frame(building_analytics, [
+        'date', 'viewCount', 'uniqueVisitors', 'peakHours', 'averageViewDuration'
+    ])
+    building_dates = parse_dates(buildings['date'])
+    buildings = buildings[building_dates.notna().to_numpy()].reset_index(drop=True)
+    building_dates = building_dates.dropna().reset_index(drop=True)
+    
+    building_view_count = numeric_column(buildings, 'viewCount')
+    building_unique_visitors = numeric_column(buildings, 'uniqueVisitors')
+    
+    # Saturación = 3 (Alta), 2 (Media), 1 (Baja), 0 (Normal) según umbrales de edificio
+    building_rows = pd.DataFrame({
+        'viewCount': building_view_count,
+        'uniqueVisitors': building_unique_visitors,
+        'dayOfWeek': building_dates.dt.weekday,
+        'hour': building_dates.dt.hour,
+        'peakVisits': peak_hours_total(buildings['peakHours']),
+        'averageViewDuration': numeric_column(buildings, 'averageViewDuration'),
+        'type': 0,  # 0 = Edificio, 1 = Evento
+        'saturationLevel': threshold_saturation_levels(building_unique_visitors, building_view_count, 0, 0)
+    })
     
     # Datos de eventos
-    for analytics in event_analytics:
-        analytics_date = analytics.get('date')
-        if isinstance(analytics_date, str):
-            analytics_date = datetime.fromisoformat(analytics_date.replace('Z', '+00:00'))
-        elif not isinstance(analytics_date, datetime):
-            continue
-        
-        day_of_week = analytics_date.weekday()
-        hour = analytics_date.hour if hasattr(analytics_date, 'hour') else 12
-        
-        # Determinar saturación
-        unique_visitors = analytics.get('uniqueVisitors', 0)
-        view_count = analytics.get('viewCount', 0)
-        popularity_score = analytics.get('popularityScore', 0)
-        
-        if unique_visitors > 100 or view_count > 200 or popularity_score > 500:
-            saturation_level = 3  # Alta saturación
-        elif unique_visitors > 60 or view_count > 120 or popularity_score > 300:
-            saturation_level = 2  # Media saturación
-        elif unique_visitors > 30 or view_count > 60 or popularity_score > 150:
-            saturation_level = 1  # Baja saturación
-        else:
-            saturation_level = 0  # Normal
-        
-        row = {
-            'viewCount': view_count,
-            'uniqueVisitors': unique_visitors,
-            'dayOfWeek': day_of_week,
-            'hour': hour,
-            'peakVisits': 0,
-            'averageViewDuration': 0,
-            'popularityScore': popularity_score,
-            'type': 1,  # Evento
-            'saturationLevel': saturation_level
-        }
-        
-        data.append(row)
-    
-    df = pd.DataFrame(data)
+    events = raw_frame(event_analytics, ['date', 'viewCount', 'uniqueVisitors', 'popularityScore'])
+    event_dates = parse_dates(events['date'])
+    events = events[event_dates.notna().to_numpy()].reset_index(drop=True)
+    event_dates = event_dates.dropna().reset_index(drop=True)
+    
+    event_view_count = numeric_column(events, 'viewCount')
+    event_unique_visitors = numeric_column(events, 'uniqueVisitors')
+    popularity_score = numeric_column(events, 'popularityScore')
+    
+    event_rows = pd.DataFrame({
+        'viewCount': event_view_count,
+        'uniqueVisitors': event_unique_visitors,
+        'dayOfWeek': event_dates.dt.weekday,
+        'hour': event_dates.dt.hour,
+        'peakVisits': 0,
+        'averageViewDuration': 0,
+        'popularityScore': popularity_score,
+        'type': 1,  # Evento
+        'saturationLevel': threshold_saturation_levels(event_unique_visitors, event_view_count, popularity_score, 1)
+    })
+    
+    frames = [frame for frame in (building_rows, event_rows) if len(frame)]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
     
     if len(df) == 0:
         print('⚠️  No hay datos de saturación. Generando datos sintéticos...')
         return generate_synthetic_saturation_data()
     
-    return df
+    return apply_dtype_plan(df)
 
 def generate_synthetic_saturation_data(n_samples=300):
     """Generar datos sintéticos para desarrollo"""
@@ -150,24 +110,21 @@ def generate_synthetic_saturation_data(n_samples=300):
     }
     
     # Calcular nivel de saturación basado en los datos
-    saturation_levels = []
-    for i in range(n_samples):
-        uv = data['uniqueVisitors'][i]
-        vc = data['viewCount'][i]
-        ps = data['popularityScore'][i] if data['type'][i] == 1 else 0
-        
-        if (uv > 150 and data['type'][i] == 0) or (uv > 100 and data['type'][i] == 1) or vc > 300 or ps > 500:
-            saturation_levels.append(3)
-        elif (uv > 100 and data['type'][i] == 0) or (uv > 60 and data['type'][i] == 1) or vc > 200 or ps > 300:
-            saturation_levels.append(2)
-        elif (uv > 50 and data['type'][i] == 0) or (uv > 30 and data['type'][i] == 1) or vc > 100 or ps > 150:
-            saturation_levels.append(1)
-        else:
-            saturation_levels.append(0)
-    
-    data['saturationLevel'] = saturation_levels
+    uv = data['uniqueVisitors']
+    vc = data['viewCount']
+    is_event = data['type'] == 1
+    ps = np.where(is_event, data['popularityScore'], 0)
+    data['saturationLevel'] = np.select(
+        [
+            np.where(is_event, uv > 100, uv > 150) | (vc > 300) | (ps > 500),
+            np.where(is_event, uv > 60, uv > 100) | (vc > 200) | (ps > 300),
+            np.where(is_event, uv > 30, uv > 50) | (vc > 100) | (ps > 150),
+        ],
+        [3, 2, 1],
+        default=0
+    )
     
-    return pd.DataFrame(data)
+    return apply_dtype_plan(pd.DataFrame(data))
 
 def train_saturation_model():
     """
@@ -208,16 +165,20 @@ def train_saturation_model():
     
     print(f'📈 Entrenando con {len(X_train)} muestras...')
     
-    # Usar Random Forest si hay suficientes datos, sino Logistic Regression
-    if len(df) >= 50:
-        model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10)
-        model_name = 'RandomForestClassifier'
-    else:
-        model = LogisticRegression(random_state=42, max_iter=1000)
-        model_name = 'LogisticRegression'
-    
-    # Entrenar
+    # Elegir el modelo más preciso que cumple el presupuesto de servicio
+    candidates = {
+        'RandomForestClassifier': RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10),
+        'LogisticRegression': LogisticRegression(random_state=42, max_iter=1000)
+    }
+    # Se elige con una partición de validación; test solo se usa para el reporte final
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.2, random_state=42)
+    model_name, model, report = select_within_budget(candidates, X_fit, y_fit, X_val, y_val, 'classification')
+    print_selection_report(report, model_name)
+    if model is None:
+        print(f'❌ Ningún modelo cumple el presupuesto de servicio {serving_budget()}')
+        return None, None
     model.fit(X_train, y_train)
+    serving = next(entry['serving_profile'] for entry in report if entry['candidate'] == model_name)
     
     # Evaluar
     y_pred = model.predict(X_test)
@@ -242,7 +203,8 @@ def train_saturation_model():
         'metrics': {
             'accuracy': float(accuracy)
         },
-        'classes': ['Normal (0)', 'Baja (1)', 'Media (2)', 'Alta (3)']
+        'classes': ['Normal (0)', 'Baja (1)', 'Media (2)', 'Alta (3)'],
+        'serving_profile': serving
     }
     
     metadata_path = f'{MODELS_DIR}/saturation_predictor_metadata.json'
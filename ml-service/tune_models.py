@@ -0,0 +1,289 @@
+# tune_models.py
+"""
+Búsqueda de hiperparámetros por successive halving para los modelos de train_all_models.py
+- Los folds de validación cruzada se calculan una sola vez y se reutilizan en todas las rondas
+- Las features se discretizan una sola vez (máx. 255 bins por columna, uint8) y esa matriz
+  se comparte entre todos los candidatos y procesos
+- Los candidatos de cada ronda se evalúan en paralelo (candidato × fold)
+- Los mejores candidatos se perfilan (latencia y tamaño) y se reporta el frente de Pareto
+La configuración elegida se guarda en models/tuned_hyperparameters.json y
+train_all_models.py la aplica y la registra en la metadata del modelo
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from train_all_models import MODEL_SPECS, load_training_data, ensure_directories
+from estimators import ESTIMATOR_FAMILIES, TUNED_HYPERPARAMETERS_PATH, build_estimator
+from profiling import serving_profile
+
+# Espacios de búsqueda por familia (se combinan con los defaults de estimators.py)
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [8, 12, 15, 20, None],
+        'min_samples_split': [2, 4, 8],
+        'min_samples_leaf': [1, 2, 4],
+        'max_features': ['sqrt', 0.5, 1.0]
+    },
+    'hist_gradient_boosting': {
+        'max_iter': [100, 200, 400],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2],
+        'max_leaf_nodes': [15, 31, 63],
+        'min_samples_leaf': [10, 20, 40],
+        'l2_regularization': [0.0, 0.1, 1.0]
+    }
+}
+
+MAX_BINS = 255
+
+def bin_features(X, max_bins=MAX_BINS):
+    """
+    Discretizar cada columna por cuantiles en códigos uint8
+    Se calcula una vez por modelo y la comparten todos los candidatos de la búsqueda
+    """
+    X = np.asarray(X, dtype=float)
+    binned = np.empty(X.shape, dtype=np.uint8)
+    for j in range(X.shape[1]):
+        column = X[:, j]
+        edges = np.unique(np.quantile(column, np.linspace(0, 1, max_bins + 1)[1:-1]))
+        binned[:, j] = np.searchsorted(edges, column, side='right')
+    return binned
+
+def cached_folds(y, task, n_splits=3, random_state=42):
+    """
+    Índices (train, test) de cada fold, calculados una sola vez
+    Los índices de entrenamiento quedan barajados para que un prefijo sea una submuestra aleatoria
+    """
+    from sklearn.model_selection import KFold, StratifiedKFold
+
+    if task == 'classification':
+        n_splits = max(2, min(n_splits, int(np.bincount(y).min())))
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    else:
+        splitter = KFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+
+    rng = np.random.default_rng(random_state)
+    return [(rng.permutation(train_idx), test_idx) for train_idx, test_idx in splitter.split(np.zeros(len(y)), y)]
+
+def sample_candidates(family, n_candidates, random_state=42):
+    """Configuraciones aleatorias (sin repetir) del espacio de búsqueda de la familia"""
+    from sklearn.model_selection import ParameterSampler
+
+    space = SEARCH_SPACES[family]
+    total = math.prod(len(values) for values in space.values())
+    sampler = ParameterSampler(space, n_iter=min(n_candidates, total), random_state=random_state)
+    return [{'family': family, 'params': params} for params in sampler]
+
+def halving_schedule(n_candidates, max_resources, min_resources, factor):
+    """Muestras de entrenamiento por ronda; la última ronda usa el fold completo"""
+    n_rounds = min(
+        int(math.log(n_candidates, factor)) + 1 if n_candidates > 1 else 1,
+        int(math.log(max(max_resources / min_resources, 1), factor)) + 1
+    )
+    return [int(max_resources / factor ** (n_rounds - 1 - r)) for r in range(n_rounds)]
+
+def fit_and_score(candidate, task, X, y, train_idx, test_idx, n_samples):
+    """Entrenar un candidato con las primeras n_samples filas del fold y evaluarlo"""
+    from sklearn.metrics import r2_score, accuracy_score
+
+    model, _ = build_estimator(candidate['family'], task, n_jobs=1, **candidate['params'])
+    subset = train_idx[:n_samples]
+    model.fit(X[subset], y[subset])
+    y_pred = model.predict(X[test_idx])
+    return float(r2_score(y[test_idx], y_pred) if task == 'regression' else accuracy_score(y[test_idx], y_pred))
+
+def successive_halving(candidates, task, X, y, folds, factor=3, min_resources=None, n_jobs=-1):
+    """
+    Evaluar candidatos en rondas con cada vez más muestras, conservando el mejor 1/factor
+    Retorna los candidatos con su score medio de CV en la última ronda que alcanzaron
+    """
+    from joblib import Parallel, delayed
+
+    max_resources = min(len(train_idx) for train_idx, _ in folds)
+    min_resources = min(min_resources or max(50, max_resources // factor ** 3), max_resources)
+    schedule = halving_schedule(len(candidates), max_resources, min_resources, factor)
+
+    alive = list(candidates)
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for round_number, n_samples in enumerate(schedule):
+            started = time.perf_counter()
+            scores = parallel(
+                delayed(fit_and_score)(candidate, task, X, y, train_idx, test_idx, n_samples)
+                for candidate in alive
+                for train_idx, test_idx in folds
+            )
+            scores = np.asarray(scores).reshape(len(alive), len(folds))
+            for candidate, fold_scores in zip(alive, scores):
+                candidate.update({
+                    'cv_score': float(fold_scores.mean()),
+                    'cv_std': float(fold_scores.std()),
+                    'round': round_number,
+                    'n_samples': n_samples
+                })
+            print(f'   Ronda {round_number + 1}/{len(schedule)}: {len(alive)} candidatos × {len(folds)} folds, '
+                  f'{n_samples} muestras ({time.perf_counter() - started:.1f}s) → '
+                  f'mejor {scores.mean(axis=1).max():.4f}')
+
+            if round_number < len(schedule) - 1:
+                alive.sort(key=lambda c: c['cv_score'], reverse=True)
+                alive = alive[:max(1, math.ceil(len(alive) / factor))]
+
+    # Orden: primero quien llegó más lejos, luego el score
+    return sorted(candidates, key=lambda c: (c['round'], c['cv_score']), reverse=True)
+
+def profile_candidates(candidates, task, X, y, batch_size=1000):
+    """Entrenar cada candidato con todos los datos y medir latencia de inferencia y tamaño"""
+    for candidate in candidates:
+        model, _ = build_estimator(candidate['family'], task, n_jobs=1, **candidate['params'])
+        model.fit(X, y)
+        profile = serving_profile(model, X, batch_size=batch_size, single_repeats=100, batch_repeats=5)
+        candidate.update({
+            'p50_ms': profile['single_row']['p50_ms'],
+            'p99_ms': profile['single_row']['p99_ms'],
+            'batch_rows_per_second': profile['batch']['rows_per_second'],
+            'artifact_bytes': profile['artifact_bytes']
+        })
+    return candidates
+
+def pareto_front(candidates):
+    """Candidatos no dominados: mayor score, menor latencia p50 y menor tamaño"""
+    def dominates(a, b):
+        no_worse = (a['cv_score'] >= b['cv_score'] and a['p50_ms'] <= b['p50_ms']
+                    and a['artifact_bytes'] <= b['artifact_bytes'])
+        better = (a['cv_score'] > b['cv_score'] or a['p50_ms'] < b['p50_ms']
+                  or a['artifact_bytes'] < b['artifact_bytes'])
+        return no_worse and better
+
+    front = [c for c in candidates if not any(dominates(other, c) for other in candidates)]
+    return sorted(front, key=lambda c: c['cv_score'], reverse=True)
+
+def select_configuration(front):
+    """Configuración elegida: mayor score del frente (desempate por menor latencia)"""
+    return max(front, key=lambda c: (c['cv_score'], -c['p50_ms']))
+
+def tune_model(name, families, n_candidates=20, factor=3, n_splits=3, top_k=8,
+               from_snapshot=True, n_jobs=-1):
+    """Búsqueda completa para un modelo; retorna el resultado serializable o None"""
+    from sklearn.preprocessing import LabelEncoder
+
+    spec = MODEL_SPECS[name]
+    print(f'\n🔎 {name.capitalize()}: búsqueda de hiperparámetros ({", ".join(families)})')
+    df = load_training_data(spec['dataset'], spec['extractor'], from_snapshot)
+    if len(df) < 10 * n_splits:
+        print('   ❌ No hay suficientes datos para la búsqueda')
+        return None
+
+    y = df[spec['target']].to_numpy()
+    if spec['task'] == 'classification':
+        y = LabelEncoder().fit_transform(y)
+
+    # Caché compartida por todos los candidatos: features discretizadas y folds
+    X = bin_features(df[spec['features']].to_numpy(dtype=float))
+    folds = cached_folds(y, spec['task'], n_splits)
+
+    started = time.perf_counter()
+    candidates = [
+        candidate
+        for family in families
+        for candidate in sample_candidates(family, n_candidates)
+    ]
+    ranked = successive_halving(candidates, spec['task'], X, y, folds, factor=factor, n_jobs=n_jobs)
+
+    print(f'   ⏱️  Perfilando los {min(top_k, len(ranked))} mejores candidatos...')
+    finalists = profile_candidates(ranked[:top_k], spec['task'], X, y)
+    front = pareto_front(finalists)
+    chosen = select_configuration(front)
+
+    print('   Frente de Pareto (score / latencia p50 / tamaño):')
+    for candidate in front:
+        marker = '👉' if candidate is chosen else '  '
+        print(f'   {marker} {candidate["family"]:<24} {candidate["cv_score"]:.4f} | '
+              f'{candidate["p50_ms"]:7.3f} ms | {candidate["artifact_bytes"] / 1024:9.1f} KB | '
+              f'{candidate["params"]}')
+
+    return {
+        'family': chosen['family'],
+        'params': chosen['params'],
+        'cv_score': chosen['cv_score'],
+        'p50_ms': chosen['p50_ms'],
+        'artifact_bytes': chosen['artifact_bytes'],
+        'tuned_on': datetime.now().isoformat(),
+        'n_samples': len(df),
+        'n_candidates': len(candidates),
+        'search_seconds': time.perf_counter() - started,
+        'pareto_front': front
+    }
+
+def save_tuning_results(results, path=TUNED_HYPERPARAMETERS_PATH):
+    """Combinar con los resultados existentes (por modelo) y guardar"""
+    existing = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            existing = json.load(f)
+    existing.update(results)
+    with open(path, 'w') as f:
+        json.dump(existing, f, indent=2)
+
+def parse_args(argv=None):
+    """Opciones de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Búsqueda de hiperparámetros por successive halving')
+    parser.add_argument('models', nargs='*',
+                        help=f'Modelos a ajustar: {", ".join(MODEL_SPECS)} (por defecto todos)')
+    parser.add_argument('--families', nargs='+', default=list(SEARCH_SPACES),
+                        help=f'Familias a explorar ({", ".join(SEARCH_SPACES)})')
+    parser.add_argument('--candidates', type=int, default=20, help='Candidatos por familia')
+    parser.add_argument('--factor', type=int, default=3, help='Factor de eliminación por ronda')
+    parser.add_argument('--folds', type=int, default=3, help='Folds de validación cruzada')
+    parser.add_argument('--top-k', type=int, default=8, help='Candidatos a perfilar para el frente de Pareto')
+    parser.add_argument('--extract', action='store_true',
+                        help='Extraer de MongoDB en lugar de usar el snapshot más reciente')
+    parser.add_argument('--jobs', type=int, default=-1, help='Procesos para evaluar candidatos')
+    args = parser.parse_args(argv)
+    unknown = set(args.models) - set(MODEL_SPECS)
+    if unknown:
+        parser.error(f'Modelos desconocidos: {", ".join(sorted(unknown))}')
+    unknown = set(args.families) - set(SEARCH_SPACES)
+    if unknown:
+        parser.error(f'Familias sin espacio de búsqueda: {", ".join(sorted(unknown))} '
+                     f'(familias registradas: {", ".join(ESTIMATOR_FAMILIES)})')
+    args.models = args.models or list(MODEL_SPECS)
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    ensure_directories()
+
+    results = {}
+    for name in args.models:
+        result = tune_model(name, args.families, args.candidates, args.factor, args.folds,
+                            args.top_k, from_snapshot=not args.extract, n_jobs=args.jobs)
+        if result:
+            results[name] = result
+
+    if not results:
+        print('\n❌ No se ajustó ningún modelo')
+        return 1
+
+    save_tuning_results(results)
+    print(f'\n💾 Configuraciones guardadas en {TUNED_HYPERPARAMETERS_PATH}')
+    for name, result in results.items():
+        print(f'✅ {name.capitalize()}: {result["family"]} (CV {result["cv_score"]:.4f}, '
+              f'{result["search_seconds"]:.1f}s)')
+    print('\n📝 Siguiente paso:')
+    print('   python train_all_models.py  # Entrenar con las configuraciones elegidas')
+    return 0
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print('\n❌ Búsqueda cancelada por el usuario')
+        sys.exit(1)
@@ -0,0 +1,91 @@
+# warmup.py
+"""
+Calentamiento de los modelos después de cargarlos (inicio de la API y /model/reload)
+Las primeras predicciones con un modelo recién deserializado son lentas (inicialización
+perezosa de sklearn/joblib, page faults al recorrer los árboles por primera vez), así
+que cada modelo ejecuta las mismas llamadas que los endpoints con lotes sintéticos
+representativos (synthetic_data.py) de cada tamaño de WARMUP_BATCH_SIZES antes de
+declararse listo. Mientras tanto sus predicciones aprendidas responden 503 con
+Retry-After (el backend usa su fallback en lugar de esperar al timeout)
+"""
+
+import os
+import time
+from datetime import datetime
+
+from fastapi import HTTPException
+
+from feature_engineering import INFERENCE_DTYPE
+from synthetic_data import generate
+
+# Tamaños de lote con los que se calienta cada modelo (1 = solicitud individual)
+WARMUP_BATCH_SIZES = [int(size) for size in os.getenv('WARMUP_BATCH_SIZES', '1,32,1000').split(',')]
+# Repeticiones de cada tamaño de lote
+WARMUP_ROUNDS = int(os.getenv('WARMUP_ROUNDS', 3))
+# Segundos sugeridos al cliente en Retry-After mientras el modelo se calienta
+WARMUP_RETRY_AFTER_S = int(os.getenv('WARMUP_RETRY_AFTER_S', 2))
+
+# Dataset sintético con las columnas de cada modelo
+WARMUP_DATASETS = {
+    'attendance': 'event_data',
+    'mobility': 'mobility_data',
+    'saturation': 'saturation_data',
+    'building_load': 'building_load_data'
+}
+
+# Modelo ya calentado de cada endpoint y resumen del calentamiento
+# (se guarda el objeto: un modelo recargado es otro objeto y vuelve a estar frío)
+readiness = {}
+
+def warm_up(predict, dataset, features, batch_sizes=None, rounds=None, seed=0):
+    """
+    Ejecutar predict(X) con lotes sintéticos del dataset de cada tamaño, `rounds` veces
+    Retorna el resumen: duración total y latencia de la primera y la última ronda por tamaño
+    """
+    batch_sizes = batch_sizes or WARMUP_BATCH_SIZES
+    rounds = rounds or WARMUP_ROUNDS
+    started = time.perf_counter()
+    X = generate(dataset, max(batch_sizes), seed)[features].to_numpy(dtype=INFERENCE_DTYPE)
+
+    latencies = {}
+    for size in batch_sizes:
+        timings = []
+        for _ in range(rounds):
+            batch_started = time.perf_counter()
+            predict(X[:size])
+            timings.append((time.perf_counter() - batch_started) * 1000)
+        latencies[str(size)] = {'first_ms': round(timings[0], 3), 'last_ms': round(timings[-1], 3)}
+
+    return {
+        'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+        'batch_sizes': batch_sizes,
+        'rounds': rounds,
+        'latency_ms': latencies,
+        'warmed_at': datetime.now().isoformat()
+    }
+
+def mark_ready(name, model, summary):
+    """Registrar que `model` quedó calentado"""
+    readiness[name] = {'model': model, 'warmup': summary}
+
+def is_ready(name, model):
+    """True si `model` (el cargado para `name`) ya se calentó; sin modelo no hay nada que esperar"""
+    return model is None or readiness.get(name, {}).get('model') is model
+
+def warming_up(name):
+    """503 con Retry-After para una predicción con un modelo aún frío"""
+    return HTTPException(
+        status_code=503,
+        detail=f"Modelo {name} calentándose después de cargarse. Reintenta en {WARMUP_RETRY_AFTER_S}s",
+        headers={'Retry-After': str(WARMUP_RETRY_AFTER_S)}
+    )
+
+def warmup_stats(models):
+    """Estado y resumen del calentamiento de cada modelo cargado (`models`: nombre → modelo)"""
+    return {
+        name: {
+            'ready': is_ready(name, model),
+            'warmup': readiness[name]['warmup'] if model is not None and is_ready(name, model) else None
+        }
+        for name, model in models.items() if model is not None
+    }
@@ -3,6 +3,19 @@ import axios from 'axios';
 
 const ML_SERVICE_URL = process.env.ML_SERVICE_URL || 'http://localhost:8000';
 
+/**
+ * Errores en los que se responde con el cálculo de fallback: servicio caído, modelo
+ * no disponible (503) o servicio saturado (429: el ML service rechaza de inmediato
+ * en lugar de encolar hasta el timeout; Retry-After indica cuándo reintentar)
+ */
+function isUnavailable(error) {
+  if (error.response?.status === 429) {
+    console.log(`⚠️  ML Service saturado (Retry-After: ${error.response.headers?.['retry-after'] ?? '?'}s)`);
+    return true;
+  }
+  return error.code === 'ECONNREFUSED' || error.response?.status === 503;
+}
+
 /**
  * Predecir asistencia a un evento
  */
@@ -23,20 +36,63 @@ export const predictEventAttendance = async (eventData) => {
     console.error('Error en predicción ML:', error.message);
     
     // Fallback: cálculo simple si ML service no está disponible
-    if (error.code === 'ECONNREFUSED' || error.response?.status === 503) {
+    if (isUnavailable(error)) {
       console.log('⚠️  ML Service no disponible, usando cálculo de fallback');
-      return {
+      return fallbackAttendance(eventData);
+    }
+    
+    throw error;
+  }
+};
+
+/**
+ * Predecir la asistencia de varios eventos en una sola llamada
+ * (cada resultado incluye quantiles p10/p50/p90 si el modelo los soporta)
+ */
+export const predictEventAttendanceBatch = async (eventsData) => {
+  const items = eventsData.map((eventData) => ({
+    viewCount: eventData.viewCount || 0,
+    uniqueVisitors: eventData.uniqueVisitors || 0,
+    dayOfWeek: eventData.dayOfWeek,
+    hour: eventData.hour,
+    category_count: eventData.category_count || 1,
+    popularityScore: eventData.popularityScore || 0,
+    date_time: eventData.date_time
+  }));
+
+  try {
+    const response = await axios.post(`${ML_SERVICE_URL}/predict/attendance/batch`, { items });
+    return response.data.predictions;
+  } catch (error) {
+    console.error('Error en predicción ML por lote:', error.message);
+
+    if (isUnavailable(error)) {
+      console.log('⚠️  ML Service no disponible, usando cálculo de fallback');
+      return eventsData.map((eventData) => ({
         prediction: calculateSimpleAttendancePrediction(eventData),
         confidence: 0.3,
         model_type: 'fallback',
-        features_used: []
-      };
+        features_used: [],
+        quantiles: null
+      }));
     }
-    
+
     throw error;
   }
 };
 
+/**
+ * Respuesta de fallback de asistencia (mismo formato que la del ML service)
+ */
+function fallbackAttendance(eventData) {
+  return {
+    prediction: calculateSimpleAttendancePrediction(eventData),
+    confidence: 0.3,
+    model_type: 'fallback',
+    features_used: []
+  };
+}
+
 /**
  * Cálculo simple de fallback si ML service no está disponible
  */
@@ -69,7 +125,8 @@ export const predictMobilityDemand = async (mobilityData) => {
       peakHour: mobilityData.peakHour,
       eventsCount: mobilityData.eventsCount || 0,
       averageViewDuration: mobilityData.averageViewDuration || 0,
-      date_time: mobilityData.date_time
+      date_time: mobilityData.date_time,
+      buildingId: mobilityData.buildingId // Modelo del edificio si existe (modo aprendido)
     });
 
     return response.data;
@@ -77,20 +134,27 @@ export const predictMobilityDemand = async (mobilityData) => {
     console.error('Error en predicción de movilidad ML:', error.message);
     
     // Fallback si ML service no está disponible
-    if (error.code === 'ECONNREFUSED' || error.response?.status === 503) {
+    if (isUnavailable(error)) {
       console.log('⚠️  ML Service no disponible, usando cálculo de fallback');
-      return {
-        prediction: calculateSimpleMobilityPrediction(mobilityData),
-        confidence: 0.3,
-        model_type: 'fallback',
-        features_used: []
-      };
+      return fallbackMobility(mobilityData);
     }
     
     throw error;
   }
 };
 
+/**
+ * Respuesta de fallback de movilidad
+ */
+function fallbackMobility(mobilityData) {
+  return {
+    prediction: calculateSimpleMobilityPrediction(mobilityData),
+    confidence: 0.3,
+    model_type: 'fallback',
+    features_used: []
+  };
+}
+
 /**
  * Cálculo simple de fallback para movilidad
  */
@@ -122,7 +186,8 @@ export const predictSaturation = async (saturationData) => {
       averageViewDuration: saturationData.averageViewDuration || 0,
       popularityScore: saturationData.popularityScore || 0,
       type: saturationData.type || 0, // 0 = Edificio, 1 = Evento
-      date_time: saturationData.date_time
+      date_time: saturationData.date_time,
+      buildingId: saturationData.buildingId // Modelo del edificio si existe (modo aprendido)
     });
 
     return response.data;
@@ -130,21 +195,29 @@ export const predictSaturation = async (saturationData) => {
     console.error('Error en predicción de saturación ML:', error.message);
     
     // Fallback si ML service no está disponible
-    if (error.code === 'ECONNREFUSED' || error.response?.status === 503) {
+    if (isUnavailable(error)) {
       console.log('⚠️  ML Service no disponible, usando cálculo de fallback');
-      return {
-        saturationLevel: calculateSimpleSaturation(saturationData),
-        saturationLabel: getSaturationLabel(calculateSimpleSaturation(saturationData)),
-        confidence: 0.3,
-        model_type: 'fallback',
-        features_used: []
-      };
+      return fallbackSaturation(saturationData);
     }
     
     throw error;
   }
 };
 
+/**
+ * Respuesta de fallback de saturación
+ */
+function fallbackSaturation(saturationData) {
+  const saturationLevel = calculateSimpleSaturation(saturationData);
+  return {
+    saturationLevel,
+    saturationLabel: getSaturationLabel(saturationLevel),
+    confidence: 0.3,
+    model_type: 'fallback',
+    features_used: []
+  };
+}
+
 /**
  * Cálculo simple de saturación (fallback)
  */
@@ -184,6 +257,166 @@ function getSaturationLabel(level) {
   return labels[level] || 'Normal';
 }
 
+/**
+ * Predecir demanda de movilidad y nivel de saturación de un edificio en una sola llamada
+ * (el ML service usa un solo modelo multi-salida; retorna { mobility, saturation })
+ */
+export const predictBuildingLoad = async (buildingData) => {
+  try {
+    const response = await axios.post(`${ML_SERVICE_URL}/predict/building-load`, {
+      viewCount: buildingData.viewCount || 0,
+      uniqueVisitors: buildingData.uniqueVisitors || 0,
+      dayOfWeek: buildingData.dayOfWeek,
+      hour: buildingData.hour,
+      peakHour: buildingData.peakHour,
+      eventsCount: buildingData.eventsCount || 0,
+      averageViewDuration: buildingData.averageViewDuration || 0,
+      peakVisits: buildingData.peakVisits || 0,
+      date_time: buildingData.date_time
+    });
+
+    return response.data;
+  } catch (error) {
+    console.error('Error en predicción de carga de edificio ML:', error.message);
+
+    // Servicio caído, saturado o calentándose: fallback local sin volver a llamarlo
+    // (reintentar por modelo multiplicaría la carga justo cuando está saturado)
+    if (isUnavailable(error)) {
+      console.log('⚠️  ML Service no disponible, usando cálculo de fallback');
+      return {
+        mobility: fallbackMobility(buildingData),
+        saturation: fallbackSaturation({ ...buildingData, type: 0 }),
+        model_type: 'fallback',
+        features_used: []
+      };
+    }
+
+    // Servicio anterior sin modelo multi-salida: las dos predicciones por separado,
+    // que a su vez tienen su propio fallback
+    if (error.response?.status === 404) {
+      const [mobility, saturation] = await Promise.all([
+        predictMobilityDemand(buildingData),
+        predictSaturation({ ...buildingData, type: 0 })
+      ]);
+      return { mobility, saturation, model_type: 'separate', features_used: [] };
+    }
+
+    throw error;
+  }
+};
+
+/**
+ * Campos de una entidad para /predict/all (unión de asistencia, movilidad y saturación)
+ */
+function predictAllPayload(entityData) {
+  return {
+    viewCount: entityData.viewCount || 0,
+    uniqueVisitors: entityData.uniqueVisitors || 0,
+    dayOfWeek: entityData.dayOfWeek,
+    hour: entityData.hour,
+    category_count: entityData.category_count || 1,
+    popularityScore: entityData.popularityScore || 0,
+    peakHour: entityData.peakHour,
+    eventsCount: entityData.eventsCount || 0,
+    averageViewDuration: entityData.averageViewDuration || 0,
+    peakVisits: entityData.peakVisits || 0,
+    type: entityData.type || 0, // 0 = Edificio, 1 = Evento
+    date_time: entityData.date_time,
+    buildingId: entityData.buildingId
+  };
+}
+
+/**
+ * Respuesta de fallback de predictAll con los tres cálculos locales
+ */
+function fallbackAll(entityData) {
+  return {
+    attendance: fallbackAttendance(entityData),
+    mobility: fallbackMobility(entityData),
+    saturation: fallbackSaturation(entityData)
+  };
+}
+
+/**
+ * Asistencia, demanda de movilidad y nivel de saturación de una misma entidad en una
+ * sola llamada (retorna { attendance, mobility, saturation })
+ */
+export const predictAll = async (entityData) => {
+  try {
+    const response = await axios.post(`${ML_SERVICE_URL}/predict/all`, predictAllPayload(entityData));
+    return response.data;
+  } catch (error) {
+    console.error('Error en predicción ML combinada:', error.message);
+
+    // Servicio caído, saturado o calentándose: fallback local sin volver a llamarlo
+    if (isUnavailable(error)) {
+      console.log('⚠️  ML Service no disponible, usando cálculo de fallback');
+      return fallbackAll(entityData);
+    }
+
+    // Servicio anterior sin /predict/all: las tres predicciones por separado,
+    // que a su vez tienen su propio fallback
+    if (error.response?.status === 404) {
+      const [attendance, mobility, saturation] = await Promise.all([
+        predictEventAttendance(entityData),
+        predictMobilityDemand(entityData),
+        predictSaturation(entityData)
+      ]);
+      return { attendance, mobility, saturation };
+    }
+
+    throw error;
+  }
+};
+
+/**
+ * predictAll para varias entidades con una evaluación por modelo en el ML service
+ */
+export const predictAllBatch = async (entitiesData) => {
+  try {
+    const response = await axios.post(`${ML_SERVICE_URL}/predict/all/batch`, {
+      items: entitiesData.map(predictAllPayload)
+    });
+    return response.data.predictions;
+  } catch (error) {
+    console.error('Error en predicción ML combinada por lote:', error.message);
+
+    // Servicio caído, saturado o calentándose: fallback local de cada entidad, sin
+    // una llamada por entidad que multiplique la carga
+    if (isUnavailable(error)) {
+      console.log('⚠️  ML Service no disponible, usando cálculo de fallback');
+      return entitiesData.map(fallbackAll);
+    }
+
+    // Servicio anterior sin /predict/all/batch: una llamada combinada por entidad
+    if (error.response?.status === 404) {
+      return Promise.all(entitiesData.map(predictAll));
+    }
+
+    throw error;
+  }
+};
+
+/**
+ * Pronóstico de saturación y movilidad de los 13 edificios para cada día y hora
+ * (tensores [edificio][día][hora]; el ML service lo sirve desde caché)
+ */
+export const getForecastGrid = async () => {
+  try {
+    const response = await axios.get(`${ML_SERVICE_URL}/forecast/grid`);
+    return response.data;
+  } catch (error) {
+    console.error('Error obteniendo pronóstico del campus:', error.message);
+
+    if (isUnavailable(error)) {
+      console.log('⚠️  Pronóstico del campus no disponible');
+      return null;
+    }
+
+    throw error;
+  }
+};
+
 /**
  * Verificar si el ML service está disponible
  */